@@ -0,0 +1,126 @@
+"""
+Benchmark das rotas assíncronas: compara as requisições por segundo da rota de
+consulta de pedido por id com muitas requisições simultâneas em duas versões. A
+primeira é síncrona (`def` com o cliente síncrono do elasticsearch, comportamento
+anterior da aplicação), executada no threadpool do Starlette. A segunda é a rota
+assíncrona da aplicação, com o :class:`AsyncElasticsearch` de
+:func:`database.connect`.
+
+Um servidor HTTP local faz o papel do elasticsearch e responde cada requisição
+após `--latency` segundos, simulando o tempo de espera de rede e do banco de
+dados. As requisições são enviadas diretamente à aplicação ASGI, sem servidor
+HTTP, assim o resultado mede quantas requisições um único worker consegue manter
+em andamento.
+
+Uso::
+
+    python benchmarks/async_routes.py --requests 2000 --concurrency 500
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+from http.server import ThreadingHTTPServer
+
+import httpx
+from fastapi import FastAPI
+from elasticsearch import Elasticsearch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from es_client import StandInHandler  # noqa: E402
+
+
+class SlowStandInHandler(StandInHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        super().do_GET()
+
+
+def sync_app(port: int, maxsize: int) -> FastAPI:
+    es = Elasticsearch([{"host": "127.0.0.1", "port": port}], maxsize=maxsize)
+    app = FastAPI()
+
+    @app.get("/v1/orders/{index}/{doc_type}/{id}")
+    def list_one_by_id(index: str, doc_type: str, id: int):
+        response = es.get(index=index, id=id, doc_type=doc_type)
+        return {"result": response.get("_source")}
+
+    return app
+
+
+def async_app(port: int, maxsize: int) -> FastAPI:
+    os.environ["DB_HOST"] = "127.0.0.1"
+    os.environ["DB_PORT"] = str(port)
+    os.environ["DB_POOL_MAXSIZE"] = str(maxsize)
+    from order_api.routes import v1
+
+    app = FastAPI()
+    app.include_router(v1, prefix="/v1")
+    return app
+
+
+async def run(name: str, app: FastAPI, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=None)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://order-api", limits=limits
+    ) as client:
+
+        async def call(id: int):
+            async with semaphore:
+                response = await client.get(f"/v1/orders/orders/order/{id}")
+                response.raise_for_status()
+
+        await call(0)
+        start = time.perf_counter()
+        await asyncio.gather(*(call(id) for id in range(requests)))
+        elapsed = time.perf_counter() - start
+    rps = requests / elapsed
+    print(f"{name:<12} {requests} requisições em {elapsed:.2f}s: {rps:.0f} req/s")
+    return rps
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    SlowStandInHandler.latency = args.latency
+    ThreadingHTTPServer.request_queue_size = args.concurrency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowStandInHandler)
+    server.daemon_threads = True
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    before = await run(
+        "síncrono",
+        sync_app(port, args.concurrency),
+        args.requests,
+        args.concurrency,
+    )
+    after = await run(
+        "assíncrono",
+        async_app(port, args.concurrency),
+        args.requests,
+        args.concurrency,
+    )
+
+    from order_api.database import disconnect
+
+    await disconnect()
+    server.shutdown()
+    print(f"ganho: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
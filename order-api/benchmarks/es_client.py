@@ -0,0 +1,111 @@
+"""
+Benchmark do cliente do elasticsearch: compara as requisições por segundo de um
+cliente criado e fechado a cada operação (comportamento anterior do
+:class:`database.Database`) com o cliente compartilhado e com pool de conexões
+(:func:`database.connect`).
+
+Um servidor HTTP local faz o papel do elasticsearch, assim o resultado mede apenas
+o custo do cliente e das conexões, e não do banco de dados.
+
+Uso::
+
+    python benchmarks/es_client.py --requests 2000 --concurrency 8
+"""
+
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from elasticsearch import Elasticsearch
+
+ROOT = {
+    "name": "stand-in",
+    "cluster_name": "benchmark",
+    "version": {"number": "7.14.0", "build_flavor": "default"},
+    "tagline": "You Know, for Search",
+}
+DOCUMENT = {
+    "_index": "orders",
+    "_type": "order",
+    "_id": "1",
+    "_version": 1,
+    "found": True,
+    "_source": {
+        "user_id": 1,
+        "item_description": "Um item incrivel",
+        "item_quantity": 3,
+        "item_price": 2.5,
+        "total_value": 7.5,
+        "created_at": "2021-08-22 19:45:02.022807",
+    },
+}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = json.dumps(ROOT if self.path.split("?")[0] == "/" else DOCUMENT)
+        body = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def new_client(port: int, **kwargs) -> Elasticsearch:
+    return Elasticsearch([{"host": "127.0.0.1", "port": port}], **kwargs)
+
+
+def per_request(port: int):
+    es = new_client(port)
+    es.get(index="orders", id=1, doc_type="order")
+    es.close()
+
+
+def pooled(es: Elasticsearch):
+    es.get(index="orders", id=1, doc_type="order")
+
+
+def run(name: str, call, requests: int, concurrency: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda _: call(), range(requests)))
+    elapsed = time.perf_counter() - start
+    rps = requests / elapsed
+    print(f"{name:<12} {requests} requisições em {elapsed:.2f}s: {rps:.0f} req/s")
+    return rps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    es = new_client(port, maxsize=args.concurrency)
+    before = run(
+        "por request", lambda: per_request(port), args.requests, args.concurrency
+    )
+    after = run("pool", lambda: pooled(es), args.requests, args.concurrency)
+    es.close()
+    server.shutdown()
+    print(f"ganho: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,10 @@ from order_api import __version__
 from order_api.routes import v1
 from order_api.files import html_desc
 from order_api.routes.v1 import doc_sphinx
+from order_api.services import user, events, ids
+from order_api.business import read_model
+from order_api.services.redis import redis
+from order_api.database import connect, disconnect, indices
 from order_api.exceptions import OrderApiException
 from docs import (
     build_html_pages,
@@ -106,6 +110,27 @@ def load_exceptions(app: FastAPI):
         )
 
 
+def configure_events(app: FastAPI):
+    @app.on_event("startup")
+    async def startup():  # pragma: no cover
+        connect()
+        await ids.register()
+        await indices.prepare()
+        indices.start()
+        events.start()
+        read_model.start()
+
+    @app.on_event("shutdown")
+    async def shutdown():  # pragma: no cover
+        await events.stop()
+        await read_model.stop()
+        await indices.stop()
+        await ids.release()
+        await disconnect()
+        await user.close()
+        await redis.aclose()
+
+
 def http_middleware(app: FastAPI):
     @app.middleware("http")
     async def add_process_time_header(request: Request, call_next):  # pragma: no cover
@@ -141,6 +166,7 @@ def start_application():
     include_router(app)
     configure_static(app)
     load_exceptions(app)
+    configure_events(app)
     http_middleware(app)
     app.add_middleware(
         CORSMiddleware,
@@ -0,0 +1,238 @@
+from datetime import datetime, timezone
+from collections import defaultdict
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from order_api.config import envs
+from order_api.services import metrics
+from order_api.services.redis import redis
+from order_api.database.order import Order
+from order_api.database import user_routing
+
+AGGS = {
+    "total_value": {"sum": {"field": "total_value"}},
+    "last_order_at": {"max": {"field": "created_at"}},
+}
+
+
+def _key(user_id) -> str:
+    return f"{envs.ORDER_COUNTERS_PREFIX}{user_id}"
+
+
+def _epoch_ms(created_at) -> int:
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return int(created_at.timestamp() * 1000)
+
+
+def _summary(user_id, count: int, total: float, last_order_at) -> dict:
+    if last_order_at:
+        last_order_at = datetime.fromtimestamp(
+            float(last_order_at) / 1000, tz=timezone.utc
+        ).isoformat()
+    return {
+        "user_id": int(user_id),
+        "count": int(count),
+        "total_value_sum": round(float(total), 2),
+        "last_order_at": last_order_at or None,
+    }
+
+
+def affected(order_data: dict) -> bool:
+    """
+    Indica se uma atualização altera os contadores dos usuários, isto é, se muda o
+    usuário ou o valor total do pedido.
+
+    :param dict order_data: Dados do pedido a serem atualizados.
+    :rtype: bool
+    """
+    return envs.ORDER_COUNTERS_ENABLED and any(
+        order_data.get(field) is not None for field in ("user_id", "total_value")
+    )
+
+
+async def _increment(changes: dict, last_order_at: dict = None):
+    """
+    Aplica as variações nos contadores dos usuários, em um único pipeline. Uma
+    falha do redis é apenas registrada: os contadores ficam desatualizados até a
+    próxima reconstrução, ver :func:`rebuild`.
+
+    :param dict changes: Dicionário no formato id do usuário: (variação da
+    quantidade, variação do valor total).
+    :param last_order_at: Dicionário no formato id do usuário: timestamp em
+    milissegundos do pedido mais recente.
+    :type last_order_at: dict, optional
+    """
+    if not envs.ORDER_COUNTERS_ENABLED or not changes:
+        return
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for user_id, (count, total) in changes.items():
+                pipe.hincrby(_key(user_id), "count", count)
+                pipe.hincrbyfloat(_key(user_id), "total_value", round(total, 2))
+            for user_id, timestamp in (last_order_at or dict()).items():
+                pipe.hset(_key(user_id), "last_order_at", timestamp)
+            await pipe.execute()
+    except RedisError as error:
+        metrics.incr("order_counters_errors")
+        logger.error(f"Falha ao atualizar os contadores dos usuários: {error}")
+
+
+async def record_inserts(orders: list):
+    """
+    Contabiliza pedidos inseridos: incrementa a quantidade e o valor total e
+    atualiza a data do último pedido de cada usuário.
+
+    :param list orders: Pedidos inseridos, no formato dict.
+    """
+    changes, last_order_at = defaultdict(lambda: (0, 0.0)), dict()
+    for order in orders:
+        user_id = str(order.get("user_id"))
+        count, total = changes[user_id]
+        changes[user_id] = (count + 1, total + (order.get("total_value") or 0))
+        timestamp = _epoch_ms(order.get("created_at"))
+        last_order_at[user_id] = max(last_order_at.get(user_id, 0), timestamp)
+    await _increment(changes, last_order_at)
+
+
+async def record_update(previous: dict, current: dict):
+    """
+    Contabiliza a atualização de um pedido: a variação do valor total ou, se o
+    pedido mudou de usuário, a transferência do pedido entre os usuários.
+
+    :param dict previous: Pedido antes da atualização.
+    :param dict current: Pedido depois da atualização.
+    """
+    old_user, new_user = str(previous.get("user_id")), str(current.get("user_id"))
+    old_total = previous.get("total_value") or 0
+    new_total = current.get("total_value") or 0
+    if old_user == new_user:
+        await _increment({new_user: (0, new_total - old_total)})
+    else:
+        await _increment({old_user: (-1, -old_total), new_user: (1, new_total)})
+
+
+async def record_delete(previous: dict):
+    """
+    Contabiliza a remoção de um pedido. A data do último pedido do usuário não é
+    alterada.
+
+    :param dict previous: Pedido removido.
+    """
+    await _increment(
+        {str(previous.get("user_id")): (-1, -(previous.get("total_value") or 0))}
+    )
+
+
+async def get(user_id) -> dict:
+    """
+    Contadores de um usuário: quantidade de pedidos, valor total e data do último
+    pedido, lidos do redis em O(1). Os contadores só são usados depois da primeira
+    reconstrução, ver :func:`rebuild`.
+
+    :param user_id: Id do usuário.
+    :return: Contadores do usuário ou None se desabilitados, ainda não
+    reconstruídos, ausentes ou se o redis não estiver disponível.
+    :rtype: dict
+    """
+    if not envs.ORDER_COUNTERS_ENABLED:
+        return None
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.exists(envs.ORDER_COUNTERS_READY_KEY)
+            pipe.hgetall(_key(user_id))
+            ready, values = await pipe.execute()
+    except RedisError as error:
+        logger.error(f"Falha ao consultar os contadores dos usuários: {error}")
+        return None
+    if not ready or not values:
+        return None
+    return _summary(
+        user_id,
+        values.get(b"count", 0),
+        values.get(b"total_value", 0),
+        values.get(b"last_order_at"),
+    )
+
+
+async def summary(user_id: int, index: str = "orders") -> dict:
+    """
+    Resumo dos pedidos de um usuário, ver :func:`get`. Sem os contadores o resumo é
+    calculado com uma agregação no elasticsearch.
+
+    :param int user_id: Id do usuário.
+    :param index: Indice consultado, por padrão 'orders'.
+    :type index: str, optional
+    :return: Quantidade de pedidos, valor total e data do último pedido.
+    :rtype: dict
+    """
+    counters = await get(user_id)
+    if counters is not None:
+        return counters
+    aggs, total = await Order().aggregate(
+        AGGS,
+        query={"user_id": str(user_id)},
+        index=index,
+        routing=user_routing(user_id),
+    )
+    return _summary(
+        user_id,
+        total,
+        aggs["total_value"]["value"] or 0,
+        aggs["last_order_at"]["value"],
+    )
+
+
+async def rebuild(index: str = "orders", batch_size: int = 1000) -> int:
+    """
+    Recalcula os contadores de todos os usuários a partir do elasticsearch, com uma
+    agregação `composite` paginada por usuário, e remove os contadores de usuários
+    sem pedidos. Ao final os contadores passam a ser usados nas consultas.
+
+    Os pedidos gravados durante a reconstrução podem não ser contabilizados, por
+    isso ela deve ser executada com as escritas suspensas ou repetida em seguida.
+
+    :param index: Indice consultado, por padrão 'orders'.
+    :type index: str, optional
+    :param batch_size: Quantidade de usuários por página da agregação.
+    :type batch_size: int, optional
+    :return: Quantidade de usuários com pedidos.
+    :rtype: int
+    """
+    composite = {
+        "size": batch_size,
+        "sources": [{"user_id": {"terms": {"field": "user_id"}}}],
+    }
+    users = set()
+    while True:
+        aggs, _ = await Order().aggregate(
+            {"users": {"composite": composite, "aggs": AGGS}}, index=index
+        )
+        buckets = aggs["users"]["buckets"]
+        async with redis.pipeline(transaction=False) as pipe:
+            for bucket in buckets:
+                user_id = bucket["key"]["user_id"]
+                users.add(_key(user_id).encode())
+                pipe.delete(_key(user_id))
+                pipe.hset(
+                    _key(user_id),
+                    mapping={
+                        "count": bucket["doc_count"],
+                        "total_value": round(bucket["total_value"]["value"] or 0, 2),
+                        "last_order_at": int(bucket["last_order_at"]["value"] or 0),
+                    },
+                )
+            await pipe.execute()
+        logger.info(f"Contadores de {len(users)} usuários reconstruídos")
+        if len(buckets) < batch_size or "after_key" not in aggs["users"]:
+            break
+        composite["after"] = aggs["users"]["after_key"]
+
+    async for key in redis.scan_iter(match=f"{envs.ORDER_COUNTERS_PREFIX}*"):
+        if key not in users:
+            await redis.delete(key)
+    await redis.set(envs.ORDER_COUNTERS_READY_KEY, 1)
+    return len(users)
@@ -1,46 +1,62 @@
 import json
+from datetime import datetime
 from collections import defaultdict
 
+from order_api.config import envs
+from order_api.database import user_routing, write_alias
 from order_api.database.order import Order
-from order_api.services.user import get_user_by_id
-
-from order_api.services.redis import redis
+from order_api.database.indices import ORDER_PROPERTIES
+from order_api.business import read_model, counters
+from order_api.services import metrics
+from order_api.services.cache import (
+    get_user,
+    get_users,
+    find_users,
+    find_users_in_batches,
+)
 from order_api.exceptions import ErrorDetails
-from order_api.exceptions.redis import RedisException
+from order_api.exceptions.order import (
+    OrderConflictException,
+    OrderNotFoundException,
+    UpdateOrderException,
+)
+from order_api.exceptions.database import QueryMalformedException
 
 from loguru import logger
 
 
-def _format_orders(hits: list):
+async def _format_orders(hits: list):
     """
-    Função auxiliar para gerar os dados de saída de pedidos e usuários. Grava no
-    redis caso um dos usuários já tenham sido consultados do microsserviço user-api,
-    recuperando também do redis caso o dado já exista.
+    Função auxiliar para gerar os dados de saída de pedidos e usuários. Os usuários
+    distintos da página são resolvidos de uma só vez pelo cache de usuários, ver
+    :func:`services.cache.get_users`, de forma que a quantidade de chamadas ao
+    redis e ao microsserviço user-api não cresce com a quantidade de pedidos.
+
+    Se o microsserviço user-api não estiver disponível, ou o seu disjuntor estiver
+    aberto, os pedidos são devolvidos apenas com os usuários em cache e a saída é
+    marcada como degradada. Com o modelo de leitura habilitado os hits já contêm os
+    dados do usuário, ver :mod:`business.read_model`, e nenhum serviço é consultado.
 
     :param list hits: Saída do método `search` da api do elasticsearch.
     :raises RedisException: Se ao gravar ou recuperar um dado o redis não esteja
     disponível.
+    :raises UserNotFoundException: Se algum dos usuários não existir.
     :return: Dicionário formatado com os pedidos.
     :rtype: dict
     """
     orders = defaultdict(list)
+    if envs.READ_MODEL_ENABLED:
+        users = {
+            str(hit.get("_source").get("user_id")): hit.get("_source").get("user")
+            for hit in hits
+        }
+        orders["degraded"] = False
+    else:
+        ids_user = {hit.get("_source").get("user_id") for hit in hits}
+        users = await get_users(ids_user, partial=True)
+        orders["degraded"] = len(users) < len(ids_user)
     for hit in hits:
-        user_id = hit.get("_source").get("user_id")
-        user_info = get_user_by_id(user_id).get("result")
-        if not redis.set(user_id, json.dumps(user_info)):
-            raise RedisException(
-                status=503,
-                error="Service Unavailable",
-                message="Serviço indisponível",
-                error_details=[
-                    ErrorDetails(
-                        message="Um ou mais serviços não estão disppníveis"
-                    ).to_dict()
-                ],
-            )
-        orders["user"] = (
-            json.loads(redis.get(user_id)) if redis.get(user_id) else user_info
-        )
+        orders["user"] = users.get(str(hit.get("_source").get("user_id")))
         orders["orders"].append(
             {
                 "id": hit.get("_id"),
@@ -55,22 +71,137 @@ def _format_orders(hits: list):
     return orders
 
 
-def insert_order(order_data: dict, index: str, doc_type: str, id: str):
+def _conflict(id: str) -> OrderConflictException:
+    return OrderConflictException(
+        status=409,
+        error="Conflict",
+        message="Pedido alterado",
+        error_details=[
+            ErrorDetails(
+                message=f"O pedido {id} foi alterado por outra operação"
+            ).to_dict()
+        ],
+    )
+
+
+async def _locate(id: str, index: str, user_id: int = None) -> tuple:
+    """
+    Índice concreto e routing de um pedido já gravado. Quando o índice de pedidos é
+    dividido em gerações, ver :func:`database.write_alias`, ou quando o routing por
+    usuário está habilitado e o usuário do pedido não é informado, ver
+    :func:`database.user_routing`, o pedido é procurado com uma busca pelo id, ver
+    :meth:`database.Database.locate`.
+
+    :param str id: Id do pedido.
+    :param str index: Indice do pedido.
+    :param user_id: Id do usuário do pedido.
+    :type user_id: int, optional
+    :raises OrderNotFoundException: O pedido não foi encontrado.
+    :return: Índice e routing do pedido, o routing é None quando desabilitado.
+    :rtype: tuple
+    """
+    routing = user_routing(user_id)
+    if write_alias(index) != index or (envs.DB_ROUTING_BY_USER and routing is None):
+        return await Order().locate(id, index, routing)
+    return index, routing
+
+
+async def insert_order(order_data: dict, index: str, doc_type: str, id: str = None):
     """
-    Insere um novo pedido, verificando se o usuário informado existe no microsserviço
-    user-api.
+    Insere um novo pedido, verificando se o usuário informado existe, passando pelo
+    cache de usuários antes do microsserviço user-api.
 
     :param dict order_data: Dados do pedido.
     :param str index: Indice no qual o documento será inserido, por padrão no índice
     'orders'.
     :param str doc_type: Document type do documento inserido, por padrão 'order'.
-    :param str id: Id do documento inserido.
+    :param id: Id do documento inserido, gerado pela aplicação se não informado,
+    ver :func:`services.ids.new_id`.
+    :type id: str, optional
     """
-    get_user_by_id(order_data.get("user_id"))
-    return Order(**order_data).insert(id=id, index=index, doc_type=doc_type).get("_id")
+    user = await get_user(order_data.get("user_id"))
+    new_order = Order(**order_data)
+    response = await new_order.insert(
+        id=id,
+        index=write_alias(index),
+        doc_type=doc_type,
+        routing=user_routing(new_order.user_id),
+    )
+    await read_model.project_orders(
+        [(response.get("_id"), new_order.dict())], {str(new_order.user_id): user}
+    )
+    await counters.record_inserts([new_order.dict()])
+    return response.get("_id")
 
 
-def get_order_by_id(index: str, doc_type: str, id: str):
+async def bulk_insert_orders(
+    orders: list, index: str = "orders", doc_type: str = "order"
+):
+    """
+    Insere vários pedidos de uma só vez. Os usuários distintos dos pedidos são
+    verificados uma única vez, passando pelo cache de usuários em lotes de até
+    `USER_API_BATCH_MAX_IDS` usuários, e os pedidos de usuários que não existem não
+    são inseridos. Os demais pedidos são gravados em lotes, ver
+    :meth:`database.Database.bulk_insert`.
+
+    :param list orders: Lista de tuplas (posição, dados do pedido), a posição
+    identifica o pedido no resultado. O id do pedido, opcional, é informado na
+    chave 'id' dos dados.
+    :param index: Indice no qual os documentos serão inseridos, por padrão no índice
+    'orders'.
+    :type index: str, optional
+    :param doc_type: Document type dos documentos inseridos, por padrão 'order'.
+    :type doc_type: str, optional
+    :return: Resultado de cada pedido no formato
+    {"position": int, "id": str, "status": int, "error": str}.
+    :rtype: list
+    """
+    users, not_found = await find_users_in_batches(
+        {order_data.get("user_id") for _, order_data in orders}
+    )
+    not_found = set(not_found)
+    results, positions, documents = list(), list(), list()
+    created_at = datetime.utcnow()
+    for position, order_data in orders:
+        order_data = dict(order_data)
+        id = order_data.pop("id", None)
+        user_id = order_data.get("user_id")
+        if str(user_id) in not_found:
+            results.append(
+                {
+                    "position": position,
+                    "id": str(id) if id else None,
+                    "status": 404,
+                    "error": f"O usuário {user_id} não foi encontrado na base",
+                }
+            )
+            continue
+        new_order = Order(**order_data)
+        new_order.created_at = created_at
+        positions.append(position)
+        documents.append((id, new_order.dict()))
+
+    inserted = await Order().bulk_insert(
+        documents,
+        index=write_alias(index),
+        doc_type=doc_type,
+        routing_field="user_id" if envs.DB_ROUTING_BY_USER else None,
+    )
+    succeeded = [
+        (result.get("id"), document)
+        for (_, document), result in zip(documents, inserted)
+        if not result.get("error")
+    ]
+    await read_model.project_orders(succeeded, users)
+    await counters.record_inserts([document for _, document in succeeded])
+    results.extend(
+        {"position": position, **result}
+        for position, result in zip(positions, inserted)
+    )
+    return sorted(results, key=lambda result: result["position"])
+
+
+async def get_order_by_id(index: str, doc_type: str, id: str, user_id: int = None):
     """
     Recupera um pedido da base a partir do seu id.
 
@@ -78,47 +209,344 @@ def get_order_by_id(index: str, doc_type: str, id: str):
     'orders'.
     :param str doc_type: Document type do documento inserido, por padrão 'order'.
     :param str id: Id do documento consultado.
+    :param user_id: Id do usuário do pedido, usado como routing, ver
+    :func:`_locate`.
+    :type user_id: int, optional
+    :return: Pedido, número de sequência e termo primário do pedido, usados no
+    controle de concorrência da atualização, ver :func:`update_order`.
+    :rtype: tuple
     """
-    return Order().list_one(id, index, doc_type).get("_source")
+    index, routing = await _locate(id, index, user_id)
+    response = await Order().list_one(id, index, doc_type, routing)
+    return (
+        response.get("_source"),
+        response.get("_seq_no"),
+        response.get("_primary_term"),
+    )
+
+
+async def get_orders_by_ids(
+    index: str, ids: list, user_id: int = None, include_user: bool = False
+) -> tuple:
+    """
+    Recupera vários pedidos a partir dos seus ids com uma única leitura no
+    elasticsearch, ver :meth:`database.Database.list_many`. Quando o índice de
+    pedidos é dividido em gerações ou o routing dos pedidos não é conhecido, ver
+    :func:`_locate`, os pedidos são buscados pelos ids e apenas os que a busca não
+    encontrar são lidos da geração atual. Um pedido inexistente não interrompe a
+    leitura dos demais e é devolvido com `found` falso.
+
+    Com `include_user` os usuários distintos dos pedidos são resolvidos de uma só
+    vez pelo cache de usuários, ver :func:`services.cache.find_users`.
+
+    :param str index: Indice dos pedidos.
+    :param list ids: Ids dos pedidos, no máximo `ORDER_MGET_MAX_IDS`.
+    :param user_id: Id do usuário dos pedidos, usado como routing.
+    :type user_id: int, optional
+    :param include_user: Se os dados do usuário devem ser incluídos em cada pedido.
+    :type include_user: bool, optional
+    :raises QueryMalformedException: Se a quantidade de ids exceder o limite.
+    :return: Um item por id, na ordem dos ids, e se algum usuário veio apenas do
+    cache por indisponibilidade do user-api.
+    :rtype: tuple
+    """
+    if len(ids) > envs.ORDER_MGET_MAX_IDS:
+        raise QueryMalformedException(
+            status=400,
+            error="Bad request",
+            message="Query incorreta",
+            error_details=[
+                ErrorDetails(
+                    message=f"Informe no máximo {envs.ORDER_MGET_MAX_IDS} ids"
+                ).to_dict()
+            ],
+        )
+    routing = user_routing(user_id)
+    missing = [str(id) for id in ids]
+    sources = dict()
+    if write_alias(index) != index or (envs.DB_ROUTING_BY_USER and routing is None):
+        hits = await Order().list_by_ids(missing, index, routing)
+        sources = {hit.get("_id"): hit.get("_source") for hit in hits}
+        missing = [id for id in dict.fromkeys(missing) if id not in sources]
+        index = write_alias(index)
+    if missing:
+        docs = await Order().list_many(missing, index, routing)
+        sources.update(
+            {doc.get("_id"): doc.get("_source") for doc in docs if doc.get("found")}
+        )
+
+    users, degraded = dict(), False
+    if include_user and sources:
+        ids_user = {source.get("user_id") for source in sources.values()}
+        users, not_found = await find_users(ids_user, partial=True)
+        degraded = len(users) + len(not_found) < len(ids_user)
+    items = list()
+    for id in map(str, ids):
+        source = sources.get(id)
+        if source is None:
+            items.append(
+                {
+                    "id": id,
+                    "found": False,
+                    "error": f"O pedido {id} não foi encontrado na base",
+                }
+            )
+            continue
+        item = {"id": id, "found": True, "order": source}
+        if include_user:
+            item["user"] = users.get(str(source.get("user_id")))
+        items.append(item)
+    return items, degraded
 
 
-def update_order(order_data: dict, index: str, doc_type: str, id: str):
+async def update_order(
+    order_data: dict,
+    index: str,
+    doc_type: str,
+    id: str,
+    user_id: int = None,
+    if_seq_no: int = None,
+    if_primary_term: int = None,
+):
     """
-    Atualiza um pedido.
+    Atualiza os campos informados de um pedido no índice em que ele foi gravado,
+    mantendo os demais, ver :meth:`database.Database.update`. Com o routing por
+    usuário habilitado, um pedido que muda de usuário é gravado no shard do novo
+    usuário antes de ser removido do shard do usuário anterior, ver :func:`_move`.
 
     :param dict order_data: Dados do pedido a serem atualizados.
     :param str index: Indice no qual o documento será inserido, por padrão no índice
     'orders'.
     :param str doc_type: Document type do documento inserido, por padrão 'order'.
     :param str id: Id do documento atualizado..
+    :param user_id: Id do usuário atual do pedido, usado como routing, ver
+    :func:`_locate`.
+    :type user_id: int, optional
+    :param if_seq_no: Número de sequência do pedido lido, ver
+    :func:`get_order_by_id`. A atualização só é aplicada se o pedido não foi
+    alterado desde a leitura.
+    :type if_seq_no: int, optional
+    :param if_primary_term: Termo primário do pedido lido, informado junto com
+    `if_seq_no`.
+    :type if_primary_term: int, optional
+    :raises UpdateOrderException: Se apenas um dos parâmetros de concorrência for
+    informado.
+    :raises OrderConflictException: Se o pedido foi alterado desde a leitura.
+    :return: Versão, número de sequência e termo primário do pedido atualizado.
+    :rtype: tuple
     """
+    if (if_seq_no is None) != (if_primary_term is None):
+        raise UpdateOrderException(
+            status=400,
+            error="Bad Request",
+            message="Controle de concorrência inválido",
+            error_details=[
+                ErrorDetails(
+                    message="Informe if_seq_no e if_primary_term juntos"
+                ).to_dict()
+            ],
+        )
     if order_data.get("user_id"):
-        get_user_by_id(order_data.get("user_id"))
-    return Order(**order_data).update(id, index, doc_type).get("_version")
+        await get_user(order_data.get("user_id"))
+    index, routing = await _locate(id, index, user_id)
+    new_routing = user_routing(order_data.get("user_id")) or routing
+    read_first = new_routing != routing or counters.affected(order_data)
+    attempts = 1
+    if read_first and if_seq_no is None:
+        attempts += envs.DB_UPDATE_RETRY_ON_CONFLICT
+    for attempt in range(attempts):
+        try:
+            response, previous, order = await _update(
+                order_data,
+                index,
+                doc_type,
+                id,
+                routing,
+                new_routing,
+                if_seq_no,
+                if_primary_term,
+                read_first,
+            )
+            break
+        except OrderConflictException:
+            if attempt == attempts - 1:
+                raise
+    if previous is not None:
+        await counters.record_update(previous, order)
+    if envs.READ_MODEL_ENABLED:
+        user = await get_users({order.get("user_id")}, partial=True)
+        await read_model.project_orders([(str(id), order)], user)
+    return (
+        response.get("_version"),
+        response.get("_seq_no"),
+        response.get("_primary_term"),
+    )
+
+
+async def _update(
+    order_data: dict,
+    index: str,
+    doc_type: str,
+    id: str,
+    routing: str,
+    new_routing: str,
+    if_seq_no: int,
+    if_primary_term: int,
+    read_first: bool,
+) -> tuple:
+    """
+    Aplica a atualização de um pedido, ver :func:`update_order`. Quando o pedido
+    muda de shard ou os contadores dos usuários precisam do pedido anterior, ver
+    :mod:`business.counters`, o pedido é lido antes e a escrita só é aplicada se ele
+    não foi alterado desde a leitura. Um pedido que muda de shard é sempre lido
+    antes, mesmo que `read_first` seja False, ver :func:`_move`.
+
+    :return: Response da escrita, pedido anterior, quando lido, e pedido atualizado.
+    :rtype: tuple
+    """
+    previous = None
+    if read_first or new_routing != routing:
+        current = await Order().list_one(id, index, doc_type, routing)
+        seq_no, primary_term = current.get("_seq_no"), current.get("_primary_term")
+        if if_seq_no is not None and (seq_no, primary_term) != (
+            if_seq_no,
+            if_primary_term,
+        ):
+            raise _conflict(id)
+        if_seq_no, if_primary_term = seq_no, primary_term
+        previous = current.get("_source")
+    if new_routing != routing:
+        changes = Order(**order_data)
+        changes.updated_at = datetime.utcnow()
+        order = {**previous, **changes.dict()}
+        response = await _move(
+            order, index, doc_type, id, routing, new_routing, if_seq_no, if_primary_term
+        )
+    else:
+        response = await Order(**order_data).update(
+            id,
+            index,
+            doc_type,
+            routing,
+            if_seq_no=if_seq_no,
+            if_primary_term=if_primary_term,
+            return_source=envs.READ_MODEL_ENABLED or previous is not None,
+        )
+        order = response.get("get", dict()).get("_source")
+    return response, previous, order
+
+
+async def _move(
+    order: dict,
+    index: str,
+    doc_type: str,
+    id: str,
+    routing: str,
+    new_routing: str,
+    if_seq_no: int,
+    if_primary_term: int,
+) -> dict:
+    """
+    Move um pedido para o shard do novo usuário. A cópia no novo shard é criada
+    antes da remoção da cópia anterior, que só é removida se o pedido não foi
+    alterado desde a leitura, assim uma falha durante a mudança deixa o pedido
+    duplicado, nunca perdido. Se o pedido foi alterado ou removido, a nova cópia é
+    removida e a mudança falha com conflito.
+
+    :param dict order: Pedido atualizado.
+    :param str index: Índice concreto do pedido.
+    :param str doc_type: Document type do pedido.
+    :param str id: Id do pedido.
+    :param str routing: Routing atual do pedido.
+    :param str new_routing: Routing do novo usuário do pedido.
+    :param int if_seq_no: Número de sequência do pedido lido.
+    :param int if_primary_term: Termo primário do pedido lido.
+    :raises OrderConflictException: Se o pedido foi alterado desde a leitura.
+    :return: Response da criação da nova cópia.
+    :rtype: dict
+    """
+    response = await Order(**order).insert(
+        id=id, index=index, doc_type=doc_type, routing=new_routing
+    )
+    try:
+        await Order().delete(id, index, doc_type, routing, if_seq_no, if_primary_term)
+    except (OrderConflictException, OrderNotFoundException):
+        try:
+            await Order().delete(id, index, doc_type, new_routing)
+        except Exception as error:
+            metrics.incr("order_routing_duplicates")
+            logger.error(f"Pedido {id} duplicado no routing {new_routing}: {error}")
+        raise _conflict(id)
+    except BaseException as error:
+        metrics.incr("order_routing_duplicates")
+        logger.error(f"Pedido {id} duplicado no routing {routing}: {error!r}")
+        raise
+    await read_model.remove_order(str(id), routing)
+    return response
 
 
-def delete_order(index: str, doc_type: str, id: int):
+async def delete_order(index: str, doc_type: str, id: str, user_id: int = None):
     """
-    Deleta um pedido.
+    Deleta um pedido. Com os contadores dos usuários habilitados o pedido é lido
+    antes da remoção, para descontar o seu valor do usuário, ver
+    :mod:`business.counters`.
 
     :param str index: Indice no qual o documento será inserido, por padrão no índice
     'orders'.
     :param str doc_type: Document type do documento inserido, por padrão 'order'.
     :param str id: Id do documento deletado.
+    :param user_id: Id do usuário do pedido, usado como routing, ver
+    :func:`_locate`.
+    :type user_id: int, optional
     """
-    return Order().delete(id, index, doc_type).get("result")
+    index, routing = await _locate(id, index, user_id)
+    if not envs.ORDER_COUNTERS_ENABLED:
+        response = await Order().delete(id, index, doc_type, routing)
+        await read_model.remove_order(str(id), routing)
+        return response.get("result")
+    for attempt in range(envs.DB_UPDATE_RETRY_ON_CONFLICT + 1):
+        current = await Order().list_one(id, index, doc_type, routing)
+        try:
+            response = await Order().delete(
+                id,
+                index,
+                doc_type,
+                routing,
+                current.get("_seq_no"),
+                current.get("_primary_term"),
+            )
+            break
+        except OrderConflictException:
+            if attempt == envs.DB_UPDATE_RETRY_ON_CONFLICT:
+                raise
+    await read_model.remove_order(str(id), routing)
+    await counters.record_delete(current.get("_source"))
+    return response.get("result")
 
 
-def list_orders(
+async def list_orders(
     user_id: str = None,
     quantity: int = 10,
     page: int = 0,
     index: str = "orders",
     doc_type: str = "order",
+    cursor: str = None,
+    created_from: datetime = None,
+    created_to: datetime = None,
+    min_total: float = None,
+    max_total: float = None,
 ):
     """
-    Lista todos os pedidos da base, filtrando ou não por usuário. Formata a saída
-    conforme padrão no arquivo `architecture/er/nosql/order_output.json`.
+    Lista todos os pedidos da base, filtrando ou não por usuário, período de
+    criação e valor total. Formata a saída
+    conforme padrão no arquivo `architecture/er/nosql/order_output.json`, ver
+    :func:`_format_orders`. Quando um cursor é informado a paginação é feita por
+    cursor, ver :meth:`database.Database.list_after`, e o parâmetro `page` é
+    ignorado. Com o modelo de leitura habilitado a página inteira é lida do índice
+    `READ_MODEL_INDEX` em uma única consulta, sem chamadas ao user-api. Na listagem
+    dos pedidos de um usuário, sem outros filtros, o total de registros vem dos
+    contadores do usuário, ver :mod:`business.counters`, sem contagem no
+    elasticsearch e sem verificar o usuário no user-api.
 
     :param user_id: Filtro dos pedidos a partir do id do usuário.
     :type user_id: str, optional.
@@ -129,18 +557,191 @@ def list_orders(
     :type index: str, optional
     :param doc_type: Document type do documento inserido, por padrão 'order'.
     :type doc_type: str, optional
+    :param cursor: Cursor da página, `*` para a primeira página.
+    :type cursor: str, optional
+    :param created_from: Data de criação mínima dos pedidos.
+    :type created_from: datetime, optional
+    :param created_to: Data de criação máxima dos pedidos.
+    :type created_to: datetime, optional
+    :param min_total: Valor total mínimo dos pedidos.
+    :type min_total: float, optional
+    :param max_total: Valor total máximo dos pedidos.
+    :type max_total: float, optional
+    :return: Pedidos formatados, total de registros no formato
+    `{"value": int, "relation": "eq" | "gte"}` e cursor da próxima página.
+    :rtype: tuple
+    """
+    query = {
+        "user_id": str(user_id) if user_id else None,
+        "created_at": {
+            "gte": created_from.isoformat() if created_from else None,
+            "lte": created_to.isoformat() if created_to else None,
+        },
+        "total_value": {"gte": min_total, "lte": max_total},
+    }
+    summary = None
+    if user_id and not any((created_from, created_to, min_total, max_total)):
+        summary = await counters.get(user_id)
+    if envs.READ_MODEL_ENABLED:
+        index = envs.READ_MODEL_INDEX
+    elif user_id and summary is None:
+        await get_users({user_id}, partial=True)
+    next_cursor = None
+    if cursor:
+        orders, total, next_cursor = await Order().list_after(
+            query=query,
+            quantity=quantity,
+            cursor=cursor,
+            index=index,
+            routing=user_routing(user_id),
+            track_total_hits=summary is None,
+        )
+    else:
+        orders, total = await Order().list_all(
+            query=query,
+            quantity=quantity,
+            page=page,
+            index=index,
+            doc_type=doc_type,
+            routing=user_routing(user_id),
+            track_total_hits=summary is None,
+        )
+    if summary is not None:
+        total = {"value": summary["count"], "relation": "eq"}
+    logger.debug(orders)
+    logger.debug(total)
+    if envs.READ_MODEL_ENABLED and user_id and not orders and summary is None:
+        await get_users({user_id}, partial=True)
+    return await _format_orders(orders), total, next_cursor
+
+
+SEARCH_FIELDS = ["item_description", "item_description.keyword^2"]
+
+
+def _source_filter(fields: list) -> tuple:
+    """
+    Campos devolvidos e omitidos na busca de pedidos, ver :func:`search_orders`.
+    Campos prefixados com `-` são omitidos e os demais são devolvidos.
+
+    :param list fields: Campos dos pedidos.
+    :raises QueryMalformedException: Se algum dos campos não existir.
+    :return: Listas dos campos devolvidos e dos campos omitidos.
+    :rtype: tuple
+    """
+    includes, excludes = list(), list()
+    for field in fields or list():
+        name = field.strip().lstrip("-")
+        if name not in ORDER_PROPERTIES:
+            raise QueryMalformedException(
+                status=400,
+                error="Bad request",
+                message="Query incorreta",
+                error_details=[
+                    ErrorDetails(message=f"O campo {name} não existe").to_dict()
+                ],
+            )
+        (excludes if field.strip().startswith("-") else includes).append(name)
+    return includes, excludes
+
+
+async def search_orders(
+    text: str,
+    user_id: int = None,
+    created_from: datetime = None,
+    created_to: datetime = None,
+    fields: list = None,
+    quantity: int = 10,
+    page: int = 1,
+    index: str = "orders",
+):
+    """
+    Busca textual na descrição dos itens dos pedidos, ordenada por relevância e
+    filtrando ou não por usuário e período de criação, ver
+    :meth:`database.Database.search`. Os trechos encontrados são devolvidos
+    destacados em `highlight` e apenas os campos solicitados são lidos do
+    `_source`, o que reduz a resposta do elasticsearch e a serialização. Os
+    usuários não são consultados no user-api.
+
+    :param str text: Texto buscado.
+    :param user_id: Filtro dos pedidos a partir do id do usuário.
+    :type user_id: int, optional
+    :param created_from: Data de criação mínima dos pedidos.
+    :type created_from: datetime, optional
+    :param created_to: Data de criação máxima dos pedidos.
+    :type created_to: datetime, optional
+    :param fields: Campos devolvidos, ou omitidos quando prefixados com `-`, por
+    padrão todos.
+    :type fields: list, optional
+    :param int quantity: Quantidade de registros por página.
+    :param int page: Página do retorno.
+    :param index: Indice consultado, por padrão 'orders'.
+    :type index: str, optional
+    :raises QueryMalformedException: Se algum dos campos não existir.
+    :return: Pedidos encontrados e total de registros no formato
+    `{"value": int, "relation": "eq" | "gte"}`.
+    :rtype: tuple
+    """
+    includes, excludes = _source_filter(fields)
+    hits, total = await Order().search(
+        text,
+        SEARCH_FIELDS,
+        query={
+            "user_id": str(user_id) if user_id else None,
+            "created_at": {
+                "gte": created_from.isoformat() if created_from else None,
+                "lte": created_to.isoformat() if created_to else None,
+            },
+        },
+        quantity=quantity,
+        page=page,
+        index=index,
+        routing=user_routing(user_id),
+        includes=includes,
+        excludes=excludes,
+        highlight=["item_description"],
+    )
+    orders = [
+        {
+            "id": hit.get("_id"),
+            "score": hit.get("_score"),
+            **hit.get("_source", dict()),
+            "highlight": hit.get("highlight", dict()),
+        }
+        for hit in hits
+    ]
+    return orders, total
+
+
+async def export_orders(user_id: int = None, index: str = "orders"):
+    """
+    Exporta todos os pedidos da base, filtrando ou não por usuário, no formato
+    NDJSON (um pedido em JSON por linha). A existência do usuário é verificada antes
+    da exportação começar e os pedidos são lidos do elasticsearch em lotes, ver
+    :meth:`database.Database.scan`, assim o consumo de memória não depende da
+    quantidade de pedidos exportados.
+
+    :param user_id: Filtro dos pedidos a partir do id do usuário.
+    :type user_id: int, optional
+    :param index: Indice consultado, por padrão no índice 'orders'.
+    :type index: str, optional
+    :raises UserNotFoundException: Se o usuário informado não existir.
+    :return: Generator assíncrono com um bloco de linhas NDJSON por lote.
+    :rtype: async_generator
     """
     query = None
     if user_id:
-        get_user_by_id(user_id)
+        await get_user(user_id)
         query = {"user_id": str(user_id)}
-    orders, total = Order().list_all(
+    batches = Order().scan(
         query=query,
-        quantity=quantity,
-        page=page,
+        batch_size=envs.DB_EXPORT_BATCH_SIZE,
         index=index,
-        doc_type=doc_type,
+        routing=user_routing(user_id),
+    )
+    return (
+        "".join(
+            json.dumps({"id": hit.get("_id"), **hit.get("_source")}) + "\n"
+            for hit in hits
+        )
+        async for hits in batches
     )
-    logger.debug(orders)
-    logger.debug(total)
-    return _format_orders(orders), total
@@ -0,0 +1,366 @@
+import os
+import time
+import socket
+import asyncio
+from datetime import datetime, timezone
+from collections import defaultdict
+
+from loguru import logger
+from redis.exceptions import ResponseError
+
+from order_api.config import envs
+from order_api.services import metrics
+from order_api.services.redis import redis
+from order_api.database import build_query, user_routing
+from order_api.database.order import Order
+from order_api.services.user import get_users_by_ids
+from order_api.exceptions import OrderApiException
+
+_task = None
+
+
+def _snapshot(user: dict) -> dict:
+    """
+    Cópia dos dados do usuário gravada nos pedidos do modelo de leitura, apenas com
+    os campos `READ_MODEL_USER_FIELDS`. Os dados pessoais sensíveis do usuário
+    (cpf, e-mail e telefone) não são copiados para o elasticsearch por padrão.
+    """
+    if user is None:
+        return None
+    return {field: user.get(field) for field in envs.READ_MODEL_USER_FIELDS}
+
+
+# Grava um pedido que já existe no modelo de leitura mantendo a cópia do usuário
+# já gravada quando ela é mais recente que a do novo documento.
+MERGE_ORDER_SCRIPT = """
+boolean newer = ctx._source.user_synced_at == null
+    || params.document.user_synced_at >= ctx._source.user_synced_at;
+for (entry in params.document.entrySet()) {
+    String field = entry.getKey();
+    if (newer || (field != 'user' && field != 'user_synced_at')) {
+        ctx._source[field] = entry.getValue();
+    }
+}
+"""
+
+PROJECT_USER_SCRIPT = """
+if (ctx._source.user_synced_at != null
+        && ctx._source.user_synced_at > params.synced_at) {
+    ctx.op = 'noop';
+} else {
+    ctx._source.user = params.user;
+    ctx._source.user_synced_at = params.synced_at;
+}
+"""
+
+
+def _synced_at(user: dict, removed_at: float = 0) -> int:
+    """
+    Versão da cópia dos dados do usuário, gravada em `user_synced_at`: a data da
+    última alteração do usuário no user-api, em milissegundos, e não a data da
+    gravação no modelo de leitura. Assim uma cópia lida do cache antes de uma
+    alteração nunca substitui a cópia gravada a partir do evento da alteração, ver
+    :func:`project_orders` e :func:`project_users`.
+
+    :param dict user: Dados do usuário, None se o usuário não existe ou não pôde ser
+    consultado.
+    :param removed_at: Timestamp da remoção do usuário, usado quando `user` é None.
+    Sem ele uma cópia vazia é sempre mais antiga que as demais.
+    :type removed_at: float, optional
+    :rtype: int
+    """
+    if user is None:
+        return int(removed_at * 1000)
+    try:
+        changed_at = datetime.fromisoformat(
+            user.get("updated_at") or user.get("created_at")
+        )
+    except (TypeError, ValueError):
+        return 0
+    if changed_at.tzinfo is None:
+        changed_at = changed_at.replace(tzinfo=timezone.utc)
+    return int(changed_at.timestamp() * 1000)
+
+
+def _document(order: dict, user: dict) -> dict:
+    return {**order, "user": _snapshot(user), "user_synced_at": _synced_at(user)}
+
+
+async def project_orders(orders: list, users: dict, replace: bool = False):
+    """
+    Grava pedidos no modelo de leitura `READ_MODEL_INDEX`, cada um com uma cópia
+    dos dados do seu usuário. Deve ser chamado depois de gravar os pedidos no índice
+    principal. Uma falha é apenas registrada no log, pois o pedido já foi gravado,
+    e o modelo de leitura pode ser reconstruído com o comando
+    `python -m order_api.commands.read_model`.
+
+    Os dados do usuário vêm do cache e podem ser mais antigos que a cópia gravada
+    por :func:`project_users` em paralelo, por isso um pedido que já existe mantém
+    a cópia mais recente do usuário, ver :func:`_synced_at`.
+
+    :param list orders: Lista de tuplas (id, pedido).
+    :param dict users: Dicionário no formato id do usuário: dados do usuário.
+    :param replace: Substitui os documentos inteiros, inclusive a cópia do usuário,
+    usado na reconstrução do modelo de leitura.
+    :type replace: bool, optional
+    """
+    if not envs.READ_MODEL_ENABLED or not orders:
+        return
+    documents = [
+        (id, _document(order, users.get(str(order.get("user_id")))))
+        for id, order in orders
+    ]
+    try:
+        results = await Order().bulk_insert(
+            documents,
+            index=envs.READ_MODEL_INDEX,
+            overwrite=True,
+            routing_field="user_id" if envs.DB_ROUTING_BY_USER else None,
+            merge_script=None if replace else MERGE_ORDER_SCRIPT,
+        )
+    except Exception as error:
+        results = [{"error": str(error)}]
+    errors = [result for result in results if result.get("error")]
+    if errors:
+        metrics.incr("read_model_errors", len(errors))
+        logger.error(f"Falha ao projetar pedidos no modelo de leitura: {errors}")
+
+
+async def remove_order(id: str, routing: str = None):
+    """
+    Remove um pedido do modelo de leitura `READ_MODEL_INDEX`.
+
+    :param str id: Id do pedido.
+    :param routing: Routing do pedido, ver :func:`database.user_routing`.
+    :type routing: str, optional
+    """
+    if not envs.READ_MODEL_ENABLED:
+        return
+    try:
+        await Order().delete(id, index=envs.READ_MODEL_INDEX, routing=routing)
+    except OrderApiException:
+        pass
+    except Exception as error:
+        metrics.incr("read_model_errors")
+        logger.error(f"Falha ao remover o pedido {id} do modelo de leitura: {error}")
+
+
+async def project_users(ids_user: list, published_at: float):
+    """
+    Atualiza a cópia dos dados dos usuários em todos os seus pedidos do modelo de
+    leitura. Os dados são consultados diretamente no microsserviço user-api, sem
+    passar pelo cache, e os usuários removidos ficam sem dados nos pedidos. Um
+    pedido com uma cópia mais recente do usuário, ver :func:`_synced_at`, não é
+    alterado. Um conflito de versão com uma gravação em paralelo interrompe a
+    atualização, que é repetida na próxima entrega dos eventos.
+
+    O atraso entre a publicação do evento pelo user-api e o fim da atualização é
+    exposto no indicador `read_model_lag_seconds`.
+
+    :param list ids_user: Ids dos usuários alterados, no máximo
+    `USER_API_BATCH_MAX_IDS`, ver :func:`consume_user_events`.
+    :param float published_at: Timestamp da publicação do evento mais recente.
+    :raises GetUserException: Se o microsserviço user-api não estiver disponível.
+    :raises elasticsearch.exceptions.ConflictError: Se um pedido foi alterado
+    durante a atualização.
+    """
+    users, _ = await get_users_by_ids(ids_user)
+    for id_user in ids_user:
+        user = users.get(str(id_user))
+        await Order().update_by_query(
+            query=build_query({"user_id": str(id_user)}),
+            script={
+                "source": PROJECT_USER_SCRIPT,
+                "params": {
+                    "user": _snapshot(user),
+                    "synced_at": _synced_at(user, removed_at=published_at),
+                },
+            },
+            index=envs.READ_MODEL_INDEX,
+            routing=user_routing(id_user),
+            conflicts="abort",
+        )
+    metrics.incr("read_model_users_projected", len(ids_user))
+    metrics.gauge("read_model_lag_seconds", round(time.time() - published_at, 3))
+
+
+async def _dead_letter(stream: str, group: str, events: list, reason: str):
+    """
+    Move eventos que não puderam ser projetados para o stream
+    `READ_MODEL_DEAD_LETTER_STREAM`, com o id original, o motivo e a quantidade de
+    entregas, e os confirma no grupo, assim eles deixam de ser entregues. Os
+    eventos podem ser inspecionados e, depois de corrigida a causa, projetados
+    novamente com o comando `python -m order_api.commands.read_model`.
+
+    :param str stream: Stream dos eventos.
+    :param str group: Grupo de consumidores.
+    :param list events: Lista de tuplas (id do evento, campos, entregas).
+    :param str reason: Motivo.
+    """
+    async with redis.pipeline(transaction=True) as pipeline:
+        for event_id, fields, deliveries in events:
+            pipeline.xadd(
+                envs.READ_MODEL_DEAD_LETTER_STREAM,
+                {
+                    **(fields or dict()),
+                    b"event_id": event_id,
+                    b"reason": reason,
+                    b"deliveries": deliveries,
+                },
+            )
+        pipeline.xack(stream, group, *(event_id for event_id, _, _ in events))
+        await pipeline.execute()
+    metrics.incr("read_model_dead_letters", len(events))
+    logger.error(
+        f"{len(events)} eventos de usuários movidos para "
+        f"{envs.READ_MODEL_DEAD_LETTER_STREAM}: {reason}"
+    )
+
+
+async def _exhausted(stream: str, group: str, consumer: str, events: list) -> list:
+    """
+    Separa os eventos reentregues que já atingiram `READ_MODEL_MAX_DELIVERIES`
+    entregas, movendo-os para o stream de eventos mortos, ver :func:`_dead_letter`.
+
+    :param str stream: Stream dos eventos.
+    :param str group: Grupo de consumidores.
+    :param str consumer: Consumidor que assumiu os eventos.
+    :param list events: Eventos assumidos, lista de tuplas (id do evento, campos).
+    :return: Eventos que ainda podem ser projetados.
+    :rtype: list
+    """
+    pending = await redis.xpending_range(
+        stream,
+        group,
+        min=events[0][0],
+        max=events[-1][0],
+        count=2 * envs.USER_EVENTS_BATCH_SIZE,
+        consumername=consumer,
+    )
+    deliveries = {entry["message_id"]: entry["times_delivered"] for entry in pending}
+    exhausted = [
+        (event_id, fields, deliveries[event_id])
+        for event_id, fields in events
+        if deliveries.get(event_id, 0) > envs.READ_MODEL_MAX_DELIVERIES
+    ]
+    if exhausted:
+        await _dead_letter(stream, group, exhausted, "entregas esgotadas")
+    dead = {event_id for event_id, _, _ in exhausted}
+    return [(event_id, fields) for event_id, fields in events if event_id not in dead]
+
+
+async def _project_events(stream: str, group: str, events: list):
+    """
+    Projeta um lote de eventos em partes de até `USER_API_BATCH_MAX_IDS` usuários,
+    ver :func:`project_users`. Os eventos de cada parte são confirmados assim que
+    ela é projetada, assim a falha de uma parte não impede a projeção das demais e
+    apenas os eventos da parte que falhou são entregues novamente. Eventos sem id
+    do usuário são movidos para o stream de eventos mortos.
+
+    :param str stream: Stream dos eventos.
+    :param str group: Grupo de consumidores.
+    :param list events: Lista de tuplas (id do evento, campos).
+    """
+    by_user, invalid, empty = defaultdict(list), list(), list()
+    for event_id, fields in events:
+        if not fields:
+            empty.append(event_id)
+        elif fields.get(b"id_user") is None:
+            invalid.append((event_id, fields, 1))
+        else:
+            by_user[fields[b"id_user"].decode()].append((event_id, fields))
+    if empty:
+        await redis.xack(stream, group, *empty)
+    if invalid:
+        await _dead_letter(stream, group, invalid, "evento inválido")
+
+    ids_user, size = list(by_user), envs.USER_API_BATCH_MAX_IDS
+    for start in range(0, len(ids_user), size):
+        chunk = [
+            event
+            for id_user in ids_user[start : start + size]
+            for event in by_user[id_user]
+        ]
+        try:
+            await project_users(
+                ids_user[start : start + size],
+                max(float(fields.get(b"at") or 0) for _, fields in chunk),
+            )
+        except Exception as error:
+            metrics.incr("read_model_errors")
+            logger.error(f"Falha ao projetar os eventos de usuários: {error}")
+            continue
+        await redis.xack(stream, group, *(event_id for event_id, _ in chunk))
+
+
+async def consume_user_events():
+    """
+    Projeta os eventos de usuários do stream `USER_EVENTS_STREAM` no modelo de
+    leitura, ver :func:`project_users`. Diferente da invalidação de cache, cada
+    evento precisa ser projetado uma única vez, por isso os workers formam o grupo
+    de consumidores `READ_MODEL_CONSUMER_GROUP` e cada evento é entregue a apenas
+    um deles. O evento só é confirmado (`XACK`) depois de projetado; eventos não
+    confirmados por mais de `READ_MODEL_CLAIM_IDLE_MS` milissegundos, por falha ou
+    queda de um worker, são assumidos por outro worker. Um evento entregue mais de
+    `READ_MODEL_MAX_DELIVERIES` vezes é movido para o stream
+    `READ_MODEL_DEAD_LETTER_STREAM` em vez de ser projetado novamente.
+    """
+    stream, group = envs.USER_EVENTS_STREAM, envs.READ_MODEL_CONSUMER_GROUP
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    group_created = False
+    while True:
+        try:
+            if not group_created:
+                try:
+                    await redis.xgroup_create(stream, group, id="$", mkstream=True)
+                except ResponseError as error:
+                    if "BUSYGROUP" not in str(error):
+                        raise
+                group_created = True
+            _, events, *_ = await redis.xautoclaim(
+                stream,
+                group,
+                consumer,
+                min_idle_time=envs.READ_MODEL_CLAIM_IDLE_MS,
+                count=envs.USER_EVENTS_BATCH_SIZE,
+            )
+            if events:
+                events = await _exhausted(stream, group, consumer, events)
+            if not events:
+                response = await redis.xreadgroup(
+                    group,
+                    consumer,
+                    {stream: ">"},
+                    count=envs.USER_EVENTS_BATCH_SIZE,
+                    block=envs.USER_EVENTS_BLOCK_MS,
+                )
+                events = [event for _, entries in response for event in entries]
+            if events:
+                await _project_events(stream, group, events)
+        except Exception as error:
+            metrics.incr("read_model_errors")
+            logger.error(f"Falha ao projetar os eventos de usuários: {error}")
+            await asyncio.sleep(envs.USER_EVENTS_RETRY_INTERVAL)
+
+
+def start():
+    """
+    Inicia o projetor do modelo de leitura em uma task do event loop do worker.
+    """
+    global _task
+    if envs.READ_MODEL_ENABLED and _task is None:
+        _task = asyncio.get_running_loop().create_task(consume_user_events())
+
+
+async def stop():
+    """
+    Encerra o projetor do modelo de leitura.
+    """
+    global _task
+    task, _task = _task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,197 @@
+import json
+import hashlib
+from datetime import datetime
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from order_api.config import envs
+from order_api.services import metrics
+from order_api.services.redis import redis
+from order_api.database.order import Order
+from order_api.database import user_routing
+
+METRICS = {
+    "total_value_sum": {"sum": {"field": "total_value"}},
+    "total_value_avg": {"avg": {"field": "total_value"}},
+    "item_quantity_sum": {"sum": {"field": "item_quantity"}},
+}
+
+
+def _filters(user_id: int, created_from: datetime, created_to: datetime) -> dict:
+    return {
+        "user_id": str(user_id) if user_id else None,
+        "created_at": {
+            "gte": created_from.isoformat() if created_from else None,
+            "lte": created_to.isoformat() if created_to else None,
+        },
+    }
+
+
+def _metrics(bucket: dict, count: int) -> dict:
+    return {
+        "count": count,
+        "total_value_sum": round(bucket["total_value_sum"]["value"] or 0, 2),
+        "total_value_avg": round(bucket["total_value_avg"]["value"] or 0, 2),
+        "item_quantity_sum": int(bucket["item_quantity_sum"]["value"] or 0),
+    }
+
+
+async def _cached(name: str, params: dict, compute):
+    """
+    Devolve o resultado de uma estatística do cache do redis ou, se ausente,
+    calcula e grava o resultado por `ORDER_STATS_CACHE_TTL` segundos. A chave é
+    formada pelo nome da estatística e por um hash dos parâmetros. Se o redis não
+    estiver disponível a estatística é calculada sem cache.
+
+    :param str name: Nome da estatística.
+    :param dict params: Parâmetros da estatística.
+    :param compute: Função assíncrona, sem parâmetros, que calcula a estatística.
+    :return: Resultado da estatística.
+    :rtype: dict
+    """
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode())
+    key = f"{envs.ORDER_STATS_CACHE_PREFIX}{name}:{digest.hexdigest()}"
+    try:
+        cached = await redis.get(key)
+    except RedisError as error:
+        logger.error(f"Falha ao consultar o cache de estatísticas: {error}")
+        cached = None
+    if cached is not None:
+        metrics.incr("order_stats_cache_hits")
+        return json.loads(cached)
+    metrics.incr("order_stats_cache_misses")
+    result = await compute()
+    try:
+        await redis.set(key, json.dumps(result), ex=envs.ORDER_STATS_CACHE_TTL)
+    except RedisError as error:
+        logger.error(f"Falha ao gravar o cache de estatísticas: {error}")
+    return result
+
+
+async def summary(
+    user_id: int = None,
+    created_from: datetime = None,
+    created_to: datetime = None,
+    index: str = "orders",
+) -> dict:
+    """
+    Quantidade de pedidos, soma e média do valor total e soma da quantidade de itens
+    dos pedidos, filtrando ou não por usuário e período de criação.
+
+    :param user_id: Filtro dos pedidos a partir do id do usuário.
+    :type user_id: int, optional
+    :param created_from: Data de criação mínima dos pedidos.
+    :type created_from: datetime, optional
+    :param created_to: Data de criação máxima dos pedidos.
+    :type created_to: datetime, optional
+    :param index: Indice consultado, por padrão 'orders'.
+    :type index: str, optional
+    :return: Estatísticas dos pedidos.
+    :rtype: dict
+    """
+    query = _filters(user_id, created_from, created_to)
+
+    async def compute():
+        aggs, total = await Order().aggregate(
+            METRICS, query=query, index=index, routing=user_routing(user_id)
+        )
+        return _metrics(aggs, total)
+
+    return await _cached("summary", {"index": index, **query}, compute)
+
+
+async def by_user(
+    created_from: datetime = None,
+    created_to: datetime = None,
+    size: int = 10,
+    index: str = "orders",
+) -> list:
+    """
+    Estatísticas dos usuários com mais pedidos, ver :func:`summary`, ordenadas pela
+    quantidade de pedidos.
+
+    :param created_from: Data de criação mínima dos pedidos.
+    :type created_from: datetime, optional
+    :param created_to: Data de criação máxima dos pedidos.
+    :type created_to: datetime, optional
+    :param size: Quantidade de usuários, limitada a `ORDER_STATS_MAX_USERS`.
+    :type size: int, optional
+    :param index: Indice consultado, por padrão 'orders'.
+    :type index: str, optional
+    :return: Estatísticas de cada usuário.
+    :rtype: list
+    """
+    query = _filters(None, created_from, created_to)
+    size = min(size, envs.ORDER_STATS_MAX_USERS)
+
+    async def compute():
+        aggs, _ = await Order().aggregate(
+            {
+                "users": {
+                    "terms": {"field": "user_id", "size": size},
+                    "aggs": METRICS,
+                }
+            },
+            query=query,
+            index=index,
+        )
+        return [
+            {"user_id": bucket["key"], **_metrics(bucket, bucket["doc_count"])}
+            for bucket in aggs["users"]["buckets"]
+        ]
+
+    return await _cached("users", {"index": index, "size": size, **query}, compute)
+
+
+async def histogram(
+    interval: str = "day",
+    user_id: int = None,
+    created_from: datetime = None,
+    created_to: datetime = None,
+    index: str = "orders",
+) -> list:
+    """
+    Estatísticas dos pedidos por período de criação, ver :func:`summary`. Períodos
+    sem pedidos não são devolvidos.
+
+    :param interval: Tamanho do período: 'day', 'week' ou 'month'.
+    :type interval: str, optional
+    :param user_id: Filtro dos pedidos a partir do id do usuário.
+    :type user_id: int, optional
+    :param created_from: Data de criação mínima dos pedidos.
+    :type created_from: datetime, optional
+    :param created_to: Data de criação máxima dos pedidos.
+    :type created_to: datetime, optional
+    :param index: Indice consultado, por padrão 'orders'.
+    :type index: str, optional
+    :return: Estatísticas de cada período, do mais antigo ao mais recente.
+    :rtype: list
+    """
+    query = _filters(user_id, created_from, created_to)
+
+    async def compute():
+        aggs, _ = await Order().aggregate(
+            {
+                "periods": {
+                    "date_histogram": {
+                        "field": "created_at",
+                        "calendar_interval": interval,
+                        "format": "yyyy-MM-dd",
+                        "min_doc_count": 1,
+                    },
+                    "aggs": METRICS,
+                }
+            },
+            query=query,
+            index=index,
+            routing=user_routing(user_id),
+        )
+        return [
+            {"date": bucket["key_as_string"], **_metrics(bucket, bucket["doc_count"])}
+            for bucket in aggs["periods"]["buckets"]
+        ]
+
+    return await _cached(
+        "histogram", {"index": index, "interval": interval, **query}, compute
+    )
@@ -0,0 +1,33 @@
+"""
+Reconstrói os contadores de pedidos dos usuários a partir do índice de pedidos,
+ver :mod:`business.counters`. Deve ser executado ao habilitar os contadores e
+sempre que eles divergirem do índice, por exemplo após uma falha do redis.
+
+Uso::
+
+    python -m order_api.commands.counters
+"""
+
+import asyncio
+
+from loguru import logger
+
+from order_api.config import envs
+from order_api.services.redis import redis
+from order_api.business import counters
+from order_api.database import connect, disconnect
+
+
+async def main():
+    connect()
+    try:
+        total = await counters.rebuild()
+        logger.info(f"Contadores de {total} usuários reconstruídos")
+    finally:
+        await disconnect()
+        await redis.aclose()
+
+
+if __name__ == "__main__":
+    envs.ORDER_COUNTERS_ENABLED = True
+    asyncio.run(main())
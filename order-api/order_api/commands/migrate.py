@@ -0,0 +1,40 @@
+"""
+Migra os índices de pedidos para a versão atual do mapeamento, ver
+:mod:`database.indices`. Deve ser executado sempre que o mapeamento mudar e na
+primeira execução sobre um índice antigo criado com mapeamento dinâmico. Para
+habilitar ou desabilitar o routing por usuário (`DB_ROUTING_BY_USER`) a migração
+deve ser executada com a nova configuração e uma nova versão, antes de alterar a
+configuração da aplicação::
+
+    DB_ROUTING_BY_USER=true python -m order_api.commands.migrate --version 2
+
+Uso::
+
+    python -m order_api.commands.migrate [--alias orders] [--version 1]
+"""
+
+import asyncio
+import argparse
+
+from order_api.database import connect, disconnect, indices
+
+
+async def main(aliases: list, version: int):
+    connect()
+    try:
+        for alias in aliases:
+            await indices.migrate(alias, version)
+    finally:
+        await disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--alias",
+        action="append",
+        help="Alias a migrar, por padrão todos os índices gerenciados",
+    )
+    parser.add_argument("--version", type=int, default=indices.VERSION)
+    args = parser.parse_args()
+    asyncio.run(main(args.alias or indices.aliases(), args.version))
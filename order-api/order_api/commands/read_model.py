@@ -0,0 +1,61 @@
+"""
+Reconstrói o modelo de leitura `READ_MODEL_INDEX` a partir do índice principal de
+pedidos, ver :mod:`business.read_model`. Deve ser executado ao habilitar o modelo
+de leitura, sempre que ele divergir do índice principal e ao alterar
+`READ_MODEL_USER_FIELDS`. Os documentos são substituídos inteiros, inclusive a
+cópia dos dados do usuário.
+
+Uso::
+
+    python -m order_api.commands.read_model
+"""
+
+import asyncio
+
+from loguru import logger
+
+from order_api.config import envs
+from order_api.services import user
+from order_api.services.redis import redis
+from order_api.database.order import Order
+from order_api.business import read_model
+from order_api.services.cache import find_users_in_batches
+from order_api.database import connect, disconnect
+
+
+async def rebuild(index: str = "orders") -> int:
+    """
+    Percorre todos os pedidos do índice principal e grava cada lote no modelo de
+    leitura com os dados atuais dos seus usuários.
+
+    :param index: Indice principal dos pedidos, por padrão 'orders'.
+    :type index: str, optional
+    :return: Quantidade de pedidos projetados.
+    :rtype: int
+    """
+    total = 0
+    async for hits in Order().scan(batch_size=envs.DB_EXPORT_BATCH_SIZE, index=index):
+        users, _ = await find_users_in_batches(
+            {hit["_source"].get("user_id") for hit in hits}
+        )
+        await read_model.project_orders(
+            [(hit.get("_id"), hit.get("_source")) for hit in hits], users, replace=True
+        )
+        total += len(hits)
+        logger.info(f"{total} pedidos projetados em {envs.READ_MODEL_INDEX}")
+    return total
+
+
+async def main():
+    connect()
+    try:
+        await rebuild()
+    finally:
+        await disconnect()
+        await user.close()
+        await redis.aclose()
+
+
+if __name__ == "__main__":
+    envs.READ_MODEL_ENABLED = True
+    asyncio.run(main())
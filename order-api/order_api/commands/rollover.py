@@ -0,0 +1,36 @@
+"""
+Avalia as condições de rotação do índice de pedidos e, se alguma delas foi
+atingida, cria uma nova geração, ver :func:`database.indices.rollover`. Pode ser
+agendado no cron quando a avaliação periódica da aplicação estiver desabilitada
+(`DB_ROLLOVER_INTERVAL=0`).
+
+Uso::
+
+    python -m order_api.commands.rollover [--dry-run]
+"""
+
+import asyncio
+import argparse
+
+from loguru import logger
+
+from order_api.database import connect, disconnect, indices
+
+
+async def main(dry_run: bool):
+    connect()
+    try:
+        response = await indices.rollover(dry_run=dry_run)
+        logger.info(
+            f"{response.get('old_index')} -> {response.get('new_index')}: "
+            f"{response.get('conditions')}"
+        )
+    finally:
+        await disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run))
@@ -1,6 +1,6 @@
 import os
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseSettings
 
@@ -14,10 +14,70 @@ class Envs(BaseSettings):
     DB_USER: str = "orderapi"
     DB_PASS: str = "orderapi"
     DB_HOST: str = "db_orders"
-    DB_PORT: str = 9200
+    DB_PORT: int = 9200
+    DB_POOL_MAXSIZE: int = 100
+    DB_KEEP_ALIVE: bool = True
+    DB_TIMEOUT: int = 10
+    DB_RETRY_ON_TIMEOUT: bool = True
+    DB_MAX_RETRIES: int = 3
+    DB_PIT_KEEP_ALIVE: str = "1m"
+    DB_EXPORT_BATCH_SIZE: int = 1000
+    DB_TRACK_TOTAL_HITS_UP_TO: Optional[int] = None
+    DB_BULK_CHUNK_SIZE: int = 500
+    DB_BULK_CONCURRENCY: int = 4
+    DB_MIGRATION_TIMEOUT: int = 3600
+    DB_ROUTING_BY_USER: bool = False
+    DB_UPDATE_RETRY_ON_CONFLICT: int = 3
+    DB_STARTUP_ATTEMPTS: int = 5
+    DB_STARTUP_RETRY_INTERVAL: float = 2
+    DB_ROLLOVER_ENABLED: bool = False
+    DB_ROLLOVER_MAX_AGE: Optional[str] = "30d"
+    DB_ROLLOVER_MAX_SIZE: Optional[str] = "50gb"
+    DB_ROLLOVER_MAX_DOCS: Optional[int] = None
+    DB_ROLLOVER_INTERVAL: int = 3600
     ENVIRONMENT: Optional[Enum] = EnvironmentEnum.PROD
     USER_API_ADDRESS: str = "http://user_api:7000"
+    USER_API_POOL_MAXSIZE: int = 100
+    USER_API_KEEPALIVE_EXPIRY: float = 30
+    USER_API_CONNECT_TIMEOUT: float = 1
+    USER_API_READ_TIMEOUT: float = 2
+    USER_API_POOL_TIMEOUT: float = 1
+    USER_API_MAX_RETRIES: int = 2
+    USER_API_RETRY_BACKOFF: float = 0.05
+    USER_API_BREAKER_FAILURE_THRESHOLD: int = 5
+    USER_API_BREAKER_RECOVERY_TIMEOUT: float = 30
+    USER_API_BREAKER_SLOW_CALL: float = 1
+    USER_API_BATCH_MAX_IDS: int = 100
     REDIS_URL = os.getenv("REDIS_URL", "redis")
+    USER_CACHE_PREFIX: str = "user:"
+    USER_CACHE_TTL: int = 7 * 24 * 3600
+    USER_CACHE_NOT_FOUND_TTL: int = 30
+    USER_CACHE_VERSION_PREFIX: str = "user-version:"
+    USER_LOCAL_CACHE_MAX_ENTRIES: int = 10000
+    USER_LOCAL_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    USER_LOCAL_CACHE_TTL: float = 300
+    USER_EVENTS_ENABLED: bool = True
+    USER_EVENTS_STREAM: str = "user-events"
+    USER_EVENTS_BATCH_SIZE: int = 500
+    USER_EVENTS_BLOCK_MS: int = 5000
+    USER_EVENTS_RETRY_INTERVAL: float = 1
+    READ_MODEL_ENABLED: bool = False
+    READ_MODEL_INDEX: str = "orders_enriched"
+    READ_MODEL_CONSUMER_GROUP: str = "orders-enriched-projector"
+    READ_MODEL_CLAIM_IDLE_MS: int = 60000
+    READ_MODEL_MAX_DELIVERIES: int = 5
+    READ_MODEL_DEAD_LETTER_STREAM: str = "user-events-dead-letter"
+    READ_MODEL_USER_FIELDS: List[str] = ["id_user", "name", "created_at", "updated_at"]
+    ORDER_STATS_CACHE_PREFIX: str = "order-stats:"
+    ORDER_STATS_CACHE_TTL: int = 60
+    ORDER_STATS_MAX_USERS: int = 100
+    ORDER_COUNTERS_ENABLED: bool = False
+    ORDER_COUNTERS_PREFIX: str = "order-counters:"
+    ORDER_COUNTERS_READY_KEY: str = "order-counters-ready"
+    ORDER_MGET_MAX_IDS: int = 100
+    ORDER_ID_WORKER_ID: Optional[int] = None
+    ORDER_ID_WORKER_KEY: str = "order-ids:worker"
+    ORDER_ID_WORKER_LEASE_TTL: int = 60
 
     class Config:
         case_sensitive = True
@@ -1,19 +1,171 @@
 import abc
-from uuid import uuid4
+import json
+import base64
+import binascii
+import asyncio
+import threading
+from typing import AsyncGenerator
 
 import elasticsearch
 from loguru import logger
-from elasticsearch import Elasticsearch
+from elasticsearch import AsyncElasticsearch, helpers
 
 from order_api.config import envs
+from order_api.services.ids import new_id
 
 from order_api.exceptions import ErrorDetails
 from order_api.exceptions.order import (
     OrderAlreadyInsertedException,
     OrderNotFoundException,
     UpdateOrderException,
+    OrderConflictException,
 )
-from order_api.exceptions.database import QueryMalformedException
+from order_api.exceptions.database import (
+    QueryMalformedException,
+    InvalidCursorException,
+    DatabaseException,
+)
+
+CURSOR_START = "*"
+DEFAULT_SORT = [{"created_at": {"order": "desc"}}]
+
+_es = None
+_es_lock = threading.Lock()
+
+
+def connect() -> AsyncElasticsearch:
+    """
+    Cria, caso ainda não exista, o cliente assíncrono do elasticsearch compartilhado
+    por todo o processo. O cliente mantém um pool de conexões persistentes com o
+    banco de dados, evitando abrir uma nova conexão TCP a cada requisição, e não
+    bloqueia o event loop enquanto aguarda as respostas. Os parâmetros do pool são
+    capturados de variáveis de ambientes exportadas no arquivo
+    order-api/order_api/config.py.
+
+    :return: Cliente do elasticsearch.
+    :rtype: :class:`AsyncElasticsearch`
+    """
+    global _es
+    if _es is None:
+        with _es_lock:
+            if _es is None:
+                _es = AsyncElasticsearch(
+                    [{"host": envs.DB_HOST, "port": envs.DB_PORT}],
+                    maxsize=envs.DB_POOL_MAXSIZE,
+                    timeout=envs.DB_TIMEOUT,
+                    retry_on_timeout=envs.DB_RETRY_ON_TIMEOUT,
+                    max_retries=envs.DB_MAX_RETRIES,
+                    headers={
+                        "connection": "keep-alive" if envs.DB_KEEP_ALIVE else "close"
+                    },
+                )
+                logger.info(
+                    f"Pool de conexões com o banco de dados {envs.DB_HOST} {envs.DB_PORT} criado"
+                )
+    return _es
+
+
+async def disconnect():
+    """
+    Fecha todas as conexões do pool do cliente compartilhado do elasticsearch.
+    """
+    global _es
+    with _es_lock:
+        es, _es = _es, None
+    if es is not None:
+        await es.close()
+
+
+def _track_total_hits():
+    """
+    Valor do parâmetro `track_total_hits` das buscas, que faz o elasticsearch
+    devolver o total de registros na própria busca, sem uma requisição de `count`.
+    Com `DB_TRACK_TOTAL_HITS_UP_TO` configurado a contagem para nesse limite, o que
+    mantém as buscas baratas em índices muito grandes. O total é devolvido no
+    formato `{"value": int, "relation": "eq" | "gte"}`, em que "eq" indica um total
+    exato e "gte" indica um limite inferior.
+    """
+    return envs.DB_TRACK_TOTAL_HITS_UP_TO or True
+
+
+def build_query(filters: dict = None) -> dict:
+    """
+    Monta a query de uma busca a partir de filtros estruturados. Cada filtro vira
+    uma cláusula do contexto de filtro (`bool.filter`) do elasticsearch, que não
+    calcula relevância e pode ser mantida no cache de filtros, diferente da query
+    `match`:
+
+    - um valor simples vira um filtro `term`, por exemplo `{"user_id": "1"}`;
+    - uma lista vira um filtro `terms`, por exemplo `{"user_id": ["1", "2"]}`;
+    - um dicionário com as chaves `gt`, `gte`, `lt` ou `lte` vira um filtro
+      `range`, por exemplo `{"total_value": {"gte": 10}}`.
+
+    Filtros com valor None são ignorados.
+
+    :param filters: Filtros no formato campo: valor.
+    :type filters: dict, optional
+    :return: Query no formato aceito pela api do elasticsearch.
+    :rtype: dict
+    """
+    clauses = list()
+    for field, value in (filters or dict()).items():
+        if isinstance(value, dict):
+            bounds = {op: bound for op, bound in value.items() if bound is not None}
+            if bounds:
+                clauses.append({"range": {field: bounds}})
+        elif isinstance(value, (list, tuple, set)):
+            clauses.append({"terms": {field: list(value)}})
+        elif value is not None:
+            clauses.append({"term": {field: value}})
+    if not clauses:
+        return {"match_all": {}}
+    return {"bool": {"filter": clauses}}
+
+
+def user_routing(user_id) -> str:
+    """
+    Routing dos documentos de um usuário. Com `DB_ROUTING_BY_USER` habilitado os
+    pedidos são gravados no shard definido pelo id do usuário, assim as consultas
+    dos pedidos de um usuário acessam um único shard em vez de todos. Os índices
+    existentes precisam ser migrados ao mudar a configuração, ver
+    :func:`database.indices.migrate`.
+
+    :param user_id: Id do usuário.
+    :return: Routing dos documentos do usuário, ou None quando desabilitado.
+    :rtype: str
+    """
+    if envs.DB_ROUTING_BY_USER and user_id is not None:
+        return str(user_id)
+    return None
+
+
+def write_alias(index: str) -> str:
+    """
+    Alias usado nas escritas de novos documentos. Com `DB_ROLLOVER_ENABLED` o índice
+    de pedidos é dividido em gerações e os novos pedidos são gravados apenas na
+    geração atual, pelo alias `<índice>-write`, ver :mod:`database.indices`.
+
+    :param str index: Alias de leitura do índice, também aceito como
+    :class:`models.order.IndexType`.
+    :return: Alias de escrita do índice.
+    :rtype: str
+    """
+    index = getattr(index, "value", index)
+    if envs.DB_ROLLOVER_ENABLED and index == "orders":
+        return f"{index}-write"
+    return index
+
+
+def _pre_filter_shard_size(query: dict = None):
+    """
+    Com filtros de período (`range`) o elasticsearch descarta, antes da busca, os
+    shards cujos documentos estão fora do período, o que evita consultar as
+    gerações antigas do índice de pedidos. Por padrão essa etapa só é feita em
+    buscas com mais de 128 shards.
+    """
+    if query and any(isinstance(value, dict) for value in query.values()):
+        return 1
+    return None
 
 
 class Database:
@@ -29,72 +181,76 @@ class Database:
     comuns a todas as tabelas do banco de dados: insert, list_one, list_all etc.
     """
 
-    def __connect(self):
+    @property
+    def __es(self) -> AsyncElasticsearch:
         """
-        Efetua a conexão com o banco de dados, os dados de conexão são capturados
-        de variáveis de ambientes exportadas no arquivo order-api/order_api/config.py.
-        Cria o atributo __es da classe :class:`Elasticsearch` para manipular o elasticsearch.
-        :raises ConnectionError: Se não for possível a conexão com o banco de dados.
+        Cliente do elasticsearch compartilhado pelo processo, ver :func:`connect`.
         """
-        try:
-            self.__es = Elasticsearch([{"host": envs.DB_HOST, "port": envs.DB_PORT}])
-        except elasticsearch.exceptions.ConnectionError as error:
-            logger.error(
-                f"Falha na conexão com o banco de dados {envs.DB_HOST} {envs.DB_PORT}: {error}"
-            )
+        return connect()
 
-    def __disconnect(self):
-        """
-        Fecha a conexão com o banco de dados.
-        """
-        self.__es.close()
-
-    def create_index_if_not_exists(self, index: str):
+    async def create_index_if_not_exists(self, index: str):
         """
         Cria um novo índice, caso não exista, ignorando a existência de um mesmo
         índice com o nome informado.
         :param str index: Nome do índice que será criado.
         """
-        self.__connect()
         try:
-            self.__es.indices.create(index=index)
+            await self.__es.indices.create(index=index)
         except elasticsearch.exceptions.RequestError as ex:
             if ex.error == "resource_already_exists_exception":
                 pass
             else:
                 logger.error(f"Falha na criação do índice {index}: {ex}")
-        self.__disconnect()
 
-    def insert(
+    async def insert(
         self,
         document: dict,
-        id: str = str(uuid4()),
+        id: str = None,
         index: str = "orders",
         doc_type: str = "order",
+        routing: str = None,
     ) -> dict:
         """
         Insere um novo documento no elasticsearch.
 
         :param dict document: Instância do document type com os dados que serão
         incluídos, no formato dict.
-        :param id: Id do novo documento, uuid caso não seja informado.
+        :param id: Id do novo documento, gerado pela aplicação caso não seja
+        informado, ver :func:`services.ids.new_id`.
         :type id: str, optional
         :param index: Indice no qual o documento será inserido, por padrão no índice
         'orders'.
         :type index: str, optional
-        :param doc_type: Document type do documento inserido, por padrão 'order'.
+        :param doc_type: Ignorado, mantido por compatibilidade. Os índices usam o
+        tipo único `_doc`, ver :mod:`database.indices`.
         :type doc_type: str, optional
+        :param routing: Routing do documento, ver :func:`user_routing`.
+        :type routing: str, optional
         :raises OrderAlreadyInsertedException: Caso o id informado já exista na base.
+        :raises DatabaseException: Caso o índice não exista. O índice não é criado
+        aqui, pois ele deve ser criado com os templates e aliases de
+        :mod:`database.indices`.
         :return: Response da inserção.
         :rtype: dict
         """
-        self.__connect()
+        if id is None:
+            id = new_id()
         try:
-            response = self.__es.create(
-                index=index, doc_type=doc_type, id=id, body=document
+            response = await self.__es.create(
+                index=index, id=id, body=document, routing=routing
             )
         except elasticsearch.exceptions.NotFoundError:
-            self.create_index_if_not_exists(index=index)
+            raise DatabaseException(
+                status=503,
+                error="Service Unavailable",
+                message="Índice de pedidos indisponível",
+                error_details=[
+                    ErrorDetails(
+                        message=f"O índice {index} não existe, ver "
+                        "`python -m order_api.commands.migrate`"
+                    ).to_dict()
+                ],
+            )
         except elasticsearch.exceptions.ConflictError:
             raise OrderAlreadyInsertedException(
                 status=409,
@@ -104,14 +260,110 @@ class Database:
                     ErrorDetails(message=f"O id {id} do pedido é repetido").to_dict()
                 ],
             )
-        self.__disconnect()
         return response
 
-    def list_one(
+    async def bulk_insert(
+        self,
+        documents: list,
+        index: str = "orders",
+        doc_type: str = "order",
+        overwrite: bool = False,
+        routing_field: str = None,
+        merge_script: str = None,
+    ) -> list:
+        """
+        Insere vários documentos no elasticsearch usando a api `_bulk`. Os documentos
+        são enviados em lotes de `DB_BULK_CHUNK_SIZE` documentos, com até
+        `DB_BULK_CONCURRENCY` lotes em paralelo. A falha de um documento não
+        interrompe a inserção dos demais.
+
+        :param list documents: Lista de tuplas (id, documento). Quando o id é None o
+        id do documento é gerado pela aplicação, ver :func:`services.ids.new_id`.
+        :param index: Indice no qual os documentos serão inseridos, por padrão no
+        índice 'orders'.
+        :type index: str, optional
+        :param doc_type: Ignorado, mantido por compatibilidade. Os índices usam o
+        tipo único `_doc`, ver :mod:`database.indices`.
+        :type doc_type: str, optional
+        :param overwrite: Se documentos com o mesmo id devem ser substituídos, por
+        padrão um id repetido é uma falha do documento.
+        :type overwrite: bool, optional
+        :param routing_field: Campo do documento usado como routing, ver
+        :func:`user_routing`. Por padrão os documentos não têm routing.
+        :type routing_field: str, optional
+        :param merge_script: Script painless aplicado a um documento que já existe,
+        que recebe o novo documento em `params.document`. O documento que ainda
+        não existe é inserido como informado. Ignora `overwrite`.
+        :type merge_script: str, optional
+        :return: Resultado de cada documento, na mesma ordem de `documents`, no
+        formato {"id": str, "status": int, "error": str}.
+        :rtype: list
+        """
+        semaphore = asyncio.Semaphore(envs.DB_BULK_CONCURRENCY)
+
+        def source(document: dict) -> dict:
+            if merge_script is None:
+                return {"_source": document}
+            return {
+                "script": {"source": merge_script, "params": {"document": document}},
+                "upsert": document,
+                "_retry_on_conflict": envs.DB_UPDATE_RETRY_ON_CONFLICT,
+            }
+
+        async def send(chunk: list) -> list:
+            actions = [
+                {
+                    "_op_type": (
+                        "update" if merge_script else "index" if overwrite else "create"
+                    ),
+                    "_index": index,
+                    **source(document),
+                    "_id": new_id() if id is None else id,
+                    **(
+                        {"_routing": str(document.get(routing_field))}
+                        if routing_field and document.get(routing_field) is not None
+                        else {}
+                    ),
+                }
+                for id, document in chunk
+            ]
+            results = list()
+            async with semaphore:
+                async for _, item in helpers.async_streaming_bulk(
+                    self.__es,
+                    actions,
+                    chunk_size=envs.DB_BULK_CHUNK_SIZE,
+                    raise_on_error=False,
+                    raise_on_exception=False,
+                ):
+                    _, result = item.popitem()
+                    error = result.get("error")
+                    if isinstance(error, dict):
+                        error = error.get("reason")
+                    results.append(
+                        {
+                            "id": result.get("_id"),
+                            "status": result.get("status"),
+                            "error": str(error) if error else None,
+                        }
+                    )
+            return results
+
+        size = envs.DB_BULK_CHUNK_SIZE
+        chunks = await asyncio.gather(
+            *(
+                send(documents[start : start + size])
+                for start in range(0, len(documents), size)
+            )
+        )
+        return [result for chunk in chunks for result in chunk]
+
+    async def list_one(
         self,
         id: str,
         index: str = "orders",
         doc_type: str = "order",
+        routing: str = None,
     ) -> dict:
         """
         Lista um pedido da base de dados, a partir do seu id.
@@ -120,15 +372,17 @@ class Database:
         :param index: Indice no qual o documento será inserido, por padrão no índice
         'orders'.
         :type index: str, optional
-        :param doc_type: Document type do documento inserido, por padrão 'order'.
+        :param doc_type: Ignorado, mantido por compatibilidade. Os índices usam o
+        tipo único `_doc`, ver :mod:`database.indices`.
         :type doc_type: str, optional
+        :param routing: Routing do documento, ver :func:`user_routing`.
+        :type routing: str, optional
         :raises OrderNotFoundException: O pedido não foi encontrado.
         :return: Response da busca.
         :rtype: dict
         """
-        self.__connect()
         try:
-            response = self.__es.get(index=index, id=id, doc_type=doc_type)
+            response = await self.__es.get(index=index, id=id, routing=routing)
         except elasticsearch.exceptions.NotFoundError:
             raise OrderNotFoundException(
                 status=404,
@@ -140,35 +394,114 @@ class Database:
                     ).to_dict()
                 ],
             )
-        self.__disconnect()
         return response
 
-    def update(
+    async def list_many(
+        self, ids: list, index: str = "orders", routing: str = None
+    ) -> list:
+        """
+        Lista vários pedidos da base de dados em uma única requisição `_mget`. A
+        leitura é em tempo real, como em :meth:`list_one`, e exige um índice
+        concreto ou um alias que aponte para um único índice.
+
+        :param list ids: Ids dos pedidos.
+        :param index: Indice consultado, por padrão 'orders'.
+        :type index: str, optional
+        :param routing: Routing dos documentos, ver :func:`user_routing`.
+        :type routing: str, optional
+        :return: Um documento por id, na ordem dos ids, com a chave `found`
+        indicando se o pedido foi encontrado.
+        :rtype: list
+        """
+        response = await self.__es.mget(
+            body={"ids": [str(id) for id in ids]}, index=index, routing=routing
+        )
+        return response.get("docs")
+
+    async def list_by_ids(
+        self, ids: list, index: str = "orders", routing: str = None
+    ) -> list:
+        """
+        Busca vários pedidos pelos seus ids, com uma query `ids`. Diferente de
+        :meth:`list_many`, funciona em aliases que apontam para várias gerações e
+        sem o routing dos documentos, mas só encontra os documentos já visíveis nas
+        buscas, ver :meth:`locate`.
+
+        :param list ids: Ids dos pedidos.
+        :param index: Alias de leitura dos documentos, por padrão 'orders'.
+        :type index: str, optional
+        :param routing: Routing dos documentos, se conhecido.
+        :type routing: str, optional
+        :return: Documentos encontrados, em qualquer ordem.
+        :rtype: list
+        """
+        response = await self.__es.search(
+            index=index,
+            body={"query": {"ids": {"values": [str(id) for id in ids]}}},
+            size=len(ids),
+            routing=routing,
+        )
+        return response.get("hits").get("hits")
+
+    async def update(
         self,
         doc: dict,
         id: str,
         index: str = "orders",
         doc_type: str = "order",
+        routing: str = None,
+        if_seq_no: int = None,
+        if_primary_term: int = None,
+        return_source: bool = False,
     ) -> dict:
         """
-        Atualiza um pedido.
+        Atualiza parcialmente um pedido com a api `_update`: apenas os campos
+        informados são alterados e os demais campos do documento são mantidos, sem
+        que o documento precise ser lido antes.
+
+        Com `if_seq_no` e `if_primary_term`, obtidos na leitura do pedido, a
+        atualização só é aplicada se o pedido não foi alterado desde a leitura
+        (controle de concorrência otimista). Sem eles, a atualização é repetida pelo
+        elasticsearch até `DB_UPDATE_RETRY_ON_CONFLICT` vezes em caso de conflito
+        com uma escrita simultânea.
 
         :param dict doc: Dicionário com os campos e valores a serem atualizados.
         :param str id: Id do pedido a ser atualizado.
         :param index: Indice no qual o documento será inserido, por padrão no índice
         'orders'.
         :type index: str, optional
-        :param doc_type: Document type do documento inserido, por padrão 'order'.
+        :param doc_type: Ignorado, mantido por compatibilidade. Os índices usam o
+        tipo único `_doc`, ver :mod:`database.indices`.
         :type doc_type: str, optional
+        :param routing: Routing do documento, ver :func:`user_routing`.
+        :type routing: str, optional
+        :param if_seq_no: Número de sequência do pedido lido.
+        :type if_seq_no: int, optional
+        :param if_primary_term: Termo primário do pedido lido.
+        :type if_primary_term: int, optional
+        :param return_source: Se o documento atualizado deve ser devolvido na chave
+        `get._source` do response.
+        :type return_source: bool, optional
         :raises UpdateOrderException: Quando um campo que não existe no pedido é
         informado.
         :raises OrderNotFoundException: O pedido não foi encontrado.
+        :raises OrderConflictException: O pedido foi alterado desde a leitura.
         :return: Response da atualização.
         :rtype: dict
         """
-        self.__connect()
+        if if_seq_no is not None:
+            concurrency = {"if_seq_no": if_seq_no, "if_primary_term": if_primary_term}
+        else:
+            concurrency = {"retry_on_conflict": envs.DB_UPDATE_RETRY_ON_CONFLICT}
         try:
-            response = self.__es.index(index=index, id=id, body=doc, doc_type=doc_type)
+            response = await self.__es.update(
+                index=index,
+                id=id,
+                body={"doc": doc},
+                routing=routing,
+                _source=return_source or None,
+                **concurrency,
+            )
         except elasticsearch.exceptions.RequestError as error:
             logger.error(error)
             raise UpdateOrderException(
@@ -177,6 +510,17 @@ class Database:
                 message="Campo inválido",
                 error_details=[ErrorDetails(message="O campo não existe").to_dict()],
             )
+        except elasticsearch.exceptions.ConflictError:
+            raise OrderConflictException(
+                status=409,
+                error="Conflict",
+                message="Pedido alterado",
+                error_details=[
+                    ErrorDetails(
+                        message=f"O pedido {id} foi alterado por outra operação"
+                    ).to_dict()
+                ],
+            )
         except elasticsearch.exceptions.NotFoundError:
             raise OrderNotFoundException(
                 status=404,
@@ -188,14 +532,16 @@ class Database:
                     ).to_dict()
                 ],
             )
-        self.__disconnect()
         return response
 
-    def delete(
+    async def delete(
         self,
-        id: int,
+        id: str,
         index: str = "orders",
         doc_type: str = "order",
+        routing: str = None,
+        if_seq_no: int = None,
+        if_primary_term: int = None,
     ) -> dict:
         """
         Deleta um pedido da base de dados.
@@ -204,15 +550,29 @@ class Database:
         :param index: Indice no qual o documento será inserido, por padrão no índice
         'orders'.
         :type index: str, optional
-        :param doc_type: Document type do documento inserido, por padrão 'order'.
+        :param doc_type: Ignorado, mantido por compatibilidade. Os índices usam o
+        tipo único `_doc`, ver :mod:`database.indices`.
         :type doc_type: str, optional
+        :param routing: Routing do documento, ver :func:`user_routing`.
+        :type routing: str, optional
+        :param if_seq_no: Número de sequência do pedido lido, a remoção só é
+        aplicada se o pedido não foi alterado desde a leitura.
+        :type if_seq_no: int, optional
+        :param if_primary_term: Termo primário do pedido lido.
+        :type if_primary_term: int, optional
         :raises OrderNotFoundException: O pedido não foi encontrado.
+        :raises OrderConflictException: O pedido foi alterado desde a leitura.
         :return: Response da atualização.
         :rtype: dict
         """
-        self.__connect()
         try:
-            response = self.__es.delete(index=index, id=id, doc_type=doc_type)
+            response = await self.__es.delete(
+                index=index,
+                id=id,
+                routing=routing,
+                if_seq_no=if_seq_no,
+                if_primary_term=if_primary_term,
+            )
         except elasticsearch.exceptions.NotFoundError:
             raise OrderNotFoundException(
                 status=404,
@@ -224,16 +584,111 @@ class Database:
                     ).to_dict()
                 ],
             )
-        self.__disconnect()
+        except elasticsearch.exceptions.ConflictError:
+            raise OrderConflictException(
+                status=409,
+                error="Conflict",
+                message="Pedido alterado",
+                error_details=[
+                    ErrorDetails(
+                        message=f"O pedido {id} foi alterado por outra operação"
+                    ).to_dict()
+                ],
+            )
         return response
 
-    def list_all(
+    async def locate(self, id: str, index: str = "orders", routing: str = None):
+        """
+        Descobre o índice concreto e o routing de um documento a partir do seu id,
+        necessários para ler, atualizar ou remover o documento quando o alias aponta
+        para várias gerações, ver :func:`write_alias`, ou quando o routing do
+        documento não é conhecido, ver :func:`user_routing`. Sem o routing a busca
+        acessa todos os shards do alias.
+
+        Um documento gravado há menos de um segundo pode ainda não estar visível nas
+        buscas, por isso, quando a busca não o encontra, ele é procurado na geração
+        atual, que recebe as escritas.
+
+        :param str id: Id do pedido.
+        :param index: Alias de leitura do documento, por padrão 'orders'.
+        :type index: str, optional
+        :param routing: Routing do documento, se conhecido.
+        :type routing: str, optional
+        :raises OrderNotFoundException: O pedido não foi encontrado.
+        :return: Índice concreto e routing do documento.
+        :rtype: tuple
+        """
+        response = await self.__es.search(
+            index=index,
+            body={"query": {"ids": {"values": [id]}}},
+            _source=False,
+            size=1,
+            routing=routing,
+        )
+        hits = response.get("hits").get("hits")
+        if hits:
+            return hits[0].get("_index"), hits[0].get("_routing")
+        response = await self.list_one(id, index=write_alias(index), routing=routing)
+        return response.get("_index"), response.get("_routing")
+
+    async def update_by_query(
+        self,
+        query: dict,
+        script: dict,
+        index: str = "orders",
+        routing: str = None,
+        conflicts: str = "proceed",
+    ) -> int:
+        """
+        Atualiza todos os documentos que atendem a query com um script painless. Por
+        padrão os conflitos de versão são ignorados: o documento alterado por outra
+        operação durante a atualização mantém a alteração mais recente.
+
+        :param dict query: Query no formato aceito pela api do elasticsearch.
+        :param dict script: Script no formato {"source": str, "params": dict}.
+        :param index: Indice dos documentos, por padrão 'orders'.
+        :type index: str, optional
+        :param routing: Routing dos documentos, ver :func:`user_routing`.
+        :type routing: str, optional
+        :param conflicts: 'proceed' para ignorar os conflitos de versão ou 'abort'
+        para interromper a atualização no primeiro conflito.
+        :type conflicts: str, optional
+        :raises QueryMalformedException; Se o formato da query for inválido.
+        :raises elasticsearch.exceptions.ConflictError: Se houver um conflito de
+        versão e `conflicts` for 'abort'.
+        :return: Quantidade de documentos atualizados.
+        :rtype: int
+        """
+        try:
+            response = await self.__es.update_by_query(
+                index=index,
+                body={"query": query, "script": script},
+                conflicts=conflicts,
+                routing=routing,
+            )
+        except elasticsearch.exceptions.RequestError:
+            raise QueryMalformedException(
+                status=400,
+                error="Bad request",
+                message="Query incorreta",
+                error_details=[
+                    ErrorDetails(
+                        message=f"A query {query} está mal construída"
+                    ).to_dict()
+                ],
+            )
+        return response.get("updated")
+
+    async def list_all(
         self,
         query: dict = None,
         quantity: int = 10,
         page: int = 0,
         index: str = "orders",
         doc_type: str = "order",
+        sort: list = None,
+        routing: str = None,
+        track_total_hits: bool = True,
     ) -> tuple:
         """
         Lista todos os pedidos da base.
@@ -243,36 +698,49 @@ class Database:
             A paginação é feita usando os parâmetro `from` com `size` da api python
             do elasticsearch.
             `Stackoverflow <https://stackoverflow.com/a/59142866>`_
+            Para paginação profunda utilize :meth:`list_after`.
 
-        :param query: Parâmetros da busca para filtrar o resultado, no formato aceito
-        pela api do elasticsearch.
+        :param query: Filtros do resultado no formato campo: valor, ver
+        :func:`build_query`.
         :type query: dict, optional
         :param int quantity: Quantidade de registros por página.
         :param int page: Página do retorno.
         :param index: Indice no qual o documento será inserido, por padrão no índice
         'orders'.
         :type index: str, optional
-        :param doc_type: Document type do documento inserido, por padrão 'order'.
+        :param doc_type: Ignorado, mantido por compatibilidade. Os índices usam o
+        tipo único `_doc`, ver :mod:`database.indices`.
         :type doc_type: str, optional
+        :param sort: Ordenação dos documentos, por padrão pela data de criação
+        decrescente.
+        :type sort: list, optional
+        :param routing: Routing dos documentos, que restringe a busca a um único
+        shard, ver :func:`user_routing`.
+        :type routing: str, optional
+        :param track_total_hits: Se o total de registros deve ser contado, sem a
+        contagem o total devolvido é None.
+        :type track_total_hits: bool, optional
         :raises QueryMalformedException; Se o formato da query for inválido.
-        :return: Documentos da base e total de registros.
+        :return: Documentos da base e total de registros, ver
+        :func:`_track_total_hits`.
         :rtype: tuple
         """
-        if query:
-            document = {"query": {"match": query}}
-        else:
-            document = {"query": {"match_all": {}}}
+        document = {
+            "query": build_query(query),
+            "sort": sort or DEFAULT_SORT,
+            "track_total_hits": track_total_hits and _track_total_hits(),
+        }
         logger.debug(query)
         logger.debug(document)
         offset = (page - 1) * quantity
-        self.__connect()
         try:
-            response = self.__es.search(
+            response = await self.__es.search(
                 body=document,
                 index=index,
-                doc_type=doc_type,
                 from_=offset,
                 size=quantity,
+                routing=routing,
+                pre_filter_shard_size=_pre_filter_shard_size(query),
             )
         except elasticsearch.exceptions.RequestError:
             raise QueryMalformedException(
@@ -285,10 +753,327 @@ class Database:
                     ).to_dict()
                 ],
             )
-        total = self.__es.count(body=document, index=index, doc_type=doc_type).get(
-            "count"
+        return response.get("hits").get("hits"), response.get("hits").get("total")
+
+    async def aggregate(
+        self,
+        aggs: dict,
+        query: dict = None,
+        index: str = "orders",
+        routing: str = None,
+    ) -> tuple:
+        """
+        Executa agregações sobre os pedidos que atendem aos filtros, sem devolver os
+        documentos. O resultado pode ser reaproveitado pelo cache de requisições
+        dos shards do elasticsearch enquanto o índice não for alterado.
+
+        :param dict aggs: Agregações no formato aceito pela api do elasticsearch.
+        :param query: Filtros do resultado no formato campo: valor, ver
+        :func:`build_query`.
+        :type query: dict, optional
+        :param index: Indice consultado, por padrão 'orders'.
+        :type index: str, optional
+        :param routing: Routing dos documentos, que restringe a busca a um único
+        shard, ver :func:`user_routing`.
+        :type routing: str, optional
+        :raises QueryMalformedException; Se o formato da query for inválido.
+        :return: Resultado das agregações e total de documentos agregados.
+        :rtype: tuple
+        """
+        try:
+            response = await self.__es.search(
+                body={"query": build_query(query), "aggs": aggs},
+                index=index,
+                size=0,
+                track_total_hits=True,
+                request_cache=True,
+                routing=routing,
+                pre_filter_shard_size=_pre_filter_shard_size(query),
+            )
+        except elasticsearch.exceptions.RequestError:
+            raise QueryMalformedException(
+                status=400,
+                error="Bad request",
+                message="Query incorreta",
+                error_details=[
+                    ErrorDetails(
+                        message=f"A agregação {aggs} está mal construída"
+                    ).to_dict()
+                ],
+            )
+        return (
+            response.get("aggregations"),
+            response.get("hits").get("total").get("value"),
         )
-        return response.get("hits").get("hits"), total
+
+    async def search(
+        self,
+        text: str,
+        fields: list,
+        query: dict = None,
+        quantity: int = 10,
+        page: int = 1,
+        index: str = "orders",
+        routing: str = None,
+        includes: list = None,
+        excludes: list = None,
+        highlight: list = None,
+    ) -> tuple:
+        """
+        Busca textual nos pedidos, ordenada por relevância. O texto é buscado com
+        uma query `multi_match` nos campos informados, enquanto os filtros
+        estruturados ficam no contexto de filtro, ver :func:`build_query`, e não
+        alteram a relevância.
+
+        :param str text: Texto buscado.
+        :param list fields: Campos em que o texto é buscado, aceitando o peso de
+        cada campo no formato `campo^peso`.
+        :param query: Filtros do resultado no formato campo: valor, ver
+        :func:`build_query`.
+        :type query: dict, optional
+        :param int quantity: Quantidade de registros por página.
+        :param int page: Página do retorno.
+        :param index: Indice consultado, por padrão 'orders'.
+        :type index: str, optional
+        :param routing: Routing dos documentos, que restringe a busca a um único
+        shard, ver :func:`user_routing`.
+        :type routing: str, optional
+        :param includes: Campos do `_source` devolvidos, por padrão todos.
+        :type includes: list, optional
+        :param excludes: Campos do `_source` omitidos.
+        :type excludes: list, optional
+        :param highlight: Campos com os trechos encontrados destacados na chave
+        `highlight` de cada documento.
+        :type highlight: list, optional
+        :raises QueryMalformedException; Se o formato da query for inválido.
+        :return: Documentos da página e total de registros, ver
+        :func:`_track_total_hits`.
+        :rtype: tuple
+        """
+        filters = build_query(query).get("bool", dict()).get("filter", list())
+        document = {
+            "query": {
+                "bool": {
+                    "must": {
+                        "multi_match": {
+                            "query": text,
+                            "fields": fields,
+                            "operator": "and",
+                        }
+                    },
+                    "filter": filters,
+                }
+            },
+            "sort": ["_score", *DEFAULT_SORT],
+            "track_scores": True,
+            "track_total_hits": _track_total_hits(),
+            "_source": {"includes": includes or ["*"], "excludes": excludes or []},
+        }
+        if highlight:
+            document["highlight"] = {
+                "fields": {field: dict() for field in highlight},
+                "pre_tags": ["<em>"],
+                "post_tags": ["</em>"],
+            }
+        logger.debug(document)
+        try:
+            response = await self.__es.search(
+                body=document,
+                index=index,
+                from_=(page - 1) * quantity,
+                size=quantity,
+                routing=routing,
+                pre_filter_shard_size=_pre_filter_shard_size(query),
+            )
+        except elasticsearch.exceptions.RequestError:
+            raise QueryMalformedException(
+                status=400,
+                error="Bad request",
+                message="Query incorreta",
+                error_details=[
+                    ErrorDetails(
+                        message=f"A busca por {text} está mal construída"
+                    ).to_dict()
+                ],
+            )
+        return response.get("hits").get("hits"), response.get("hits").get("total")
+
+    async def list_after(
+        self,
+        query: dict = None,
+        quantity: int = 10,
+        cursor: str = CURSOR_START,
+        sort: list = None,
+        index: str = "orders",
+        routing: str = None,
+        track_total_hits: bool = True,
+    ) -> tuple:
+        """
+        Lista os pedidos da base paginando por cursor, usando `search_after` sobre
+        uma ordenação estável dentro de um point in time (PIT) do elasticsearch.
+        Diferente de :meth:`list_all`, o custo de cada página não depende da sua
+        profundidade e não há limite de 10.000 registros.
+
+        O cursor é opaco para o cliente: contém o id do PIT e os valores de ordenação
+        do último documento da página. A primeira página é solicitada com o cursor
+        `*`, que abre um novo PIT. Quando a última página é alcançada o PIT é
+        fechado e nenhum cursor é devolvido.
+
+        :param query: Filtros do resultado no formato campo: valor, ver
+        :func:`build_query`.
+        :type query: dict, optional
+        :param int quantity: Quantidade de registros por página.
+        :param cursor: Cursor devolvido pela página anterior, ou `*` para a primeira
+        página.
+        :type cursor: str, optional
+        :param sort: Ordenação estável dos documentos, por padrão pela data de
+        criação decrescente.
+        :type sort: list, optional
+        :param index: Indice consultado ao abrir o PIT, por padrão 'orders'.
+        :type index: str, optional
+        :param routing: Routing dos documentos, que restringe o PIT a um único
+        shard, ver :func:`user_routing`. Usado apenas ao abrir o PIT.
+        :type routing: str, optional
+        :param track_total_hits: Se o total de registros deve ser contado, sem a
+        contagem o total devolvido é None.
+        :type track_total_hits: bool, optional
+        :raises InvalidCursorException: Se o cursor for inválido ou tiver expirado.
+        :raises QueryMalformedException; Se o formato da query for inválido.
+        :return: Documentos da página, total de registros, ver
+        :func:`_track_total_hits`, e cursor da próxima página.
+        :rtype: tuple
+        """
+        if cursor == CURSOR_START:
+            pit = await self.__es.open_point_in_time(
+                index=index, keep_alive=envs.DB_PIT_KEEP_ALIVE, routing=routing
+            )
+            pit_id = pit.get("id")
+            search_after = None
+        else:
+            pit_id, search_after = self.__decode_cursor(cursor)
+
+        document = {
+            "query": build_query(query),
+            "size": quantity,
+            "sort": sort or DEFAULT_SORT,
+            "pit": {"id": pit_id, "keep_alive": envs.DB_PIT_KEEP_ALIVE},
+            "track_total_hits": track_total_hits and _track_total_hits(),
+        }
+        if search_after:
+            document["search_after"] = search_after
+        try:
+            response = await self.__es.search(
+                body=document, pre_filter_shard_size=_pre_filter_shard_size(query)
+            )
+        except elasticsearch.exceptions.NotFoundError:
+            raise InvalidCursorException(
+                status=410,
+                error="Gone",
+                message="Cursor expirado",
+                error_details=[
+                    ErrorDetails(
+                        message="O cursor informado expirou, reinicie a paginação"
+                    ).to_dict()
+                ],
+            )
+        except elasticsearch.exceptions.RequestError:
+            raise QueryMalformedException(
+                status=400,
+                error="Bad request",
+                message="Query incorreta",
+                error_details=[
+                    ErrorDetails(
+                        message=f"A query {query} está mal construída"
+                    ).to_dict()
+                ],
+            )
+
+        hits = response.get("hits").get("hits")
+        total = response.get("hits").get("total")
+        pit_id = response.get("pit_id", pit_id)
+        if len(hits) < quantity:
+            await self.__es.close_point_in_time(body={"id": pit_id}, ignore=404)
+            return hits, total, None
+        return hits, total, self.__encode_cursor(pit_id, hits[-1].get("sort"))
+
+    async def scan(
+        self,
+        query: dict = None,
+        batch_size: int = 1000,
+        sort: list = None,
+        index: str = "orders",
+        routing: str = None,
+    ) -> AsyncGenerator:
+        """
+        Percorre todos os pedidos da base que atendem a query, em lotes, usando
+        `search_after` dentro de um point in time (PIT) do elasticsearch. Apenas um
+        lote é mantido em memória por vez, independente da quantidade de pedidos.
+        O PIT é fechado ao final da iteração ou quando o generator é encerrado.
+
+        :param query: Filtros do resultado no formato campo: valor, ver
+        :func:`build_query`.
+        :type query: dict, optional
+        :param batch_size: Quantidade de documentos por lote.
+        :type batch_size: int, optional
+        :param sort: Ordenação estável dos documentos, por padrão pela data de
+        criação decrescente.
+        :type sort: list, optional
+        :param index: Indice consultado, por padrão 'orders'.
+        :type index: str, optional
+        :param routing: Routing dos documentos, que restringe o PIT a um único
+        shard, ver :func:`user_routing`.
+        :type routing: str, optional
+        :return: Generator assíncrono com os lotes de documentos.
+        :rtype: async_generator
+        """
+        pit = await self.__es.open_point_in_time(
+            index=index, keep_alive=envs.DB_PIT_KEEP_ALIVE, routing=routing
+        )
+        pit_id = pit.get("id")
+        document = {
+            "query": build_query(query),
+            "size": batch_size,
+            "sort": sort or DEFAULT_SORT,
+            "track_total_hits": False,
+        }
+        try:
+            while True:
+                document["pit"] = {"id": pit_id, "keep_alive": envs.DB_PIT_KEEP_ALIVE}
+                response = await self.__es.search(
+                    body=document, pre_filter_shard_size=_pre_filter_shard_size(query)
+                )
+                pit_id = response.get("pit_id", pit_id)
+                hits = response.get("hits").get("hits")
+                if hits:
+                    yield hits
+                if len(hits) < batch_size:
+                    break
+                document["search_after"] = hits[-1].get("sort")
+        finally:
+            await self.__es.close_point_in_time(body={"id": pit_id}, ignore=404)
+
+    @staticmethod
+    def __encode_cursor(pit_id: str, search_after: list) -> str:
+        cursor = json.dumps({"pit": pit_id, "search_after": search_after})
+        return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+    @staticmethod
+    def __decode_cursor(cursor: str) -> tuple:
+        try:
+            decoded = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            pit_id, search_after = decoded["pit"], decoded["search_after"]
+            if not isinstance(pit_id, str) or not isinstance(search_after, list):
+                raise ValueError(cursor)
+            return pit_id, search_after
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise InvalidCursorException(
+                status=400,
+                error="Bad request",
+                message="Cursor inválido",
+                error_details=[
+                    ErrorDetails(message=f"O cursor {cursor} é inválido").to_dict()
+                ],
+            )
 
     @abc.abstractclassmethod
     def dict(self):
@@ -0,0 +1,374 @@
+"""
+Mapeamentos e templates dos índices de pedidos. Cada índice é versionado
+(`<alias>-v<versão>`) e acessado pela aplicação apenas pelo seu alias, assim uma
+mudança de mapeamento é feita criando um novo índice, reindexando os documentos e
+trocando o alias de forma atômica, ver :func:`migrate`.
+
+Com `DB_ROLLOVER_ENABLED` os pedidos são divididos em gerações
+(`<alias>-v<versão>-000001`, `-000002`...). As leituras usam o alias `orders`, que
+aponta para todas as gerações, e as escritas usam o alias de escrita
+`orders-write`, que aponta apenas para a geração atual, ver :func:`rollover`.
+"""
+
+import re
+import asyncio
+
+import elasticsearch
+from loguru import logger
+
+from order_api.config import envs
+from order_api.database import connect, write_alias
+from order_api.exceptions.database import LegacyIndexException
+
+_task = None
+
+VERSION = 1
+
+DATE_FORMAT = (
+    "strict_date_optional_time||yyyy-MM-dd HH:mm:ss.SSSSSS||yyyy-MM-dd HH:mm:ss"
+    "||epoch_millis"
+)
+
+ROUTING_SCRIPT = (
+    "if (ctx._source.user_id != null) "
+    "{ ctx._routing = String.valueOf(ctx._source.user_id) }"
+)
+
+ORDER_PROPERTIES = {
+    "user_id": {"type": "keyword"},
+    "item_description": {
+        "type": "text",
+        "fields": {"keyword": {"type": "keyword", "ignore_above": 256}},
+    },
+    "item_quantity": {"type": "integer"},
+    "item_price": {"type": "scaled_float", "scaling_factor": 100},
+    "total_value": {"type": "scaled_float", "scaling_factor": 100},
+    "created_at": {"type": "date", "format": DATE_FORMAT},
+    "updated_at": {"type": "date", "format": DATE_FORMAT},
+}
+
+COMPONENT_TEMPLATES = {
+    "orders-mappings": {
+        "template": {
+            "mappings": {"dynamic": "strict", "properties": ORDER_PROPERTIES},
+        },
+        "version": VERSION,
+    },
+}
+
+INDEX_TEMPLATES = {
+    "orders": {
+        "index_patterns": ["orders-v*"],
+        "composed_of": ["orders-mappings"],
+        "priority": 100,
+        "version": VERSION,
+    },
+    "orders_enriched": {
+        "index_patterns": [f"{envs.READ_MODEL_INDEX}-v*"],
+        "composed_of": ["orders-mappings"],
+        "template": {
+            "mappings": {
+                "properties": {
+                    "user": {"type": "object", "dynamic": True},
+                    "user_synced_at": {"type": "date", "format": "epoch_millis"},
+                }
+            }
+        },
+        "priority": 100,
+        "version": VERSION,
+    },
+}
+
+
+def index_name(alias: str, version: int = VERSION) -> str:
+    """
+    Nome do índice de uma versão do mapeamento.
+
+    :param str alias: Alias do índice, por exemplo 'orders'.
+    :param version: Versão do mapeamento, por padrão a versão atual.
+    :type version: int, optional
+    :return: Nome do índice no formato `<alias>-v<versão>`.
+    :rtype: str
+    """
+    return f"{alias}-v{version}"
+
+
+def aliases() -> list:
+    """
+    Aliases dos índices gerenciados: o índice de pedidos e, se habilitado, o modelo
+    de leitura.
+    """
+    managed = ["orders"]
+    if envs.READ_MODEL_ENABLED:
+        managed.append(envs.READ_MODEL_INDEX)
+    return managed
+
+
+def rollover_enabled(alias: str) -> bool:
+    """
+    Indica se o alias é dividido em gerações. Apenas o índice de pedidos usa
+    gerações: o modelo de leitura é atualizado por id e pode ser reconstruído a
+    qualquer momento, ver :mod:`business.read_model`.
+
+    :param str alias: Alias do índice.
+    :rtype: bool
+    """
+    return envs.DB_ROLLOVER_ENABLED and alias == "orders"
+
+
+def _first_index(alias: str, version: int = VERSION) -> str:
+    if rollover_enabled(alias):
+        return f"{index_name(alias, version)}-000001"
+    return index_name(alias, version)
+
+
+def _next_index(index: str) -> str:
+    match = re.fullmatch(r"(.+)-(\d{6})", index)
+    if match:
+        return f"{match.group(1)}-{int(match.group(2)) + 1:06d}"
+    return f"{index}-000001"
+
+
+def _index_aliases(alias: str) -> dict:
+    if rollover_enabled(alias):
+        return {alias: {}, write_alias(alias): {"is_write_index": True}}
+    return {alias: {}}
+
+
+async def put_templates():
+    """
+    Cria ou atualiza os templates dos índices de pedidos. Os templates são
+    aplicados apenas aos índices criados depois da sua atualização.
+    """
+    es = connect()
+    for name, body in COMPONENT_TEMPLATES.items():
+        await es.cluster.put_component_template(name=name, body=body)
+    for name, body in INDEX_TEMPLATES.items():
+        await es.indices.put_index_template(name=name, body=body)
+
+
+async def ensure_indices():
+    """
+    Cria os templates e, para cada alias gerenciado que ainda não existir, o índice
+    da versão atual com o alias. Com as gerações habilitadas o alias de escrita é
+    criado na geração mais recente, caso ainda não exista.
+
+    Um índice antigo com o mesmo nome do alias, criado com mapeamento dinâmico, não
+    é alterado: nele `created_at` é mapeado como texto e as listagens ordenadas
+    falham, por isso a aplicação não deve iniciar até que ele seja migrado com
+    `python -m order_api.commands.migrate`.
+
+    :raises LegacyIndexException: Se um alias gerenciado for um índice antigo.
+    """
+    es = connect()
+    await put_templates()
+    for alias in aliases():
+        if await es.indices.exists_alias(name=alias):
+            if rollover_enabled(alias) and not await es.indices.exists_alias(
+                name=write_alias(alias)
+            ):
+                current = max(await es.indices.get_alias(name=alias))
+                await es.indices.put_alias(
+                    index=current,
+                    name=write_alias(alias),
+                    body={"is_write_index": True},
+                )
+            continue
+        if await es.indices.exists(index=alias):
+            raise LegacyIndexException(
+                500,
+                "Internal Server Error",
+                f"O índice {alias} não possui mapeamento explícito, execute a "
+                "migração com `python -m order_api.commands.migrate`",
+            )
+        try:
+            await es.indices.create(
+                index=_first_index(alias), body={"aliases": _index_aliases(alias)}
+            )
+        except elasticsearch.exceptions.RequestError as error:
+            if error.error != "resource_already_exists_exception":
+                raise
+
+
+async def prepare():
+    """
+    Prepara os índices na inicialização da aplicação, ver :func:`ensure_indices`. Sem
+    os templates e os aliases a primeira escrita criaria automaticamente um índice
+    `orders` com mapeamento dinâmico, por isso a aplicação não deve iniciar sem
+    eles. Enquanto o elasticsearch não estiver disponível são feitas até
+    `DB_STARTUP_ATTEMPTS` tentativas, a cada `DB_STARTUP_RETRY_INTERVAL` segundos.
+
+    :raises LegacyIndexException: Se um alias gerenciado for um índice antigo.
+    :raises Exception: A falha da última tentativa.
+    """
+    for attempt in range(1, envs.DB_STARTUP_ATTEMPTS + 1):
+        try:
+            return await ensure_indices()
+        except LegacyIndexException:
+            raise
+        except Exception as error:
+            if attempt >= envs.DB_STARTUP_ATTEMPTS:
+                raise
+            logger.warning(
+                f"Falha ao criar os índices de pedidos, tentativa {attempt} de "
+                f"{envs.DB_STARTUP_ATTEMPTS}: {error}"
+            )
+            await asyncio.sleep(envs.DB_STARTUP_RETRY_INTERVAL)
+
+
+async def rollover(alias: str = "orders", dry_run: bool = False) -> dict:
+    """
+    Cria uma nova geração do alias quando a geração atual atinge uma das condições
+    `DB_ROLLOVER_MAX_AGE`, `DB_ROLLOVER_MAX_SIZE` ou `DB_ROLLOVER_MAX_DOCS`. A nova
+    geração passa a receber as escritas e é incluída no alias de leitura; as
+    gerações anteriores deixam de receber novos pedidos, apenas atualizações e
+    remoções, e não participam das buscas cujo período de criação não as alcança.
+
+    :param alias: Alias de leitura, por padrão 'orders'.
+    :type alias: str, optional
+    :param dry_run: Apenas avalia as condições, sem criar a nova geração.
+    :type dry_run: bool, optional
+    :return: Response da api `_rollover` do elasticsearch.
+    :rtype: dict
+    """
+    es = connect()
+    current = [
+        index
+        for index, data in (await es.indices.get_alias(name=write_alias(alias))).items()
+        if data["aliases"][write_alias(alias)].get("is_write_index", True)
+    ][0]
+    conditions = {
+        "max_age": envs.DB_ROLLOVER_MAX_AGE,
+        "max_size": envs.DB_ROLLOVER_MAX_SIZE,
+        "max_docs": envs.DB_ROLLOVER_MAX_DOCS,
+    }
+    response = await es.indices.rollover(
+        alias=write_alias(alias),
+        new_index=_next_index(current),
+        body={
+            "conditions": {key: value for key, value in conditions.items() if value},
+            "aliases": {alias: {}},
+        },
+        dry_run=dry_run,
+    )
+    if response.get("rolled_over"):
+        logger.info(f"Nova geração de {alias}: {response.get('new_index')}")
+    return response
+
+
+async def _schedule_rollover():
+    while True:
+        await asyncio.sleep(envs.DB_ROLLOVER_INTERVAL)
+        try:
+            await rollover()
+        except Exception as error:
+            logger.error(f"Falha ao avaliar a rotação do índice orders: {error}")
+
+
+def start():
+    """
+    Inicia a avaliação periódica da rotação do índice de pedidos, a cada
+    `DB_ROLLOVER_INTERVAL` segundos, em uma task do event loop do worker. Com
+    `DB_ROLLOVER_INTERVAL` zerado a rotação deve ser agendada externamente, por
+    exemplo com `python -m order_api.commands.rollover` no cron.
+    """
+    global _task
+    if rollover_enabled("orders") and envs.DB_ROLLOVER_INTERVAL and _task is None:
+        _task = asyncio.get_running_loop().create_task(_schedule_rollover())
+
+
+async def stop():
+    """
+    Encerra a avaliação periódica da rotação do índice de pedidos.
+    """
+    global _task
+    task, _task = _task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+async def migrate(alias: str, version: int = VERSION) -> str:
+    """
+    Migra um alias para uma nova versão do mapeamento. O novo índice é criado a
+    partir dos templates e os documentos são reindexados em duas passagens com
+    versionamento externo, que preserva a versão de cada documento: a primeira
+    copia todos os documentos e a segunda apenas os alterados durante a primeira.
+    Por fim os aliases de leitura e de escrita são trocados para o novo índice em
+    uma única operação atômica. Os índices anteriores são mantidos, exceto um
+    índice antigo com o mesmo nome do alias, que precisa ser removido para que o
+    alias seja criado. Com as gerações habilitadas todas as gerações anteriores
+    são copiadas para a primeira geração da nova versão.
+
+    Com `DB_ROUTING_BY_USER` habilitado os documentos são gravados no novo índice
+    com o id do usuário como routing, ver :func:`database.user_routing`, e com ele
+    desabilitado o routing é descartado. Como o routing define o shard de cada
+    documento, mudar a configuração exige migrar para uma nova versão.
+
+    As remoções feitas durante a migração não são replicadas no novo índice, por
+    isso a migração deve ser executada com as remoções suspensas.
+
+    :param str alias: Alias do índice, por exemplo 'orders'.
+    :param version: Versão do mapeamento, por padrão a versão atual.
+    :type version: int, optional
+    :return: Nome do novo índice.
+    :rtype: str
+    """
+    es = connect()
+    prefix, target = index_name(alias, version), _first_index(alias, version)
+    await put_templates()
+
+    if await es.indices.exists_alias(name=alias):
+        sources, legacy = list(await es.indices.get_alias(name=alias)), False
+    elif await es.indices.exists(index=alias):
+        sources, legacy = [alias], True
+    else:
+        await ensure_indices()
+        return target
+    if any(source == prefix or source.startswith(f"{prefix}-") for source in sources):
+        logger.info(f"O alias {alias} já aponta para a versão {version}")
+        return target
+
+    if not await es.indices.exists(index=target):
+        await es.indices.create(index=target)
+    body = {
+        "source": {"index": sources},
+        "dest": {"index": target, "version_type": "external"},
+        "conflicts": "proceed",
+    }
+    if envs.DB_ROUTING_BY_USER:
+        body["script"] = {"source": ROUTING_SCRIPT, "lang": "painless"}
+    else:
+        body["dest"]["routing"] = "discard"
+    for _ in range(2):
+        response = await es.reindex(
+            body=body,
+            refresh=True,
+            request_timeout=envs.DB_MIGRATION_TIMEOUT,
+        )
+        if response.get("failures"):
+            raise RuntimeError(f"Falha ao reindexar {alias}: {response['failures']}")
+        logger.info(
+            f"{alias} -> {target}: {response.get('created')} criados, "
+            f"{response.get('updated')} atualizados"
+        )
+
+    if legacy:
+        actions = [{"remove_index": {"index": alias}}]
+    else:
+        actions = [{"remove": {"index": source, "alias": alias}} for source in sources]
+    if await es.indices.exists_alias(name=write_alias(alias)):
+        actions.extend(
+            {"remove": {"index": source, "alias": write_alias(alias)}}
+            for source in await es.indices.get_alias(name=write_alias(alias))
+        )
+    actions.extend(
+        {"add": {"index": target, "alias": name, **options}}
+        for name, options in _index_aliases(alias).items()
+    )
+    await es.indices.update_aliases(body={"actions": actions})
+    logger.info(f"O alias {alias} agora aponta para {target}")
+    return target
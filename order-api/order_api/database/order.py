@@ -1,4 +1,3 @@
-from uuid import uuid4
 from datetime import datetime
 
 from order_api.database import Database
@@ -70,73 +69,100 @@ class Order(Database):
                 continue
         return new_dict
 
-    def insert(
+    async def insert(
         self,
-        id: str = str(uuid4()),
+        id: str = None,
         index: str = "orders",
         doc_type: str = "order",
+        routing: str = None,
     ):
         """
         Insere um documento na base. Seta o atributo __created_at com a data atual.
         """
         if not self.__created_at:
             self.created_at = datetime.utcnow()
-        return super().insert(
-            document=self.dict(), id=id, index=index, doc_type=doc_type
+        return await super().insert(
+            document=self.dict(),
+            id=id,
+            index=index,
+            doc_type=doc_type,
+            routing=routing,
         )
 
-    def update(
+    async def update(
         self,
-        id: int,
+        id: str,
         index: str = "orders",
         doc_type: str = "order",
+        routing: str = None,
+        if_seq_no: int = None,
+        if_primary_term: int = None,
+        return_source: bool = False,
     ):
         """
-        Atualiza um documento na base. Seta o atributo __updated_at com a data atual.
+        Atualiza os campos informados de um documento na base. Seta o atributo
+        __updated_at com a data atual.
         """
         if not self.__updated_at:
             self.updated_at = datetime.utcnow()
-        return super().update(doc=self.dict(), id=id, index=index, doc_type=doc_type)
+        return await super().update(
+            doc=self.dict(),
+            id=id,
+            index=index,
+            doc_type=doc_type,
+            routing=routing,
+            if_seq_no=if_seq_no,
+            if_primary_term=if_primary_term,
+            return_source=return_source,
+        )
 
-    def find_by_id(
+    async def find_by_id(
         self,
         id: str,
         index: str = "orders",
         doc_type: str = "order",
+        routing: str = None,
     ):
         """
         Encontra um pedido a partir do seu id.
         """
-        return super().list_one(id, index, doc_type)
+        return await super().list_one(id, index, doc_type, routing)
 
-    def delete(
+    async def delete(
         self,
         id: str,
         index: str = "orders",
         doc_type: str = "order",
+        routing: str = None,
+        if_seq_no: int = None,
+        if_primary_term: int = None,
     ):
         """
         Deleta um pedido a partir do seu id.
         """
-        return super().delete(id, index, doc_type)
+        return await super().delete(
+            id, index, doc_type, routing, if_seq_no, if_primary_term
+        )
 
-    def find_all(
+    async def find_all(
         self,
         query=None,
         quantity: int = 10,
         page: int = 0,
         index: str = "orders",
         doc_type: str = "order",
+        routing: str = None,
     ):
         """
         Encontra todos os documentos da base, filtrando ou não o resultado.
         """
-        return super().list_all(
+        return await super().list_all(
             query=query,
             quantity=quantity,
             page=page,
             index=index,
             doc_type=doc_type,
+            routing=routing,
         )
 
     def __repr__(self):
@@ -29,3 +29,33 @@ class DatabaseException(OrderApiException):
         self.message = message
         self.error_details = error_details
         super().__init__(status, error, message, error_details)
+
+
+class InvalidCursorException(OrderApiException):
+    def __init__(
+        self,
+        status: int,
+        error: str,
+        message: str,
+        error_details: list = [],
+    ):
+        self.status = status
+        self.error = error
+        self.message = message
+        self.error_details = error_details
+        super().__init__(status, error, message, error_details)
+
+
+class LegacyIndexException(OrderApiException):
+    def __init__(
+        self,
+        status: int,
+        error: str,
+        message: str,
+        error_details: list = [],
+    ):
+        self.status = status
+        self.error = error
+        self.message = message
+        self.error_details = error_details
+        super().__init__(status, error, message, error_details)
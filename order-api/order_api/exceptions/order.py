@@ -89,3 +89,48 @@ class GetUserException(OrderApiException):
         self.message = message
         self.error_details = error_details
         super().__init__(status, error, message, error_details)
+
+
+class BulkOrderException(OrderApiException):
+    def __init__(
+        self,
+        status: int,
+        error: str,
+        message: str,
+        error_details: list = [],
+    ):
+        self.status = status
+        self.error = error
+        self.message = message
+        self.error_details = error_details
+        super().__init__(status, error, message, error_details)
+
+
+class OrderConflictException(OrderApiException):
+    def __init__(
+        self,
+        status: int,
+        error: str,
+        message: str,
+        error_details: list = [],
+    ):
+        self.status = status
+        self.error = error
+        self.message = message
+        self.error_details = error_details
+        super().__init__(status, error, message, error_details)
+
+
+class UserApiRequestException(OrderApiException):
+    def __init__(
+        self,
+        status: int,
+        error: str,
+        message: str,
+        error_details: list = [],
+    ):
+        self.status = status
+        self.error = error
+        self.message = message
+        self.error_details = error_details
+        super().__init__(status, error, message, error_details)
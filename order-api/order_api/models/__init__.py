@@ -9,6 +9,13 @@ class Pagination(BaseModel):
     first: str = Field(..., description="Primeira página que contem resultados")
     last: str = Field(..., description="Última página que contem resultados")
     total: int = Field(..., description="Quantidade total de páginas")
+    total_relation: str = Field(
+        "eq",
+        description="Precisão do total: 'eq' para total exato e 'gte' para limite inferior",
+    )
+    cursor: Optional[str] = Field(
+        None, description="Cursor da próxima página, na paginação por cursor"
+    )
 
 
 class ErrorDetails(BaseModel):
@@ -0,0 +1,9 @@
+from typing import Dict
+
+from pydantic import BaseModel, Field
+
+
+class MetricsResponse(BaseModel):
+    result: Dict[str, float] = Field(
+        ..., description="Contadores no formato nome: valor"
+    )
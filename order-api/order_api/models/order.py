@@ -1,11 +1,18 @@
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, constr
 from order_api.exceptions import ErrorDetails
 
 from order_api.models import Message, parse_openapi, Pagination
 
+ORDER_ID_PATTERN = r"^\d+$"
+
+# Os ids gerados pela aplicação ultrapassam 2^53 e perdem precisão como números
+# JSON em clientes javascript, por isso são recebidos e devolvidos como strings.
+# Ids numéricos continuam aceitos no corpo das requisições.
+OrderId = constr(regex=ORDER_ID_PATTERN)
+
 
 class IndexType(str, Enum):
     index = "orders"
@@ -23,8 +30,26 @@ class InsertOrderRequest(BaseModel):
     total_value: float = Field(7.50, description="Valor total do pedido")
 
 
+class BulkOrderRequest(InsertOrderRequest):
+    id: Optional[OrderId] = Field(
+        None, description="Id do pedido, gerado pela aplicação se não informado"
+    )
+
+
 class InsertOrderResponse(BaseModel):
-    id: int
+    id: str = Field(..., description="Id do pedido")
+
+
+class BulkOrderItem(BaseModel):
+    position: int = Field(..., description="Posição do pedido no corpo da requisição")
+    id: Optional[str] = Field(None, description="Id do pedido")
+    status: int = Field(..., description="Status HTTP do pedido")
+    error: Optional[str] = Field(None, description="Descrição do erro do pedido")
+
+
+class BulkOrdersResponse(BaseModel):
+    errors: bool = Field(..., description="Indica se algum pedido não foi inserido")
+    items: List[BulkOrderItem]
 
 
 class GetOrder(BaseModel):
@@ -39,6 +64,12 @@ class GetOrder(BaseModel):
 
 class GetOrderResponse(BaseModel):
     result: GetOrder
+    seq_no: Optional[int] = Field(
+        None, description="Número de sequência do pedido, ver if_seq_no na atualização"
+    )
+    primary_term: Optional[int] = Field(
+        None, description="Termo primário do pedido, ver if_primary_term na atualização"
+    )
 
 
 class UpdateOrderRequest(BaseModel):
@@ -53,6 +84,12 @@ class UpdateOrderRequest(BaseModel):
 
 class UpdateOrderResponse(BaseModel):
     version: int
+    seq_no: Optional[int] = Field(
+        None, description="Número de sequência do pedido atualizado"
+    )
+    primary_term: Optional[int] = Field(
+        None, description="Termo primário do pedido atualizado"
+    )
 
 
 class DeleteOrderResponse(BaseModel):
@@ -72,16 +109,21 @@ class Order(BaseModel):
 class User(BaseModel):
     id_user: int = Field(..., description="Id do usuário associado ao pedido")
     name: str = Field(..., description="Nome completo")
-    cpf: str = Field(..., description="Cadastro de pessoa física(CPF)")
-    email: Optional[str] = Field(..., description="E-mail")
-    phone_number: str = Field(..., description="Número do telefone")
+    cpf: Optional[str] = Field(None, description="Cadastro de pessoa física(CPF)")
+    email: Optional[str] = Field(None, description="E-mail")
+    phone_number: Optional[str] = Field(None, description="Número do telefone")
     created_at: str = Field(..., description="Data de criação do usuário")
     updated_at: Optional[str] = Field(None, description="Data de alteração do usuário")
 
 
 class ListOrders(BaseModel):
-    user: User
+    user: Optional[User]
     orders: List[Order]
+    degraded: bool = Field(
+        False,
+        description="Indica que o user-api está indisponível e os dados do usuário "
+        "vieram apenas do cache, podendo estar ausentes",
+    )
 
 
 class ListOdersResponse(BaseModel):
@@ -89,6 +131,49 @@ class ListOdersResponse(BaseModel):
     pagination: Pagination = Field(..., description="Dados de paginação")
 
 
+class SearchOrder(BaseModel):
+    id: str = Field(..., description="Id do pedido")
+    score: Optional[float] = Field(None, description="Relevância do pedido na busca")
+    user_id: Optional[int] = Field(
+        None, description="Id do usuário associado ao pedido"
+    )
+    item_description: Optional[str] = Field(None, description="Descrição do item")
+    item_quantity: Optional[int] = Field(None, description="Quantidade de itens")
+    item_price: Optional[float] = Field(None, description="Valor do item")
+    total_value: Optional[float] = Field(None, description="Valor total do pedido")
+    created_at: Optional[str] = Field(None, description="Data de criação do pedido")
+    updated_at: Optional[str] = Field(None, description="Data de alteração do pedido")
+    highlight: Dict[str, List[str]] = Field(
+        dict(), description="Trechos encontrados de cada campo, destacados com <em>"
+    )
+
+
+class SearchOrdersResponse(BaseModel):
+    result: List[SearchOrder]
+    pagination: Pagination = Field(..., description="Dados de paginação")
+
+
+class MgetOrdersRequest(BaseModel):
+    ids: List[OrderId] = Field(..., description="Ids dos pedidos", min_items=1)
+
+
+class MgetOrderItem(BaseModel):
+    id: str = Field(..., description="Id do pedido")
+    found: bool = Field(..., description="Indica se o pedido foi encontrado")
+    order: Optional[GetOrder] = Field(None, description="Dados do pedido")
+    user: Optional[User] = Field(None, description="Dados do usuário do pedido")
+    error: Optional[str] = Field(None, description="Motivo do pedido não ser devolvido")
+
+
+class MgetOrdersResponse(BaseModel):
+    result: List[MgetOrderItem]
+    degraded: bool = Field(
+        False,
+        description="Indica que o user-api está indisponível e os dados dos usuários "
+        "vieram apenas do cache, podendo estar ausentes",
+    )
+
+
 INSERT_ORDER_DEFAULT_RESPONSES = parse_openapi(
     [
         Message(
@@ -149,6 +234,16 @@ UPDATE_ORDER_DEFAULT_RESPONSES = parse_openapi(
                 ).to_dict()
             ],
         ),
+        Message(
+            status=409,
+            error="Conflict",
+            message="Pedido alterado",
+            error_details=[
+                ErrorDetails(
+                    message="O pedido foi alterado desde a leitura informada"
+                ).to_dict()
+            ],
+        ),
     ]
 )
 
@@ -194,3 +289,67 @@ LIST_ORDERS_BY_USER_ID_DEFAULT_RESPONSES = parse_openapi(
         ),
     ]
 )
+
+
+EXPORT_ORDERS_DEFAULT_RESPONSES = parse_openapi(
+    [
+        Message(
+            status=404,
+            error="Not found",
+            message="Usuário não encontrado",
+            error_details=[
+                ErrorDetails(message="O usuário informado não existe na base").to_dict()
+            ],
+        ),
+    ]
+)
+
+
+BULK_ORDERS_DEFAULT_RESPONSES = parse_openapi(
+    [
+        Message(
+            status=400,
+            error="Bad Request",
+            message="Corpo da requisição inválido",
+            error_details=[
+                ErrorDetails(
+                    message="O corpo deve ser uma lista JSON ou NDJSON de pedidos"
+                ).to_dict()
+            ],
+        ),
+        Message(
+            status=503,
+            error="Service Unavailable",
+            message="Serviço indisponível",
+            error_details=[
+                ErrorDetails(
+                    message="Um ou mais serviços não estão disponíveis"
+                ).to_dict()
+            ],
+        ),
+    ]
+)
+
+
+SEARCH_ORDERS_DEFAULT_RESPONSES = parse_openapi(
+    [
+        Message(
+            status=400,
+            error="Bad request",
+            message="Query incorreta",
+            error_details=[ErrorDetails(message="O campo não existe").to_dict()],
+        ),
+    ]
+)
+
+
+MGET_ORDERS_DEFAULT_RESPONSES = parse_openapi(
+    [
+        Message(
+            status=400,
+            error="Bad request",
+            message="Query incorreta",
+            error_details=[ErrorDetails(message="Informe no máximo 100 ids").to_dict()],
+        ),
+    ]
+)
@@ -0,0 +1,67 @@
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+from order_api.exceptions import ErrorDetails
+
+from order_api.models import Message, parse_openapi
+
+
+class Interval(str, Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+
+class OrderStats(BaseModel):
+    count: int = Field(..., description="Quantidade de pedidos")
+    total_value_sum: float = Field(..., description="Soma do valor total dos pedidos")
+    total_value_avg: float = Field(..., description="Média do valor total dos pedidos")
+    item_quantity_sum: int = Field(..., description="Soma da quantidade de itens")
+
+
+class UserOrderStats(OrderStats):
+    user_id: int = Field(..., description="Id do usuário associado aos pedidos")
+
+
+class PeriodOrderStats(OrderStats):
+    date: str = Field(..., description="Data de início do período")
+
+
+class UserOrderSummary(BaseModel):
+    user_id: int = Field(..., description="Id do usuário associado aos pedidos")
+    count: int = Field(..., description="Quantidade de pedidos")
+    total_value_sum: float = Field(..., description="Soma do valor total dos pedidos")
+    last_order_at: Optional[str] = Field(
+        None, description="Data de criação do último pedido"
+    )
+
+
+class UserOrderSummaryResponse(BaseModel):
+    result: UserOrderSummary
+
+
+class OrderStatsResponse(BaseModel):
+    result: OrderStats
+
+
+class UserOrderStatsResponse(BaseModel):
+    result: List[UserOrderStats]
+
+
+class PeriodOrderStatsResponse(BaseModel):
+    result: List[PeriodOrderStats]
+
+
+STATS_DEFAULT_RESPONSES = parse_openapi(
+    [
+        Message(
+            status=400,
+            error="Bad request",
+            message="Query incorreta",
+            error_details=[
+                ErrorDetails(message="A agregação está mal construída").to_dict()
+            ],
+        ),
+    ]
+)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter
 
-from order_api.routes.v1 import order
-
+from order_api.routes.v1 import order, metrics, stats
 
 v1 = APIRouter()
 
+v1.include_router(stats.router, prefix="/orders/stats", tags=["stats"])
 v1.include_router(order.router, prefix="/orders", tags=["orders"])
+v1.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
@@ -1,7 +1,12 @@
 from math import ceil
+from urllib.parse import parse_qsl, urlencode
 
+from order_api.database import CURSOR_START
 
-def pagination(data: list, qtd: int, offset: int, total: int, url: str) -> dict:
+
+def pagination(
+    data: list, qtd: int, offset: int, total: int, url: str, relation: str = "eq"
+) -> dict:
     total = ceil(total / qtd)
     pagination = {
         "result": data,
@@ -11,10 +16,15 @@ def pagination(data: list, qtd: int, offset: int, total: int, url: str) -> dict:
             "first": "",
             "last": "",
             "total": total,
+            "total_relation": relation,
         },
     }
-    endpoint, params = url.split("?")
-    _, _, *others = params.split("&")
+    endpoint, _, params = url.partition("?")
+    others = [
+        urlencode([(key, value)])
+        for key, value in parse_qsl(params)
+        if key not in ("quantity", "page", "qtd", "offset")
+    ]
     if len(data) == qtd and offset < total:
         next_params = "&".join([f"qtd={qtd}", f"offset={offset+1}", *others])
         pagination["pagination"]["next"] = f"{endpoint}?{next_params}"
@@ -28,3 +38,31 @@ def pagination(data: list, qtd: int, offset: int, total: int, url: str) -> dict:
     if offset < total:
         pagination["pagination"]["last"] = f"{endpoint}?{last_params}"
     return pagination
+
+
+def cursor_pagination(
+    data: list, qtd: int, total: int, url: str, cursor: str, relation: str = "eq"
+) -> dict:
+    endpoint, _, params = url.partition("?")
+    others = [
+        (key, value)
+        for key, value in parse_qsl(params)
+        if key not in ("page", "cursor")
+    ]
+    pagination = {
+        "result": data,
+        "pagination": {
+            "next": "",
+            "previous": "",
+            "first": f"{endpoint}?{urlencode([*others, ('cursor', CURSOR_START)])}",
+            "last": "",
+            "total": ceil(total / qtd),
+            "total_relation": relation,
+            "cursor": cursor,
+        },
+    }
+    if cursor:
+        pagination["pagination"][
+            "next"
+        ] = f"{endpoint}?{urlencode([*others, ('cursor', cursor)])}"
+    return pagination
@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+
+from order_api.services import metrics
+from order_api.models.metrics import MetricsResponse
+
+router = APIRouter()
+
+
+@router.get("/", include_in_schema=False)
+@router.get(
+    "",
+    status_code=200,
+    summary="Métricas da aplicação",
+    response_model=MetricsResponse,
+)
+async def get_metrics():
+    """
+    Lista os contadores do worker que atendeu a requisição.
+    """
+    return {"result": metrics.snapshot()}
@@ -1,15 +1,28 @@
+import json
+import codecs
+from typing import AsyncGenerator, AsyncIterator, Optional
+from datetime import datetime
+
+from pydantic import ValidationError
 from fastapi import APIRouter, Path, Body, Request, Query
+from fastapi.responses import StreamingResponse
 
+from order_api.config import envs
 from order_api.business import order
-from order_api.routes.v1 import pagination
+from order_api.routes.v1 import pagination, cursor_pagination
 
-from order_api.models.order import IndexType, DocType
+from order_api.models.order import IndexType, DocType, ORDER_ID_PATTERN
 from order_api.models.order import (
     InsertOrderRequest,
     InsertOrderResponse,
     INSERT_ORDER_DEFAULT_RESPONSES,
 )
 from order_api.models.order import GetOrderResponse, GET_ORDER_DEFAULT_RESPONSES
+from order_api.models.order import (
+    MgetOrdersRequest,
+    MgetOrdersResponse,
+    MGET_ORDERS_DEFAULT_RESPONSES,
+)
 from order_api.models.order import (
     UpdateOrderRequest,
     UpdateOrderResponse,
@@ -18,9 +31,164 @@ from order_api.models.order import (
 from order_api.models.order import LIST_ORDERS_BY_USER_ID_DEFAULT_RESPONSES
 from order_api.models.order import ListOdersResponse, LIST_ORDERS_DEFAULT_RESPONSES
 from order_api.models.order import DeleteOrderResponse, DELETE_ORDER_DEFAULT_RESPONSES
+from order_api.models.order import EXPORT_ORDERS_DEFAULT_RESPONSES
+from order_api.models.order import (
+    SearchOrdersResponse,
+    SEARCH_ORDERS_DEFAULT_RESPONSES,
+)
+from order_api.models.order import (
+    BulkOrderRequest,
+    BulkOrdersResponse,
+    BULK_ORDERS_DEFAULT_RESPONSES,
+)
+from order_api.exceptions import ErrorDetails
+from order_api.exceptions.order import BulkOrderException
 
 router = APIRouter()
 
+CURSOR_DESCRIPTION = (
+    "Cursor da página, devolvido na paginação da página anterior. Informe '*' para "
+    "iniciar a paginação por cursor, que não tem limite de profundidade"
+)
+CREATED_FROM_DESCRIPTION = "Data de criação mínima dos pedidos"
+CREATED_TO_DESCRIPTION = "Data de criação máxima dos pedidos"
+MIN_TOTAL_DESCRIPTION = "Valor total mínimo dos pedidos"
+MAX_TOTAL_DESCRIPTION = "Valor total máximo dos pedidos"
+IF_SEQ_NO_DESCRIPTION = (
+    "Número de sequência devolvido na leitura do pedido. A atualização só é "
+    "aplicada se o pedido não foi alterado desde a leitura"
+)
+IF_PRIMARY_TERM_DESCRIPTION = (
+    "Termo primário devolvido na leitura do pedido, informado junto com if_seq_no"
+)
+FIELDS_DESCRIPTION = (
+    "Campos devolvidos, separados por vírgula. Campos prefixados com '-' são "
+    "omitidos. Por padrão todos os campos são devolvidos"
+)
+USER_ROUTING_DESCRIPTION = (
+    "Id do usuário associado ao pedido. Com o routing por usuário habilitado, "
+    "informar o usuário evita a busca do pedido em todos os shards"
+)
+
+
+def _invalid_bulk_body(message: str) -> BulkOrderException:
+    return BulkOrderException(
+        status=400,
+        error="Bad Request",
+        message="Corpo da requisição inválido",
+        error_details=[ErrorDetails(message=message).to_dict()],
+    )
+
+
+async def _iter_bulk_body(stream: AsyncIterator[bytes]) -> AsyncGenerator:
+    """
+    Lê o corpo da inserção em lote à medida que ele é recebido, sem carregar o corpo
+    inteiro em memória. O corpo pode ser uma lista JSON ou NDJSON (um pedido por
+    linha).
+
+    :param stream: Blocos do corpo da requisição.
+    :raises BulkOrderException: Se o corpo não for uma lista JSON nem NDJSON.
+    :return: Generator assíncrono com os pedidos, ainda não validados.
+    :rtype: async_generator
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    chunks = stream.__aiter__()
+    buffer, array, closed, eof = "", None, False, False
+
+    async def more() -> bool:
+        nonlocal buffer, eof
+        if not eof:
+            try:
+                buffer += text.decode(await chunks.__anext__())
+            except StopAsyncIteration:
+                buffer += text.decode(b"", final=True)
+                eof = True
+            except UnicodeDecodeError as error:
+                raise _invalid_bulk_body(str(error))
+        return not eof
+
+    while True:
+        buffer = buffer.lstrip()
+        if not buffer:
+            if await more() or buffer:
+                continue
+            break
+        if closed:
+            raise _invalid_bulk_body("Conteúdo após o fim da lista de pedidos")
+        if array is None:
+            array = buffer.startswith("[")
+            buffer = buffer[1:] if array else buffer
+            continue
+        if array and buffer[0] in ",]":
+            closed, buffer = buffer[0] == "]", buffer[1:]
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except ValueError as error:
+            if await more():
+                continue
+            raise _invalid_bulk_body(str(error))
+        if end == len(buffer) and not isinstance(item, (dict, list)) and not eof:
+            await more()
+            continue
+        buffer = buffer[end:]
+        yield item
+    if array and not closed:
+        raise _invalid_bulk_body("A lista de pedidos não foi fechada")
+
+
+@router.post(
+    "/{index}/{doc_type}/",
+    status_code=201,
+    summary="Insere um novo pedido com id gerado pela aplicação",
+    response_model=InsertOrderResponse,
+    responses=INSERT_ORDER_DEFAULT_RESPONSES,
+)
+async def create_with_generated_id(
+    index: IndexType = Path(..., description="Index do pedido"),
+    doc_type: DocType = Path(..., description="Document type do pedido"),
+    order_data: InsertOrderRequest = Body(
+        ..., description="Dados básicos para cadastro do pedido"
+    ),
+):
+    """
+    Cria um novo pedido. O id é gerado pela aplicação e é ordenado pela data de
+    criação do pedido.
+    """
+    return {
+        "id": await order.insert_order(
+            order_data=order_data.dict(), index=index, doc_type=doc_type
+        )
+    }
+
+
+@router.post(
+    "/{index}/{doc_type}/_mget",
+    status_code=200,
+    summary="Recupera vários pedidos a partir dos seus identificadores",
+    response_model=MgetOrdersResponse,
+    response_model_exclude_none=True,
+    responses=MGET_ORDERS_DEFAULT_RESPONSES,
+)
+async def list_many_by_ids(
+    index: IndexType = Path(..., description="Index do pedido"),
+    doc_type: DocType = Path(..., description="Document type do pedido"),
+    body: MgetOrdersRequest = Body(..., description="Ids dos pedidos"),
+    user_id: Optional[int] = Query(None, description=USER_ROUTING_DESCRIPTION),
+    include_user: bool = Query(
+        False, description="Inclui os dados do usuário em cada pedido"
+    ),
+):
+    """
+    Recupera vários pedidos em uma única chamada, na ordem dos ids informados. Um
+    pedido não encontrado é devolvido com `found` falso, sem falhar a requisição.
+    """
+    result, degraded = await order.get_orders_by_ids(
+        index, body.ids, user_id=user_id, include_user=include_user
+    )
+    return {"result": result, "degraded": degraded}
+
 
 @router.post(
     "/{index}/{doc_type}/{id}",
@@ -29,10 +197,10 @@ router = APIRouter()
     response_model=InsertOrderResponse,
     responses=INSERT_ORDER_DEFAULT_RESPONSES,
 )
-def create(
+async def create(
     index: IndexType = Path(..., description="Index do pedido"),
     doc_type: DocType = Path(..., description="Document type do pedido"),
-    id: int = Path(..., description="Id do pedido"),
+    id: str = Path(..., description="Id do pedido", regex=ORDER_ID_PATTERN),
     order_data: InsertOrderRequest = Body(
         ..., description="Dados básicos para cadastro do pedido"
     ),
@@ -41,7 +209,7 @@ def create(
     Cria um novo pedido.
     """
     return {
-        "id": order.insert_order(
+        "id": await order.insert_order(
             order_data=order_data.dict(),
             index=index,
             doc_type=doc_type,
@@ -57,15 +225,21 @@ def create(
     response_model=GetOrderResponse,
     responses=GET_ORDER_DEFAULT_RESPONSES,
 )
-def list_one_by_id(
+async def list_one_by_id(
     index: IndexType = Path(..., description="Index do pedido"),
     doc_type: DocType = Path(..., description="Document type do pedido"),
-    id: int = Path(..., description="Id do pedido"),
+    id: str = Path(..., description="Id do pedido", regex=ORDER_ID_PATTERN),
+    user_id: Optional[int] = Query(None, description=USER_ROUTING_DESCRIPTION),
 ):
     """
-    Recupera um pedido a partir do seu id.
+    Recupera um pedido a partir do seu id. O número de sequência e o termo primário
+    devolvidos podem ser informados na atualização do pedido para garantir que ele
+    não foi alterado desde a leitura.
     """
-    return {"result": order.get_order_by_id(index=index, doc_type=doc_type, id=id)}
+    result, seq_no, primary_term = await order.get_order_by_id(
+        index=index, doc_type=doc_type, id=id, user_id=user_id
+    )
+    return {"result": result, "seq_no": seq_no, "primary_term": primary_term}
 
 
 @router.put(
@@ -75,25 +249,32 @@ def list_one_by_id(
     response_model=UpdateOrderResponse,
     responses=UPDATE_ORDER_DEFAULT_RESPONSES,
 )
-def update(
+async def update(
     index: IndexType = Path(..., description="Index do pedido"),
     doc_type: DocType = Path(..., description="Document type do pedido"),
-    id: int = Path(..., description="Id do pedido"),
+    id: str = Path(..., description="Id do pedido", regex=ORDER_ID_PATTERN),
     order_data: UpdateOrderRequest = Body(
         ..., description="Dados para atualização do pedido"
     ),
+    user_id: Optional[int] = Query(None, description=USER_ROUTING_DESCRIPTION),
+    if_seq_no: Optional[int] = Query(None, description=IF_SEQ_NO_DESCRIPTION),
+    if_primary_term: Optional[int] = Query(
+        None, description=IF_PRIMARY_TERM_DESCRIPTION
+    ),
 ):
     """
-    Atualiza um pedido.
+    Atualiza os campos informados de um pedido, mantendo os demais.
     """
-    return {
-        "version": order.update_order(
-            order_data=order_data.dict(),
-            index=index,
-            doc_type=doc_type,
-            id=id,
-        )
-    }
+    version, seq_no, primary_term = await order.update_order(
+        order_data=order_data.dict(exclude_none=True),
+        index=index,
+        doc_type=doc_type,
+        id=id,
+        user_id=user_id,
+        if_seq_no=if_seq_no,
+        if_primary_term=if_primary_term,
+    )
+    return {"version": version, "seq_no": seq_no, "primary_term": primary_term}
 
 
 @router.delete(
@@ -103,15 +284,16 @@ def update(
     response_model=DeleteOrderResponse,
     responses=DELETE_ORDER_DEFAULT_RESPONSES,
 )
-def delete(
+async def delete(
     index: IndexType = Path(..., description="Index do pedido"),
     doc_type: DocType = Path(..., description="Document type do pedido"),
-    id: int = Path(..., description="Id do pedido"),
+    id: str = Path(..., description="Id do pedido", regex=ORDER_ID_PATTERN),
+    user_id: Optional[int] = Query(None, description=USER_ROUTING_DESCRIPTION),
 ):
     """
     Deleta um pedido.
     """
-    return {"result": order.delete_order(index, doc_type, id)}
+    return {"result": await order.delete_order(index, doc_type, id, user_id)}
 
 
 @router.get(
@@ -121,23 +303,155 @@ def delete(
     response_model=ListOdersResponse,
     responses=LIST_ORDERS_DEFAULT_RESPONSES,
 )
-def get_orders(
+async def get_orders(
     request: Request,
     quantity: int = Query(10, description="Quantidade de registros de retorno", gt=0),
     page: int = Query(1, description="Página atual de retorno", gt=0),
     index: IndexType = Path(..., description="Index do pedido"),
     doc_type: DocType = Path(..., description="Document type do pedido"),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    created_from: Optional[datetime] = Query(
+        None, description=CREATED_FROM_DESCRIPTION
+    ),
+    created_to: Optional[datetime] = Query(None, description=CREATED_TO_DESCRIPTION),
+    min_total: Optional[float] = Query(None, description=MIN_TOTAL_DESCRIPTION),
+    max_total: Optional[float] = Query(None, description=MAX_TOTAL_DESCRIPTION),
 ):
     """
-    Listar todos os pedidos, paginando o resultado.
+    Listar todos os pedidos, paginando o resultado. O resultado pode ser filtrado
+    por período de criação e valor total.
     """
-    orders, total = order.list_orders(
+    orders, total, next_cursor = await order.list_orders(
         quantity=quantity,
         page=page,
         index=index,
         doc_type=doc_type,
+        cursor=cursor,
+        created_from=created_from,
+        created_to=created_to,
+        min_total=min_total,
+        max_total=max_total,
     )
-    return pagination(orders, quantity, page, total, str(request.url))
+    url, value, relation = str(request.url), total["value"], total["relation"]
+    if cursor:
+        return cursor_pagination(orders, quantity, value, url, next_cursor, relation)
+    return pagination(orders, quantity, page, value, url, relation)
+
+
+@router.get(
+    "/export",
+    status_code=200,
+    summary="Exportar todos os pedidos em NDJSON",
+    response_class=StreamingResponse,
+    responses=EXPORT_ORDERS_DEFAULT_RESPONSES,
+)
+async def export(
+    user_id: Optional[int] = Query(
+        None, description="Id do usuário associado aos pedidos"
+    ),
+):
+    """
+    Exporta todos os pedidos, filtrando ou não por id do usuário, em NDJSON (um
+    pedido por linha). O resultado é transmitido aos poucos, sem paginação.
+    """
+    return StreamingResponse(
+        await order.export_orders(user_id=user_id), media_type="application/x-ndjson"
+    )
+
+
+@router.get(
+    "/search",
+    status_code=200,
+    summary="Buscar pedidos pela descrição do item",
+    response_model=SearchOrdersResponse,
+    response_model_exclude_unset=True,
+    responses=SEARCH_ORDERS_DEFAULT_RESPONSES,
+)
+async def search(
+    request: Request,
+    q: str = Query(..., description="Texto buscado na descrição do item", min_length=1),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    user_id: Optional[int] = Query(
+        None, description="Id do usuário associado aos pedidos"
+    ),
+    created_from: Optional[datetime] = Query(
+        None, description=CREATED_FROM_DESCRIPTION
+    ),
+    created_to: Optional[datetime] = Query(None, description=CREATED_TO_DESCRIPTION),
+    quantity: int = Query(10, description="Quantidade de registros de retorno", gt=0),
+    page: int = Query(1, description="Página atual de retorno", gt=0),
+):
+    """
+    Busca os pedidos pela descrição do item, ordenados por relevância, com os
+    trechos encontrados destacados. O resultado pode ser filtrado por usuário e
+    período de criação, e apenas os campos informados em `fields` são devolvidos.
+    """
+    orders, total = await order.search_orders(
+        q,
+        user_id=user_id,
+        created_from=created_from,
+        created_to=created_to,
+        fields=fields.split(",") if fields else None,
+        quantity=quantity,
+        page=page,
+    )
+    url, value, relation = str(request.url), total["value"], total["relation"]
+    return pagination(orders, quantity, page, value, url, relation)
+
+
+@router.post(
+    "/_bulk",
+    status_code=200,
+    summary="Insere vários pedidos em lote",
+    response_model=BulkOrdersResponse,
+    responses=BULK_ORDERS_DEFAULT_RESPONSES,
+)
+async def bulk(request: Request):
+    """
+    Insere vários pedidos de uma só vez. O corpo pode ser uma lista JSON ou NDJSON,
+    um pedido por linha, e é lido e gravado em lotes à medida que é recebido. O
+    resultado de cada pedido é devolvido na ordem do corpo, e a falha de um pedido
+    não impede a inserção dos demais. Um erro de formato após o primeiro pedido
+    interrompe a leitura e é devolvido como o resultado da posição seguinte.
+    """
+    orders, items, position = list(), list(), 0
+    try:
+        async for item in _iter_bulk_body(request.stream()):
+            try:
+                orders.append((position, BulkOrderRequest.parse_obj(item).dict()))
+            except ValidationError as error:
+                items.append(
+                    {
+                        "position": position,
+                        "id": None,
+                        "status": 422,
+                        "error": str(error),
+                    }
+                )
+            position += 1
+            if len(orders) >= envs.DB_BULK_CHUNK_SIZE * envs.DB_BULK_CONCURRENCY:
+                items.extend(await order.bulk_insert_orders(orders))
+                orders.clear()
+    except BulkOrderException as error:
+        if not position:
+            raise
+        items.append(
+            {
+                "position": position,
+                "id": None,
+                "status": 400,
+                "error": error.error_details[0]["message"],
+            }
+        )
+    if not position:
+        raise _invalid_bulk_body("O corpo deve ser uma lista JSON ou NDJSON de pedidos")
+    if orders:
+        items.extend(await order.bulk_insert_orders(orders))
+    items.sort(key=lambda item: item["position"])
+    return {
+        "errors": any(item["status"] >= 300 for item in items),
+        "items": items,
+    }
 
 
 @router.get(
@@ -147,15 +461,34 @@ def get_orders(
     response_model=ListOdersResponse,
     responses=LIST_ORDERS_BY_USER_ID_DEFAULT_RESPONSES,
 )
-def get_orders_by_user_id(
+async def get_orders_by_user_id(
     request: Request,
     quantity: int = Query(10, description="Quantidade de registros de retorno", gt=0),
     page: int = Query(1, description="Página atual de retorno", gt=0),
     user_id: int = Query(1, description="Id do usuário associado ao pedido"),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    created_from: Optional[datetime] = Query(
+        None, description=CREATED_FROM_DESCRIPTION
+    ),
+    created_to: Optional[datetime] = Query(None, description=CREATED_TO_DESCRIPTION),
+    min_total: Optional[float] = Query(None, description=MIN_TOTAL_DESCRIPTION),
+    max_total: Optional[float] = Query(None, description=MAX_TOTAL_DESCRIPTION),
 ):
     """
     Listar todos os pedidos filtrando o resultado por id do usuário e paginando
     o resultado.
     """
-    orders, total = order.list_orders(user_id=user_id, quantity=quantity, page=page)
-    return pagination(orders, quantity, page, total, str(request.url))
+    orders, total, next_cursor = await order.list_orders(
+        user_id=user_id,
+        quantity=quantity,
+        page=page,
+        cursor=cursor,
+        created_from=created_from,
+        created_to=created_to,
+        min_total=min_total,
+        max_total=max_total,
+    )
+    url, value, relation = str(request.url), total["value"], total["relation"]
+    if cursor:
+        return cursor_pagination(orders, quantity, value, url, next_cursor, relation)
+    return pagination(orders, quantity, page, value, url, relation)
@@ -0,0 +1,123 @@
+from typing import Optional
+from datetime import datetime
+
+from fastapi import APIRouter, Path, Query
+
+from order_api.business import stats, counters
+from order_api.models.stats import (
+    Interval,
+    OrderStatsResponse,
+    UserOrderStatsResponse,
+    PeriodOrderStatsResponse,
+    UserOrderSummaryResponse,
+    STATS_DEFAULT_RESPONSES,
+)
+
+router = APIRouter()
+
+
+@router.get("/", include_in_schema=False)
+@router.get(
+    "",
+    status_code=200,
+    summary="Estatísticas dos pedidos",
+    response_model=OrderStatsResponse,
+    responses=STATS_DEFAULT_RESPONSES,
+)
+async def get_summary(
+    user_id: Optional[int] = Query(
+        None, description="Id do usuário associado aos pedidos"
+    ),
+    created_from: Optional[datetime] = Query(
+        None, description="Data de criação mínima dos pedidos"
+    ),
+    created_to: Optional[datetime] = Query(
+        None, description="Data de criação máxima dos pedidos"
+    ),
+):
+    """
+    Quantidade de pedidos, soma e média do valor total e soma da quantidade de itens,
+    filtrando ou não por usuário e período de criação.
+    """
+    return {
+        "result": await stats.summary(
+            user_id=user_id, created_from=created_from, created_to=created_to
+        )
+    }
+
+
+@router.get(
+    "/users",
+    status_code=200,
+    summary="Estatísticas dos pedidos por usuário",
+    response_model=UserOrderStatsResponse,
+    responses=STATS_DEFAULT_RESPONSES,
+)
+async def get_by_user(
+    size: int = Query(10, description="Quantidade de usuários", gt=0),
+    created_from: Optional[datetime] = Query(
+        None, description="Data de criação mínima dos pedidos"
+    ),
+    created_to: Optional[datetime] = Query(
+        None, description="Data de criação máxima dos pedidos"
+    ),
+):
+    """
+    Estatísticas dos usuários com mais pedidos, filtrando ou não por período de
+    criação.
+    """
+    return {
+        "result": await stats.by_user(
+            created_from=created_from, created_to=created_to, size=size
+        )
+    }
+
+
+@router.get(
+    "/users/{user_id}",
+    status_code=200,
+    summary="Resumo dos pedidos de um usuário",
+    response_model=UserOrderSummaryResponse,
+    responses=STATS_DEFAULT_RESPONSES,
+)
+async def get_user_summary(
+    user_id: int = Path(..., description="Id do usuário associado aos pedidos"),
+):
+    """
+    Quantidade de pedidos, valor total e data do último pedido de um usuário, lidos
+    dos contadores do usuário quando habilitados.
+    """
+    return {"result": await counters.summary(user_id)}
+
+
+@router.get(
+    "/histogram",
+    status_code=200,
+    summary="Estatísticas dos pedidos por período",
+    response_model=PeriodOrderStatsResponse,
+    responses=STATS_DEFAULT_RESPONSES,
+)
+async def get_histogram(
+    interval: Interval = Query(Interval.day, description="Tamanho do período"),
+    user_id: Optional[int] = Query(
+        None, description="Id do usuário associado aos pedidos"
+    ),
+    created_from: Optional[datetime] = Query(
+        None, description="Data de criação mínima dos pedidos"
+    ),
+    created_to: Optional[datetime] = Query(
+        None, description="Data de criação máxima dos pedidos"
+    ),
+):
+    """
+    Estatísticas dos pedidos por dia, semana ou mês de criação, filtrando ou não por
+    usuário e período de criação.
+    """
+    return {
+        "result": await stats.histogram(
+            interval=interval.value,
+            user_id=user_id,
+            created_from=created_from,
+            created_to=created_to,
+        )
+    }
@@ -0,0 +1,255 @@
+import json
+
+from loguru import logger
+from redis.exceptions import RedisError, WatchError
+
+from order_api.config import envs
+from order_api.services import metrics
+from order_api.services.redis import redis, local_cache
+from order_api.services.user import get_users_by_ids, user_api_unavailable
+from order_api.exceptions import ErrorDetails
+from order_api.exceptions.redis import RedisException
+from order_api.exceptions.order import UserNotFoundException, GetUserException
+
+NOT_FOUND = b"__not_found__"
+
+
+def _key(id_user) -> str:
+    return f"{envs.USER_CACHE_PREFIX}{id_user}"
+
+
+def _version_key(key: str) -> str:
+    return f"{envs.USER_CACHE_VERSION_PREFIX}{key[len(envs.USER_CACHE_PREFIX):]}"
+
+
+def _redis_unavailable(error: Exception) -> RedisException:
+    logger.error(f"Falha na comunicação com o redis: {error}")
+    return RedisException(
+        status=503,
+        error="Service Unavailable",
+        message="Serviço indisponível",
+        error_details=[
+            ErrorDetails(message="Um ou mais serviços não estão disppníveis").to_dict()
+        ],
+    )
+
+
+def _user_not_found(ids_user: list) -> UserNotFoundException:
+    return UserNotFoundException(
+        status=404,
+        error="Not Found",
+        message="Usuário não encontrado",
+        error_details=[
+            ErrorDetails(
+                message=f"O usuário {id_user} não foi encontrado na base"
+            ).to_dict()
+            for id_user in ids_user
+        ],
+    )
+
+
+async def get_user(id_user: int) -> dict:
+    """
+    Recupera um usuário passando pelo cache de usuários, ver :func:`get_users`.
+
+    :param int id_user: Id do usuário.
+    :raises UserNotFoundException: Se o usuário não existir.
+    :raises RedisException: Se o redis não estiver disponível.
+    :return: Dados do usuário.
+    :rtype: dict
+    """
+    return (await get_users({id_user}))[str(id_user)]
+
+
+async def get_users(ids_user: set, partial: bool = False) -> dict:
+    """
+    Recupera vários usuários passando pelo cache de usuários, ver
+    :func:`find_users`.
+
+    :param set ids_user: Ids distintos dos usuários.
+    :param partial: Se True e o microsserviço user-api não estiver disponível,
+    devolve apenas os usuários que estão em cache em vez de lançar uma exceção.
+    :type partial: bool, optional
+    :raises UserNotFoundException: Se algum dos usuários não existir.
+    :raises GetUserException: Se o microsserviço user-api não estiver disponível e
+    `partial` for False.
+    :raises RedisException: Se o redis não estiver disponível.
+    :return: Dicionário no formato id do usuário: dados do usuário.
+    :rtype: dict
+    """
+    users, not_found = await find_users(ids_user, partial)
+    if not_found:
+        raise _user_not_found(not_found)
+    return users
+
+
+async def find_users(ids_user: set, partial: bool = False) -> tuple:
+    """
+    Recupera vários usuários passando por dois níveis de cache. O primeiro é o
+    cache em memória do worker, ver :class:`services.redis.LocalCache`. As chaves
+    que não estiverem nele são buscadas no redis, com um único `MGET`, e os usuários
+    que também não estiverem no redis são consultados no microsserviço user-api em
+    uma única requisição. Os usuários consultados são gravados no redis com o tempo
+    de expiração `USER_CACHE_TTL`. Usuários inexistentes também são gravados, por
+    `USER_CACHE_NOT_FOUND_TTL` segundos, evitando consultas repetidas ao user-api.
+
+    :param set ids_user: Ids distintos dos usuários.
+    :param partial: Se True e o microsserviço user-api não estiver disponível, os
+    usuários que não estão em cache são omitidos do resultado em vez de lançar uma
+    exceção.
+    :type partial: bool, optional
+    :raises GetUserException: Se o microsserviço user-api não estiver disponível e
+    `partial` for False.
+    :raises UserApiRequestException: Se o user-api recusar a requisição.
+    :raises RedisException: Se o redis não estiver disponível.
+    :return: Dicionário no formato id do usuário: dados do usuário e lista com os
+    ids dos usuários que não existem.
+    :rtype: tuple
+    """
+    keys = {_key(id_user): str(id_user) for id_user in ids_user}
+    if not keys:
+        return {}, []
+    values = await local_cache.get_many_or_load(list(keys), _load)
+    if len(values) < len(keys):
+        if not partial:
+            raise user_api_unavailable()
+        metrics.incr("user_cache_degraded", len(keys) - len(values))
+
+    users, not_found = dict(), list()
+    for key, value in values.items():
+        if value == NOT_FOUND:
+            not_found.append(keys[key])
+        else:
+            users[keys[key]] = json.loads(value)
+    return users, not_found
+
+
+async def find_users_in_batches(ids_user: set, partial: bool = False) -> tuple:
+    """
+    Recupera vários usuários em lotes de até `USER_API_BATCH_MAX_IDS` usuários, ver
+    :func:`find_users`, limitando o tamanho de cada consulta ao redis e ao
+    user-api quando a quantidade de usuários não é limitada por uma página.
+
+    :param set ids_user: Ids distintos dos usuários.
+    :param partial: Ver :func:`find_users`.
+    :type partial: bool, optional
+    :return: Dicionário no formato id do usuário: dados do usuário e lista com os
+    ids dos usuários que não existem.
+    :rtype: tuple
+    """
+    ids_user, size = list(ids_user), envs.USER_API_BATCH_MAX_IDS
+    users, not_found = dict(), list()
+    for start in range(0, len(ids_user), size):
+        found, missing = await find_users(set(ids_user[start : start + size]), partial)
+        users.update(found)
+        not_found.extend(missing)
+    return users, not_found
+
+
+async def invalidate_users(*ids_user: int):
+    """
+    Remove usuários dos dois níveis de cache. Deve ser chamado sempre que os dados
+    de um usuário forem alterados ou o usuário for removido. A versão de cada
+    usuário no redis é incrementada, assim uma carga iniciada antes da remoção não
+    grava o usuário desatualizado de volta no cache, ver :func:`_set_many`.
+
+    :param int ids_user: Ids dos usuários.
+    :raises RedisException: Se o redis não estiver disponível.
+    """
+    keys = [_key(id_user) for id_user in ids_user]
+    if not keys:
+        return
+    local_cache.delete(*keys)
+    try:
+        async with redis.pipeline(transaction=False) as pipeline:
+            pipeline.delete(*keys)
+            for key in keys:
+                pipeline.incr(_version_key(key))
+                pipeline.expire(_version_key(key), envs.USER_CACHE_TTL)
+            await pipeline.execute()
+    except RedisError as error:
+        raise _redis_unavailable(error)
+
+
+async def _load(keys: list) -> dict:
+    """
+    Carrega as chaves ausentes do cache em memória, buscando primeiro no redis e
+    depois no microsserviço user-api. Se o microsserviço user-api não estiver
+    disponível, devolve apenas as chaves encontradas no redis. A carga pode ser
+    compartilhada por requisições com e sem `partial`, ver :func:`find_users`,
+    por isso não lança exceção nesse caso.
+
+    :param list keys: Chaves dos usuários.
+    :raises RedisException: Se o redis não estiver disponível.
+    :return: Dicionário no formato chave: usuário serializado.
+    :rtype: dict
+    """
+    try:
+        values = await redis.mget(keys + [_version_key(key) for key in keys])
+    except RedisError as error:
+        raise _redis_unavailable(error)
+
+    versions = dict(zip(keys, values[len(keys) :]))
+    found, misses = dict(), list()
+    for key, value in zip(keys, values):
+        if value is None:
+            misses.append(key)
+        else:
+            found[key] = value
+    metrics.incr("user_cache_hits", len(found))
+    metrics.incr(
+        "user_cache_negative_hits",
+        len([value for value in found.values() if value == NOT_FOUND]),
+    )
+    metrics.incr("user_cache_misses", len(misses))
+
+    if misses:
+        prefix = len(envs.USER_CACHE_PREFIX)
+        try:
+            users, not_found = await get_users_by_ids([key[prefix:] for key in misses])
+        except GetUserException:
+            return found
+        fetched = {
+            _key(id_user): json.dumps(user).encode() for id_user, user in users.items()
+        }
+        fetched.update({_key(id_user): NOT_FOUND for id_user in not_found})
+        await _set_many(fetched, versions)
+        found.update(fetched)
+    return found
+
+
+async def _set_many(values: dict, versions: dict):
+    """
+    Grava no redis, em uma única transação, os usuários consultados e os usuários
+    inexistentes, cada um com o seu tempo de expiração. Um usuário só é gravado se
+    a sua versão não mudou desde o início da carga, isto é, se ele não foi
+    invalidado enquanto era consultado no user-api, ver :func:`invalidate_users`.
+    As versões são observadas com `WATCH`, assim uma invalidação concorrente com a
+    gravação cancela a transação e nenhum usuário é gravado.
+
+    :param dict values: Dicionário no formato chave: usuário serializado.
+    :param dict versions: Dicionário no formato chave: versão lida no início da
+    carga.
+    :raises RedisException: Se o redis não estiver disponível.
+    """
+    version_keys = [_version_key(key) for key in values]
+    try:
+        async with redis.pipeline(transaction=True) as pipeline:
+            await pipeline.watch(*version_keys)
+            current = await pipeline.mget(version_keys)
+            pipeline.multi()
+            for (key, value), version in zip(values.items(), current):
+                if version != versions.get(key):
+                    metrics.incr("user_cache_stale_writes_skipped")
+                    continue
+                ttl = (
+                    envs.USER_CACHE_NOT_FOUND_TTL
+                    if value == NOT_FOUND
+                    else envs.USER_CACHE_TTL
+                )
+                pipeline.set(key, value, ex=ttl)
+            await pipeline.execute()
+    except WatchError:
+        metrics.incr("user_cache_stale_writes_skipped", len(values))
+    except RedisError as error:
+        raise _redis_unavailable(error)
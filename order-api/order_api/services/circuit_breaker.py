@@ -0,0 +1,127 @@
+import time
+
+from loguru import logger
+
+from order_api.services import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Disjuntor (`circuit breaker`) para chamadas a um serviço externo. Fechado, todas
+    as chamadas são permitidas e as falhas consecutivas são contadas; chamadas mais
+    lentas que `slow_call` segundos também contam como falha. Ao atingir
+    `failure_threshold` falhas o disjuntor abre e as chamadas são recusadas sem
+    chegar ao serviço. Após `recovery_timeout` segundos o disjuntor fica meio aberto
+    e permite uma única chamada de teste: se ela tiver sucesso o disjuntor fecha,
+    caso contrário volta a abrir. Uma chamada de teste sem resultado após
+    `recovery_timeout` segundos, por exemplo cancelada, libera uma nova chamada.
+
+    O estado, a quantidade de chamadas, de falhas e a latência média são expostos
+    nos contadores da aplicação com o prefixo `name`, ver :mod:`services.metrics`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        recovery_timeout: float,
+        slow_call: float,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.slow_call = slow_call
+        self.__state = CLOSED
+        self.__failures = 0
+        self.__opened_at = 0.0
+        self.__probing_since = None
+        self.__latency = None
+        metrics.gauge(f"{self.name}_circuit_state", STATES[CLOSED])
+
+    @property
+    def state(self) -> str:
+        if self.__state == OPEN and self.__recovered():
+            return HALF_OPEN
+        return self.__state
+
+    def allow(self) -> bool:
+        """
+        Indica se uma chamada pode ser feita. Com o disjuntor meio aberto apenas uma
+        chamada de teste é permitida por vez.
+
+        :return: True se a chamada for permitida.
+        :rtype: bool
+        """
+        if self.__state == OPEN and self.__recovered():
+            self.__transition(HALF_OPEN)
+        if self.__state == CLOSED:
+            return True
+        if self.__state == HALF_OPEN and not self.__probing():
+            self.__probing_since = time.monotonic()
+            return True
+        metrics.incr(f"{self.name}_circuit_rejected")
+        return False
+
+    def record_success(self, latency: float):
+        """
+        Registra uma chamada que teve resposta do serviço.
+
+        :param float latency: Duração da chamada em segundos.
+        """
+        metrics.incr(f"{self.name}_calls")
+        self.__observe(latency)
+        if latency > self.slow_call:
+            metrics.incr(f"{self.name}_slow_calls")
+            self.__fail()
+            return
+        self.__probing_since = None
+        self.__failures = 0
+        if self.__state != CLOSED:
+            self.__transition(CLOSED)
+
+    def record_failure(self, latency: float):
+        """
+        Registra uma chamada que falhou.
+
+        :param float latency: Duração da chamada em segundos.
+        """
+        metrics.incr(f"{self.name}_calls")
+        metrics.incr(f"{self.name}_errors")
+        self.__observe(latency)
+        self.__fail()
+
+    def __fail(self):
+        self.__probing_since = None
+        self.__failures += 1
+        if self.__state == HALF_OPEN or self.__failures >= self.failure_threshold:
+            self.__opened_at = time.monotonic()
+            if self.__state != OPEN:
+                metrics.incr(f"{self.name}_circuit_opened")
+                self.__transition(OPEN)
+
+    def __probing(self) -> bool:
+        return (
+            self.__probing_since is not None
+            and time.monotonic() - self.__probing_since < self.recovery_timeout
+        )
+
+    def __recovered(self) -> bool:
+        return time.monotonic() - self.__opened_at >= self.recovery_timeout
+
+    def __observe(self, latency: float):
+        if self.__latency is None:
+            self.__latency = latency
+        else:
+            self.__latency = 0.8 * self.__latency + 0.2 * latency
+        metrics.gauge(f"{self.name}_latency_ms", round(self.__latency * 1000, 3))
+
+    def __transition(self, state: str):
+        logger.warning(f"Circuito {self.name}: {self.__state} -> {state}")
+        self.__state = state
+        metrics.gauge(f"{self.name}_circuit_state", STATES[state])
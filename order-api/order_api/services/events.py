@@ -0,0 +1,79 @@
+import asyncio
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from order_api.config import envs
+from order_api.services import metrics
+from order_api.services.redis import redis
+from order_api.services.cache import invalidate_users
+from order_api.exceptions.redis import RedisException
+
+_task = None
+
+
+async def consume_user_events():
+    """
+    Consome o stream `USER_EVENTS_STREAM` do redis, no qual o user-api publica os
+    eventos de inclusão, alteração e remoção de usuários, e remove os usuários
+    alterados dos dois níveis de cache, ver :func:`services.cache.invalidate_users`.
+
+    Cada worker consome todos os eventos, pois cada um possui o seu cache em
+    memória. O id do último evento processado é gravado em
+    `USER_EVENTS_STREAM`:last-id, assim, ao iniciar, o worker processa também os
+    eventos publicados enquanto a aplicação estava fora do ar. Processar um evento
+    mais de uma vez não tem efeito colateral.
+    """
+    last_id_key = f"{envs.USER_EVENTS_STREAM}:last-id"
+    last_id = None
+    while True:
+        try:
+            if last_id is None:
+                last_id = await redis.get(last_id_key) or await _stream_end()
+            response = await redis.xread(
+                {envs.USER_EVENTS_STREAM: last_id},
+                count=envs.USER_EVENTS_BATCH_SIZE,
+                block=envs.USER_EVENTS_BLOCK_MS,
+            )
+            for _, events in response:
+                ids_user = {event.get(b"id_user").decode() for _, event in events}
+                await invalidate_users(*ids_user)
+                last_id = events[-1][0]
+                await redis.set(last_id_key, last_id)
+                metrics.incr("user_events_processed", len(events))
+        except (RedisError, RedisException) as error:
+            metrics.incr("user_events_errors")
+            logger.error(f"Falha ao consumir os eventos de usuários: {error}")
+            await asyncio.sleep(envs.USER_EVENTS_RETRY_INTERVAL)
+
+
+async def _stream_end() -> str:
+    """
+    Id do último evento do stream, ou `0-0` se o stream estiver vazio. Usado em
+    vez de `$` para não perder os eventos publicados entre duas leituras.
+    """
+    last = await redis.xrevrange(envs.USER_EVENTS_STREAM, count=1)
+    return last[0][0] if last else "0-0"
+
+
+def start():
+    """
+    Inicia o consumo dos eventos de usuários em uma task do event loop do worker.
+    """
+    global _task
+    if envs.USER_EVENTS_ENABLED and _task is None:
+        _task = asyncio.get_running_loop().create_task(consume_user_events())
+
+
+async def stop():
+    """
+    Encerra o consumo dos eventos de usuários.
+    """
+    global _task
+    task, _task = _task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,238 @@
+import os
+import time
+import zlib
+import socket
+import asyncio
+import threading
+from uuid import uuid4
+
+from loguru import logger
+from redis.exceptions import RedisError, WatchError
+
+from order_api.config import envs
+from order_api.services import metrics
+from order_api.services.redis import redis
+
+EPOCH_MS = 1609459200000
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+
+_task = None
+_owner = None
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class Snowflake:
+    """
+    Gerador de ids ordenados pelo tempo no formato snowflake: um inteiro de 63 bits
+    composto pelos milissegundos desde `EPOCH_MS` (41 bits), pelo id do worker
+    (10 bits) e por uma sequência dentro do mesmo milissegundo (12 bits). Os ids
+    gerados por um worker são crescentes e ids de workers distintos nunca se
+    repetem, sem nenhuma coordenação a cada id gerado.
+
+    Ids crescentes mantêm os documentos gravados no mesmo período próximos nos
+    segmentos do elasticsearch, diferente de uuids aleatórios, e permitem ordenar
+    os pedidos pelo id.
+
+    Quando a sequência de um milissegundo se esgota, ou quando o relógio volta no
+    tempo, os ids seguintes usam os milissegundos seguintes ao último id gerado, sem
+    bloquear o worker.
+    """
+
+    def __init__(self, worker_id: int = 0):
+        self.worker_id = worker_id
+        self.__last = 0
+        self.__sequence = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def worker_id(self) -> int:
+        return self.__worker_id
+
+    @worker_id.setter
+    def worker_id(self, worker_id: int):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"O id do worker deve estar entre 0 e {MAX_WORKER_ID}")
+        self.__worker_id = worker_id
+
+    def next_id(self) -> int:
+        """
+        Gera um novo id.
+
+        :return: Id ordenado pelo tempo.
+        :rtype: int
+        """
+        with self.__lock:
+            now = max(_now_ms(), self.__last)
+            if now == self.__last:
+                self.__sequence = (self.__sequence + 1) & SEQUENCE_MASK
+                if self.__sequence == 0:
+                    now += 1
+            else:
+                self.__sequence = 0
+            self.__last = now
+            return (
+                (now - EPOCH_MS) << (WORKER_BITS + SEQUENCE_BITS)
+                | self.__worker_id << SEQUENCE_BITS
+                | self.__sequence
+            )
+
+
+def _default_worker_id() -> int:
+    if envs.ORDER_ID_WORKER_ID is not None:
+        return envs.ORDER_ID_WORKER_ID
+    return zlib.crc32(f"{socket.gethostname()}-{os.getpid()}".encode()) & MAX_WORKER_ID
+
+
+generator = Snowflake(_default_worker_id())
+
+
+def new_id() -> int:
+    """
+    Gera um novo id de pedido, ver :class:`Snowflake`.
+
+    :return: Id ordenado pelo tempo.
+    :rtype: int
+    """
+    return generator.next_id()
+
+
+def _worker_key(worker_id: int) -> str:
+    return f"{envs.ORDER_ID_WORKER_KEY}:{worker_id}"
+
+
+async def _acquire() -> bool:
+    """
+    Tenta arrendar um id de worker livre, começando pelo id padrão do worker, com
+    `SET NX` e validade de `ORDER_ID_WORKER_LEASE_TTL` segundos.
+
+    :return: True se um id foi arrendado.
+    :rtype: bool
+    """
+    global _owner
+    _owner = _owner or f"{socket.gethostname()}-{os.getpid()}-{uuid4().hex}"
+    start = _default_worker_id()
+    candidates = [
+        (start + offset) & MAX_WORKER_ID for offset in range(MAX_WORKER_ID + 1)
+    ]
+    owners = await redis.mget([_worker_key(worker_id) for worker_id in candidates])
+    for worker_id, owner in zip(candidates, owners):
+        if owner is not None:
+            continue
+        if await redis.set(
+            _worker_key(worker_id),
+            _owner,
+            nx=True,
+            ex=envs.ORDER_ID_WORKER_LEASE_TTL,
+        ):
+            generator.worker_id = worker_id
+            logger.info(f"Id do worker para geração de ids: {worker_id}")
+            return True
+    return False
+
+
+async def _renew() -> bool:
+    """
+    Renova o arrendamento do id atual, se ele ainda pertencer ao worker.
+
+    :return: False se o arrendamento foi perdido.
+    :rtype: bool
+    """
+    key = _worker_key(generator.worker_id)
+    try:
+        async with redis.pipeline(transaction=True) as pipeline:
+            await pipeline.watch(key)
+            owner = await pipeline.get(key)
+            if owner is not None and owner.decode() != _owner:
+                return False
+            pipeline.multi()
+            pipeline.set(key, _owner, ex=envs.ORDER_ID_WORKER_LEASE_TTL)
+            await pipeline.execute()
+    except WatchError:
+        return False
+    return True
+
+
+async def _heartbeat():
+    while True:
+        await asyncio.sleep(envs.ORDER_ID_WORKER_LEASE_TTL / 3)
+        try:
+            if await _renew():
+                continue
+            metrics.incr("order_id_worker_lease_lost")
+            logger.error(
+                f"Arrendamento do id do worker {generator.worker_id} perdido, "
+                "arrendando um novo id"
+            )
+            if not await _acquire():
+                logger.error("Nenhum id de worker livre para geração de ids")
+        except RedisError as error:
+            metrics.incr("order_id_worker_lease_errors")
+            logger.error(f"Falha ao renovar o id do worker: {error}")
+
+
+async def register():
+    """
+    Arrenda no redis um id de worker livre, a chave `ORDER_ID_WORKER_KEY`:<id>, para
+    que os workers de todas as instâncias da aplicação usem ids distintos. O
+    arrendamento vale por `ORDER_ID_WORKER_LEASE_TTL` segundos e é renovado por uma
+    task do event loop do worker a cada terço desse tempo, assim o id de um worker
+    encerrado sem :func:`release` volta a ficar livre. Se o arrendamento for
+    perdido, por exemplo com o redis indisponível por mais que a validade, outro id
+    livre é arrendado.
+
+    Com `ORDER_ID_WORKER_ID` configurado, com o redis indisponível ou sem nenhum id
+    livre o id do worker é mantido: o id configurado ou, por padrão, um hash do host
+    e do processo, que pode se repetir entre workers.
+    """
+    global _task
+    if envs.ORDER_ID_WORKER_ID is not None:
+        return
+    try:
+        acquired = await _acquire()
+    except RedisError as error:
+        logger.warning(
+            f"Falha ao reservar o id do worker, usando {generator.worker_id}: {error}"
+        )
+        return
+    if not acquired:
+        logger.warning(
+            f"Nenhum id de worker livre, usando {generator.worker_id}, que pode se "
+            "repetir entre workers"
+        )
+        return
+    if _task is None:
+        _task = asyncio.get_running_loop().create_task(_heartbeat())
+
+
+async def release():
+    """
+    Encerra a renovação do arrendamento e libera o id do worker, se ele ainda
+    pertencer ao worker.
+    """
+    global _task
+    task, _task = _task, None
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    key = _worker_key(generator.worker_id)
+    try:
+        async with redis.pipeline(transaction=True) as pipeline:
+            await pipeline.watch(key)
+            owner = await pipeline.get(key)
+            if owner is None or owner.decode() != _owner:
+                return
+            pipeline.multi()
+            pipeline.delete(key)
+            await pipeline.execute()
+    except (RedisError, WatchError) as error:
+        logger.warning(f"Falha ao liberar o id do worker: {error}")
@@ -0,0 +1,41 @@
+from threading import Lock
+from collections import Counter
+
+_counters = Counter()
+_lock = Lock()
+
+
+def incr(name: str, value: int = 1):
+    """
+    Incrementa um contador da aplicação. Os contadores são mantidos em memória,
+    portanto cada worker do gunicorn possui os seus.
+
+    :param str name: Nome do contador.
+    :param value: Valor a ser somado ao contador, por padrão 1.
+    :type value: int, optional
+    """
+    with _lock:
+        _counters[name] += value
+
+
+def gauge(name: str, value: float):
+    """
+    Define o valor atual de um indicador da aplicação, como o estado de um
+    disjuntor ou uma latência média.
+
+    :param str name: Nome do indicador.
+    :param float value: Valor atual.
+    """
+    with _lock:
+        _counters[name] = value
+
+
+def snapshot() -> dict:
+    """
+    Devolve uma cópia de todos os contadores e indicadores do worker.
+
+    :return: Dicionário no formato nome do contador: valor.
+    :rtype: dict
+    """
+    with _lock:
+        return dict(_counters)
@@ -1,6 +1,168 @@
-import redis
+import time
+import threading
+from collections import OrderedDict
+
+from redis import asyncio as aioredis
 
 from order_api.config import envs
+from order_api.services import metrics
+from order_api.services.singleflight import SingleFlight
+
+redis = aioredis.Redis(host=envs.REDIS_URL, port=6379, db=0)
+
+
+class LocalCache:
+    """
+    Cache LRU em memória que fica à frente do redis. Cada worker do gunicorn possui
+    a sua própria instância, limitada pela quantidade de entradas e pela quantidade
+    de bytes armazenados, e cada entrada expira após `ttl` segundos. Os valores são
+    mantidos serializados, assim como são gravados no redis.
+
+    Para evitar o efeito manada (`cache stampede`), quando várias requisições não
+    encontram a mesma chave apenas uma delas executa a carga, as demais aguardam
+    e aproveitam o valor carregado, ver :meth:`get_many_or_load` e
+    :class:`services.singleflight.SingleFlight`. Uma chave removida durante a sua
+    carga não é gravada com o valor carregado, que pode estar desatualizado.
+    """
+
+    def __init__(self, name: str, max_entries: int, max_bytes: int, ttl: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.__entries = OrderedDict()
+        self.__bytes = 0
+        self.__lock = threading.Lock()
+        self.__flight = SingleFlight(name)
+        self.__loading = 0
+        self.__generation = 0
+        self.__invalidated = dict()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    @property
+    def size(self) -> int:
+        return self.__bytes
+
+    def get(self, key: str) -> bytes:
+        """
+        Recupera uma chave do cache, marcando-a como a mais recentemente utilizada.
+
+        :param str key: Chave.
+        :return: Valor armazenado ou None caso a chave não exista ou tenha expirado.
+        :rtype: bytes
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self.__remove(key)
+                return None
+            self.__entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        """
+        Grava uma chave no cache, removendo as entradas menos utilizadas caso algum
+        dos limites seja ultrapassado.
+
+        :param str key: Chave.
+        :param bytes value: Valor serializado.
+        """
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return
+        with self.__lock:
+            self.__remove(key)
+            self.__entries[key] = (time.monotonic() + self.ttl, value)
+            self.__bytes += size
+            while (
+                len(self.__entries) > self.max_entries or self.__bytes > self.max_bytes
+            ):
+                self.__remove(next(iter(self.__entries)))
+
+    def delete(self, *keys: str):
+        """
+        Remove chaves do cache.
+
+        :param str keys: Chaves a serem removidas.
+        """
+        with self.__lock:
+            if self.__loading:
+                self.__generation += 1
+            for key in keys:
+                self.__remove(key)
+                if self.__loading:
+                    self.__invalidated[key] = self.__generation
+
+    def clear(self):
+        """
+        Remove todas as chaves do cache.
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.__bytes = 0
+
+    async def get_many_or_load(self, keys: list, loader) -> dict:
+        """
+        Recupera várias chaves do cache, carregando as que não existirem com uma
+        única chamada ao `loader`. Enquanto uma requisição carrega uma chave, as
+        demais requisições que precisam da mesma chave aguardam o fim da carga em vez
+        de repeti-la.
+
+        :param list keys: Chaves.
+        :param loader: Função assíncrona que recebe a lista de chaves ausentes e
+        devolve um dicionário no formato chave: valor serializado.
+        :return: Dicionário no formato chave: valor serializado. As chaves que o
+        `loader` não devolver ficam ausentes.
+        :rtype: dict
+        """
+        values = dict()
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+        metrics.incr(f"{self.name}_hits", len(values))
+        missing = sorted(set(keys) - values.keys())
+        if not missing:
+            return values
+
+        async def load(missing: list) -> dict:
+            with self.__lock:
+                self.__loading += 1
+                started = self.__generation
+            try:
+                loaded = await loader(missing)
+            finally:
+                with self.__lock:
+                    self.__loading -= 1
+                    invalidated = {
+                        key
+                        for key, generation in self.__invalidated.items()
+                        if generation > started
+                    }
+                    if not self.__loading:
+                        self.__invalidated.clear()
+            for key, value in loaded.items():
+                if key not in invalidated:
+                    self.set(key, value)
+            return loaded
+
+        values.update(await self.__flight.do_many(missing, load))
+        return values
+
+    def __remove(self, key: str):
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.__bytes -= len(key) + len(entry[1])
 
 
-redis = redis.Redis(host=envs.REDIS_URL, port=6379, db=0)
+local_cache = LocalCache(
+    name="user_local_cache",
+    max_entries=envs.USER_LOCAL_CACHE_MAX_ENTRIES,
+    max_bytes=envs.USER_LOCAL_CACHE_MAX_BYTES,
+    ttl=envs.USER_LOCAL_CACHE_TTL,
+)
@@ -0,0 +1,95 @@
+import asyncio
+
+from order_api.services import metrics
+
+
+def _consume(future: asyncio.Future):
+    if not future.cancelled():
+        future.exception()
+
+
+class SingleFlight:
+    """
+    Agrupa cargas simultâneas da mesma chave (`request coalescing`). Enquanto uma
+    chave está sendo carregada, as demais requisições do worker que precisam dela
+    aguardam a mesma carga em vez de repeti-la, recebendo o mesmo resultado ou a
+    mesma exceção.
+
+    A carga é executada em uma task própria, assim o cancelamento da requisição que
+    a iniciou, por exemplo quando o cliente desconecta, não cancela a carga das
+    demais requisições que aguardam a mesma chave.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.__calls = dict()
+        self.__tasks = set()
+
+    def __len__(self):
+        return len(self.__calls)
+
+    async def do(self, key: str, loader):
+        """
+        Carrega uma chave, aguardando a carga em andamento caso exista.
+
+        :param str key: Chave.
+        :param loader: Função assíncrona, sem parâmetros, que carrega a chave.
+        :return: Valor carregado.
+        """
+
+        async def load(keys: list) -> dict:
+            return {key: await loader()}
+
+        return (await self.do_many([key], load)).get(key)
+
+    async def do_many(self, keys: list, loader) -> dict:
+        """
+        Carrega várias chaves. As chaves que já estão sendo carregadas aguardam a
+        carga em andamento e as demais são carregadas com uma única chamada ao
+        `loader`.
+
+        :param list keys: Chaves.
+        :param loader: Função assíncrona que recebe a lista de chaves a carregar e
+        devolve um dicionário no formato chave: valor. As chaves ausentes do
+        dicionário também ficam ausentes do resultado.
+        :return: Dicionário no formato chave: valor.
+        :rtype: dict
+        """
+        loop = asyncio.get_running_loop()
+        waiting = {key: self.__calls[key] for key in keys if key in self.__calls}
+        missing = [key for key in dict.fromkeys(keys) if key not in waiting]
+        metrics.incr(f"{self.name}_coalesced", len(waiting))
+        if missing:
+            futures = {key: loop.create_future() for key in missing}
+            for future in futures.values():
+                future.add_done_callback(_consume)
+            self.__calls.update(futures)
+            task = loop.create_task(self.__load(futures, loader))
+            self.__tasks.add(task)
+            task.add_done_callback(self.__tasks.discard)
+            waiting.update(futures)
+
+        values = dict()
+        for key, future in waiting.items():
+            value = await asyncio.shield(future)
+            if value is not None:
+                values[key] = value
+        return values
+
+    async def __load(self, futures: dict, loader):
+        try:
+            values = await loader(list(futures))
+        except Exception as error:
+            for future in futures.values():
+                future.set_exception(error)
+        except BaseException:
+            for future in futures.values():
+                future.cancel()
+            raise
+        else:
+            for key, future in futures.items():
+                future.set_result(values.get(key))
+        finally:
+            for key, future in futures.items():
+                if self.__calls.get(key) is future:
+                    del self.__calls[key]
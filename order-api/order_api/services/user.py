@@ -1,23 +1,172 @@
-import requests
+import time
+import random
+import asyncio
+
+import httpx
 
 from order_api.config import envs
+from order_api.services import metrics
+from order_api.services.circuit_breaker import CircuitBreaker
 from order_api.exceptions import ErrorDetails
-from order_api.exceptions.order import UserNotFoundException
-
-
-def get_user_by_id(id_user: int):
-    user_url = f"{envs.USER_API_ADDRESS}/v1/user/{id_user}"
-    response = requests.get(url=user_url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise UserNotFoundException(
-            status=404,
-            error="Not Found",
-            message="Usuário não encontrado",
-            error_details=[
-                ErrorDetails(
-                    message=f"O usuário {id_user} não foi encontrado na base"
-                ).to_dict()
-            ],
+from order_api.exceptions.order import GetUserException, UserApiRequestException
+
+RETRY_STATUS = {502, 503, 504}
+
+_client = None
+
+breaker = CircuitBreaker(
+    name="user_api",
+    failure_threshold=envs.USER_API_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=envs.USER_API_BREAKER_RECOVERY_TIMEOUT,
+    slow_call=envs.USER_API_BREAKER_SLOW_CALL,
+)
+
+
+def client() -> httpx.AsyncClient:
+    """
+    Cria, caso ainda não exista, o cliente HTTP assíncrono do microsserviço
+    user-api compartilhado por todo o processo. O cliente mantém um pool de até
+    `USER_API_POOL_MAXSIZE` conexões persistentes, fechadas após
+    `USER_API_KEEPALIVE_EXPIRY` segundos ociosas. Os tempos limite de conexão, de
+    leitura e de espera por uma conexão livre do pool são configurados
+    separadamente, assim uma degradação do user-api não prende as requisições do
+    order-api indefinidamente.
+
+    :return: Cliente HTTP.
+    :rtype: :class:`httpx.AsyncClient`
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=envs.USER_API_ADDRESS,
+            timeout=httpx.Timeout(
+                connect=envs.USER_API_CONNECT_TIMEOUT,
+                read=envs.USER_API_READ_TIMEOUT,
+                write=envs.USER_API_READ_TIMEOUT,
+                pool=envs.USER_API_POOL_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=envs.USER_API_POOL_MAXSIZE,
+                max_keepalive_connections=envs.USER_API_POOL_MAXSIZE,
+                keepalive_expiry=envs.USER_API_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
+
+
+async def close():
+    """
+    Fecha todas as conexões do pool do cliente HTTP do microsserviço user-api.
+    """
+    global _client
+    http_client, _client = _client, None
+    if http_client is not None:
+        await http_client.aclose()
+
+
+def user_api_unavailable() -> GetUserException:
+    return GetUserException(
+        status=503,
+        error="Service Unavailable",
+        message="Serviço indisponível",
+        error_details=[
+            ErrorDetails(
+                message="O microsserviço user-api não está disponível"
+            ).to_dict()
+        ],
+    )
+
+
+def user_api_rejected(response: httpx.Response) -> UserApiRequestException:
+    return UserApiRequestException(
+        status=502,
+        error="Bad Gateway",
+        message="Requisição recusada pelo user-api",
+        error_details=[
+            ErrorDetails(
+                message=f"O user-api respondeu {response.status_code}: {response.text}"
+            ).to_dict()
+        ],
+    )
+
+
+async def _get(url: str, params: dict = None) -> httpx.Response:
+    """
+    Executa um GET no microsserviço user-api. Falhas de rede, tempos limite
+    excedidos e respostas 502, 503 e 504 são repetidos até `USER_API_MAX_RETRIES`
+    vezes, aguardando entre as tentativas um tempo aleatório (`full jitter`) de até
+    `USER_API_RETRY_BACKOFF` segundos, dobrado a cada tentativa. O tempo aleatório
+    evita que os workers repitam as requisições ao mesmo tempo.
+
+    Cada tentativa passa pelo disjuntor do user-api, ver
+    :class:`services.circuit_breaker.CircuitBreaker`. Com o disjuntor aberto a
+    requisição falha imediatamente, sem aguardar os tempos limite. Respostas 4xx
+    indicam uma requisição inválida, não uma indisponibilidade, e são devolvidas
+    sem repetição.
+
+    :param str url: Caminho do recurso.
+    :param params: Parâmetros da query string.
+    :type params: dict, optional
+    :raises GetUserException: Se o microsserviço user-api não estiver disponível
+    após todas as tentativas ou se o disjuntor estiver aberto.
+    :return: Resposta do user-api.
+    :rtype: :class:`httpx.Response`
+    """
+    for attempt in range(envs.USER_API_MAX_RETRIES + 1):
+        if not breaker.allow():
+            break
+        if attempt:
+            metrics.incr("user_api_retries")
+            backoff = envs.USER_API_RETRY_BACKOFF * 2 ** (attempt - 1)
+            await asyncio.sleep(random.uniform(0, backoff))
+        start = time.monotonic()
+        try:
+            response = await client().get(url, params=params)
+        except httpx.TransportError:
+            breaker.record_failure(time.monotonic() - start)
+            continue
+        if response.status_code in RETRY_STATUS:
+            breaker.record_failure(time.monotonic() - start)
+            continue
+        breaker.record_success(time.monotonic() - start)
+        return response
+    metrics.incr("user_api_failures")
+    raise user_api_unavailable()
+
+
+async def _get_batch(ids_user: list) -> tuple:
+    response = await _get("/v1/user/batch", params={"ids": ids_user})
+    if 400 <= response.status_code < 500:
+        metrics.incr("user_api_client_errors")
+        raise user_api_rejected(response)
+    if response.status_code != 200:
+        raise user_api_unavailable()
+    content = response.json()
+    return content.get("result"), [str(id_user) for id_user in content.get("not_found")]
+
+
+async def get_users_by_ids(ids_user: list) -> tuple:
+    """
+    Recupera vários usuários do microsserviço user-api. Os ids são enviados em
+    lotes de até `USER_API_BATCH_MAX_IDS`, o limite do endpoint de lote do
+    user-api, e os lotes são consultados em paralelo.
+
+    :param list ids_user: Ids dos usuários.
+    :raises GetUserException: Se o microsserviço user-api não estiver disponível.
+    :raises UserApiRequestException: Se o user-api recusar a requisição (4xx).
+    :return: Dicionário no formato id do usuário: dados do usuário e lista com os
+    ids dos usuários que não foram encontrados.
+    :rtype: tuple
+    """
+    ids_user, size = list(ids_user), envs.USER_API_BATCH_MAX_IDS
+    batches = await asyncio.gather(
+        *(
+            _get_batch(ids_user[start : start + size])
+            for start in range(0, len(ids_user), size)
         )
+    )
+    users, not_found = dict(), list()
+    for batch_users, batch_not_found in batches:
+        users.update(batch_users)
+        not_found.extend(batch_not_found)
+    return users, not_found
@@ -12,7 +12,7 @@ run_requirements = [
     "uvicorn==0.15.0",
     "gunicorn==20.1.0",
     "aiofiles==0.7.0",
-    "requests==2.23.0",
+    "httpx==0.18.2",
     "sphinx-rtd-theme==0.5.2",
     "recommonmark==0.7.1",
     "Jinja2==3.0.1",
@@ -20,8 +20,8 @@ run_requirements = [
     "starlette==0.14.2",
     "pytest==6.2.4",
     "sphinx-autobuild==0.7.1",
-    "elasticsearch==7.14.0",
-    "redis>=3.5.3"
+    "elasticsearch[async]==7.14.0",
+    "redis>=5.0.1"
 ]
 
 here = path.abspath(path.dirname(__file__))
@@ -0,0 +1,20 @@
+from unittest.mock import AsyncMock, MagicMock
+
+
+def es_mock(**responses) -> MagicMock:
+    """
+    Cliente do elasticsearch falso, em que cada método informado devolve a resposta
+    informada.
+    """
+    es = MagicMock()
+    for method, response in responses.items():
+        setattr(es, method, AsyncMock(return_value=response))
+    return es
+
+
+def hit(id: int, created_at: str) -> dict:
+    return {
+        "_id": str(id),
+        "_source": {"user_id": 1, "created_at": created_at},
+        "sort": [created_at, id],
+    }
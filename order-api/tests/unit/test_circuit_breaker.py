@@ -0,0 +1,124 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from order_api.services import metrics
+from order_api.services.circuit_breaker import (
+    CircuitBreaker,
+    CLOSED,
+    OPEN,
+    HALF_OPEN,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    clock = Clock()
+    with patch(
+        "order_api.services.circuit_breaker.time", SimpleNamespace(monotonic=clock)
+    ):
+        yield clock
+
+
+def breaker(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name=name, failure_threshold=3, recovery_timeout=30, slow_call=1
+    )
+
+
+def test_opens_after_consecutive_failures(clock):
+    circuit = breaker("test_opens")
+    for _ in range(2):
+        circuit.record_failure(0.1)
+    assert circuit.state == CLOSED and circuit.allow()
+    circuit.record_failure(0.1)
+    assert circuit.state == OPEN
+    assert metrics.snapshot()["test_opens_circuit_opened"] == 1
+
+
+def test_success_resets_failures(clock):
+    circuit = breaker("test_resets")
+    circuit.record_failure(0.1)
+    circuit.record_failure(0.1)
+    circuit.record_success(0.1)
+    circuit.record_failure(0.1)
+    circuit.record_failure(0.1)
+    assert circuit.state == CLOSED
+
+
+def test_rejects_calls_while_open(clock):
+    circuit = breaker("test_rejects")
+    for _ in range(3):
+        circuit.record_failure(0.1)
+    clock.now += 29
+    assert not circuit.allow()
+    assert not circuit.allow()
+    assert circuit.state == OPEN
+    assert metrics.snapshot()["test_rejects_circuit_rejected"] == 2
+
+
+def test_half_open_allows_a_single_probe_and_closes(clock):
+    circuit = breaker("test_closes")
+    for _ in range(3):
+        circuit.record_failure(0.1)
+    clock.now += 30
+    assert circuit.state == HALF_OPEN
+    assert circuit.allow()
+    assert not circuit.allow()
+    circuit.record_success(0.1)
+    assert circuit.state == CLOSED
+    assert circuit.allow()
+
+
+def test_failed_probe_opens_again(clock):
+    circuit = breaker("test_reopens")
+    for _ in range(3):
+        circuit.record_failure(0.1)
+    clock.now += 30
+    assert circuit.allow()
+    circuit.record_failure(0.1)
+    assert circuit.state == OPEN
+    assert not circuit.allow()
+    clock.now += 30
+    assert circuit.allow()
+
+
+def test_abandoned_probe_is_released(clock):
+    circuit = breaker("test_abandoned")
+    for _ in range(3):
+        circuit.record_failure(0.1)
+    clock.now += 30
+    assert circuit.allow()
+    clock.now += 29
+    assert not circuit.allow()
+    clock.now += 1
+    assert circuit.allow()
+
+
+def test_slow_calls_count_as_failures(clock):
+    circuit = breaker("test_slow")
+    for _ in range(3):
+        circuit.record_success(1.5)
+    assert circuit.state == OPEN
+    snapshot = metrics.snapshot()
+    assert snapshot["test_slow_slow_calls"] == 3
+    assert snapshot["test_slow_calls"] == 3
+
+
+def test_slow_probe_opens_again(clock):
+    circuit = breaker("test_slow_probe")
+    for _ in range(3):
+        circuit.record_failure(0.1)
+    clock.now += 30
+    assert circuit.allow()
+    circuit.record_success(2)
+    assert circuit.state == OPEN
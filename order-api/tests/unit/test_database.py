@@ -0,0 +1,120 @@
+import json
+import base64
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import elasticsearch
+
+from . import es_mock, hit
+from order_api.database import Database, build_query, CURSOR_START
+from order_api.database.order import Order
+from order_api.exceptions.database import DatabaseException, InvalidCursorException
+
+encode_cursor = Database._Database__encode_cursor
+decode_cursor = Database._Database__decode_cursor
+
+
+def test_build_query_filters():
+    query = build_query(
+        {
+            "user_id": "1",
+            "status": ["paid", "sent"],
+            "total_value": {"gte": 10, "lte": None},
+            "created_at": {"gte": None, "lte": None},
+            "item_description": None,
+        }
+    )
+    assert query == {
+        "bool": {
+            "filter": [
+                {"term": {"user_id": "1"}},
+                {"terms": {"status": ["paid", "sent"]}},
+                {"range": {"total_value": {"gte": 10}}},
+            ]
+        }
+    }
+
+
+def test_build_query_without_filters():
+    assert build_query() == {"match_all": {}}
+    assert build_query({"user_id": None}) == {"match_all": {}}
+
+
+def test_cursor_round_trip():
+    search_after = ["2021-10-01T10:00:00", 42]
+    cursor = encode_cursor("pit-id", search_after)
+    assert decode_cursor(cursor) == ("pit-id", search_after)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        base64.urlsafe_b64encode(b"not json").decode(),
+        base64.urlsafe_b64encode(json.dumps({"pit": "x"}).encode()).decode(),
+        base64.urlsafe_b64encode(json.dumps(["x", [1]]).encode()).decode(),
+        base64.urlsafe_b64encode(
+            json.dumps({"pit": "x", "search_after": "1"}).encode()
+        ).decode(),
+        base64.urlsafe_b64encode(
+            json.dumps({"pit": 1, "search_after": [1]}).encode()
+        ).decode(),
+    ],
+)
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursorException):
+        decode_cursor(cursor)
+
+
+def test_list_after_pages_with_search_after():
+    first_page = [hit(2, "2021-10-02"), hit(1, "2021-10-01")]
+    es = es_mock(
+        open_point_in_time={"id": "pit-1"},
+        search={"pit_id": "pit-2", "hits": {"hits": first_page, "total": None}},
+        close_point_in_time={},
+    )
+    with patch("order_api.database.connect", return_value=es):
+        hits, _, cursor = asyncio.run(Order().list_after(quantity=2))
+        assert hits == first_page
+        assert decode_cursor(cursor) == ("pit-2", ["2021-10-01", 1])
+        assert "search_after" not in es.search.call_args.kwargs["body"]
+
+        es.search.return_value = {
+            "pit_id": "pit-2",
+            "hits": {"hits": [hit(0, "2021-09-30")], "total": None},
+        }
+        hits, _, cursor = asyncio.run(Order().list_after(quantity=2, cursor=cursor))
+        body = es.search.call_args.kwargs["body"]
+        assert body["search_after"] == ["2021-10-01", 1]
+        assert body["pit"]["id"] == "pit-2"
+        assert cursor is None
+        es.close_point_in_time.assert_awaited_once_with(
+            body={"id": "pit-2"}, ignore=404
+        )
+        es.open_point_in_time.assert_awaited_once()
+
+
+def test_list_after_starts_a_new_pit():
+    es = es_mock(
+        open_point_in_time={"id": "pit-1"},
+        search={"hits": {"hits": [], "total": None}},
+        close_point_in_time={},
+    )
+    with patch("order_api.database.connect", return_value=es):
+        asyncio.run(Order().list_after(cursor=CURSOR_START))
+    assert es.search.call_args.kwargs["body"]["pit"]["id"] == "pit-1"
+
+
+def test_insert_into_missing_index_is_an_error():
+    es = es_mock()
+    es.create = AsyncMock(
+        side_effect=elasticsearch.exceptions.NotFoundError(
+            404, "index_not_found_exception", {}
+        )
+    )
+    with patch("order_api.database.connect", return_value=es):
+        with pytest.raises(DatabaseException) as error:
+            asyncio.run(Order(user_id=1).insert(id="1", index="orders-write"))
+    assert error.value.status == 503
+    es.indices.create.assert_not_called()
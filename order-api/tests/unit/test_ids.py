@@ -0,0 +1,74 @@
+from unittest.mock import patch
+
+import pytest
+
+from order_api.services import ids
+from order_api.services.ids import (
+    Snowflake,
+    EPOCH_MS,
+    WORKER_BITS,
+    SEQUENCE_BITS,
+    MAX_WORKER_ID,
+    SEQUENCE_MASK,
+)
+
+
+def decode(id: int) -> tuple:
+    return (
+        (id >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS,
+        (id >> SEQUENCE_BITS) & MAX_WORKER_ID,
+        id & SEQUENCE_MASK,
+    )
+
+
+def clock(*values):
+    return patch.object(ids, "_now_ms", side_effect=list(values))
+
+
+def test_ids_are_increasing_and_carry_the_worker():
+    generator = Snowflake(worker_id=7)
+    now = EPOCH_MS + 1000
+    with clock(now, now, now + 1, now + 5):
+        generated = [generator.next_id() for _ in range(4)]
+    assert generated == sorted(generated)
+    assert len(set(generated)) == 4
+    assert [decode(id) for id in generated] == [
+        (now, 7, 0),
+        (now, 7, 1),
+        (now + 1, 7, 0),
+        (now + 5, 7, 0),
+    ]
+
+
+def test_workers_generate_distinct_ids_in_the_same_millisecond():
+    now = EPOCH_MS + 1000
+    with clock(now, now):
+        first, second = Snowflake(worker_id=1).next_id(), Snowflake(2).next_id()
+    assert first != second
+
+
+def test_sequence_rollover_moves_to_the_next_millisecond():
+    generator = Snowflake(worker_id=3)
+    now = EPOCH_MS + 1000
+    with clock(*[now] * (SEQUENCE_MASK + 3)):
+        generated = [generator.next_id() for _ in range(SEQUENCE_MASK + 3)]
+    assert generated == sorted(generated)
+    assert len(set(generated)) == len(generated)
+    assert decode(generated[SEQUENCE_MASK]) == (now, 3, SEQUENCE_MASK)
+    assert decode(generated[SEQUENCE_MASK + 1]) == (now + 1, 3, 0)
+    assert decode(generated[SEQUENCE_MASK + 2]) == (now + 1, 3, 1)
+
+
+def test_clock_moving_backwards_keeps_ids_increasing():
+    generator = Snowflake(worker_id=3)
+    now = EPOCH_MS + 1000
+    with clock(now, now - 50, now - 10, now + 1):
+        generated = [generator.next_id() for _ in range(4)]
+    assert generated == sorted(generated)
+    assert len(set(generated)) == 4
+    assert [decode(id)[0] for id in generated] == [now, now, now, now + 1]
+
+
+def test_worker_id_out_of_range():
+    with pytest.raises(ValueError):
+        Snowflake(worker_id=MAX_WORKER_ID + 1)
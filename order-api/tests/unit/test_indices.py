@@ -0,0 +1,69 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import elasticsearch
+
+from . import es_mock
+from order_api.database import indices
+from order_api.exceptions.database import LegacyIndexException
+
+
+def ensure(es):
+    with patch.object(indices, "connect", return_value=es), patch.object(
+        indices, "put_templates", AsyncMock()
+    ), patch.object(indices, "aliases", return_value=["orders"]), patch.object(
+        indices, "rollover_enabled", return_value=False
+    ):
+        asyncio.run(indices.ensure_indices())
+
+
+def test_ensure_indices_creates_missing_index():
+    es = es_mock()
+    es.indices = es_mock(exists_alias=False, exists=False, create={})
+    ensure(es)
+    es.indices.create.assert_awaited_once_with(
+        index="orders-v1", body={"aliases": {"orders": {}}}
+    )
+
+
+def test_ensure_indices_keeps_existing_alias():
+    es = es_mock()
+    es.indices = es_mock(exists_alias=True, create={})
+    ensure(es)
+    es.indices.create.assert_not_awaited()
+
+
+def test_ensure_indices_rejects_legacy_index():
+    es = es_mock()
+    es.indices = es_mock(exists_alias=False, exists=True, create={})
+    with pytest.raises(LegacyIndexException) as error:
+        ensure(es)
+    assert "orders" in error.value.message
+    es.indices.create.assert_not_awaited()
+
+
+def prepare(*outcomes):
+    ensure_indices = AsyncMock(side_effect=list(outcomes))
+    with patch.object(indices, "ensure_indices", ensure_indices), patch.object(
+        indices.asyncio, "sleep", AsyncMock()
+    ), patch.object(indices.envs, "DB_STARTUP_ATTEMPTS", 3):
+        asyncio.run(indices.prepare())
+    return ensure_indices
+
+
+def test_prepare_retries_until_elasticsearch_is_available():
+    unavailable = elasticsearch.exceptions.ConnectionError("N/A", "refused", None)
+    assert prepare(unavailable, unavailable, None).await_count == 3
+
+
+def test_prepare_fails_startup_when_elasticsearch_stays_unavailable():
+    unavailable = elasticsearch.exceptions.ConnectionError("N/A", "refused", None)
+    with pytest.raises(elasticsearch.exceptions.ConnectionError):
+        prepare(unavailable, unavailable, unavailable)
+
+
+def test_prepare_does_not_retry_a_legacy_index():
+    legacy = LegacyIndexException(500, "Internal Server Error", "orders")
+    with pytest.raises(LegacyIndexException):
+        prepare(legacy, None)
@@ -0,0 +1,123 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from order_api.services import cache as user_cache
+from order_api.services.redis import LocalCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    clock = Clock()
+    with patch("order_api.services.redis.time", SimpleNamespace(monotonic=clock)):
+        yield clock
+
+
+def cache(max_entries: int = 100, max_bytes: int = 1024, ttl: float = 60):
+    return LocalCache("test_local_cache", max_entries, max_bytes, ttl)
+
+
+def test_evicts_least_recently_used_by_entries(clock):
+    local = cache(max_entries=2)
+    local.set("a", b"1")
+    local.set("b", b"2")
+    assert local.get("a") == b"1"
+    local.set("c", b"3")
+    assert local.get("b") is None
+    assert local.get("a") == b"1" and local.get("c") == b"3"
+    assert len(local) == 2
+
+
+def test_evicts_least_recently_used_by_bytes(clock):
+    local = cache(max_bytes=20)
+    local.set("a", b"123456789")
+    local.set("b", b"123456789")
+    assert local.size == 20
+    local.set("c", b"1234")
+    assert local.get("a") is None
+    assert local.size == 15
+    local.set("b", b"1")
+    assert local.size == 7
+
+
+def test_ignores_values_larger_than_the_cache(clock):
+    local = cache(max_bytes=10)
+    local.set("a", b"1")
+    local.set("b", b"12345678901")
+    assert local.get("b") is None and local.get("a") == b"1"
+
+
+def test_entries_expire_after_ttl(clock):
+    local = cache(ttl=60)
+    local.set("a", b"1")
+    clock.now += 59
+    assert local.get("a") == b"1"
+    clock.now += 2
+    assert local.get("a") is None
+    assert len(local) == 0 and local.size == 0
+
+
+def test_negative_entries_are_cached_locally(clock):
+    local = cache()
+    key = user_cache._key(7)
+    load = AsyncMock(return_value={key: user_cache.NOT_FOUND})
+    with patch.object(user_cache, "local_cache", local), patch.object(
+        user_cache, "_load", load
+    ):
+        first = asyncio.run(user_cache.find_users({7}))
+        second = asyncio.run(user_cache.find_users({7}))
+        clock.now += 61
+        asyncio.run(user_cache.find_users({7}))
+    assert first == second == ({}, ["7"])
+    assert load.await_count == 2
+    assert local.get(key) == user_cache.NOT_FOUND
+
+
+def test_get_many_or_load_loads_only_missing_keys(clock):
+    local, calls = cache(), list()
+
+    async def loader(keys: list) -> dict:
+        calls.append(keys)
+        await asyncio.sleep(0.01)
+        return {key: key.encode() for key in keys if key != "missing"}
+
+    async def run():
+        return await asyncio.gather(
+            local.get_many_or_load(["a", "b", "missing"], loader),
+            local.get_many_or_load(["b"], loader),
+        )
+
+    local.set("a", b"cached")
+    first, second = asyncio.run(run())
+    assert first == {"a": b"cached", "b": b"b"}
+    assert second == {"b": b"b"}
+    assert calls == [["b", "missing"]]
+    assert local.get("b") == b"b" and local.get("missing") is None
+
+
+def test_key_deleted_during_load_is_not_cached(clock):
+    local = cache()
+
+    async def loader(keys: list) -> dict:
+        await asyncio.sleep(0.01)
+        return {key: b"stale" for key in keys}
+
+    async def run():
+        load = asyncio.ensure_future(local.get_many_or_load(["a", "b"], loader))
+        await asyncio.sleep(0.005)
+        local.delete("a")
+        return await load
+
+    assert asyncio.run(run()) == {"a": b"stale", "b": b"stale"}
+    assert local.get("a") is None
+    assert local.get("b") == b"stale"
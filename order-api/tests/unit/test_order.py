@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, call, patch
+
+import pytest
+
+from order_api.business import order
+from order_api.database.order import Order
+from order_api.exceptions.order import OrderConflictException
+
+CURRENT = {
+    "_source": {"user_id": 1, "item_quantity": 3, "created_at": "2021-10-01"},
+    "_seq_no": 7,
+    "_primary_term": 1,
+}
+
+
+@pytest.fixture
+def es():
+    es = SimpleNamespace(
+        list_one=AsyncMock(return_value=CURRENT),
+        insert=AsyncMock(return_value={"_id": "10", "_version": 1}),
+        delete=AsyncMock(return_value={"result": "deleted"}),
+        remove_order=AsyncMock(),
+    )
+    with patch.object(Order, "list_one", es.list_one), patch.object(
+        Order, "insert", es.insert
+    ), patch.object(Order, "delete", es.delete), patch.object(
+        order.read_model, "remove_order", es.remove_order
+    ):
+        yield es
+
+
+def move_to_user_2():
+    return asyncio.run(
+        order._update(
+            {"user_id": 2}, "orders-v1", "order", "10", "1", "2", None, None, False
+        )
+    )
+
+
+def test_routing_move_creates_the_new_copy_before_deleting_the_old(es):
+    response, previous, moved = move_to_user_2()
+    es.list_one.assert_awaited_once_with("10", "orders-v1", "order", "1")
+    assert response == {"_id": "10", "_version": 1}
+    assert previous == CURRENT["_source"]
+    assert moved["user_id"] == 2 and moved["item_quantity"] == 3
+    assert es.insert.await_args.kwargs["routing"] == "2"
+    es.delete.assert_awaited_once_with("10", "orders-v1", "order", "1", 7, 1)
+    es.remove_order.assert_awaited_once_with("10", "1")
+
+
+def test_routing_move_keeps_the_order_when_the_insert_fails(es):
+    es.insert.side_effect = RuntimeError("es unavailable")
+    with pytest.raises(RuntimeError):
+        move_to_user_2()
+    es.delete.assert_not_awaited()
+    es.remove_order.assert_not_awaited()
+
+
+def test_routing_move_discards_the_new_copy_on_conflict(es):
+    es.delete.side_effect = [order._conflict("10"), {"result": "deleted"}]
+    with pytest.raises(OrderConflictException):
+        move_to_user_2()
+    assert es.delete.await_args_list == [
+        call("10", "orders-v1", "order", "1", 7, 1),
+        call("10", "orders-v1", "order", "2"),
+    ]
+    es.remove_order.assert_not_awaited()
@@ -0,0 +1,77 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from order_api.business import read_model
+from order_api.database.order import Order
+
+USER = {
+    "id_user": 1,
+    "name": "Ana",
+    "cpf": "12345678900",
+    "created_at": "2021-10-01 10:00:00",
+    "updated_at": "2021-10-02 10:00:00.500000",
+}
+
+
+@pytest.fixture(autouse=True)
+def enabled():
+    with patch.object(read_model.envs, "READ_MODEL_ENABLED", True):
+        yield
+
+
+def test_synced_at_is_the_last_change_of_the_user():
+    assert read_model._synced_at(USER) == 1633168800500
+    assert read_model._synced_at({**USER, "updated_at": None}) == 1633082400000
+    assert read_model._synced_at({"id_user": 1}) == 0
+    assert read_model._synced_at(None) == 0
+    assert read_model._synced_at(None, removed_at=1633168801.25) == 1633168801250
+
+
+def test_project_orders_keeps_the_newer_user_snapshot():
+    bulk_insert = AsyncMock(return_value=[{"id": "10", "status": 200}])
+    with patch.object(Order, "bulk_insert", bulk_insert):
+        asyncio.run(read_model.project_orders([("10", {"user_id": 1})], {"1": USER}))
+    documents = bulk_insert.await_args.args[0]
+    assert documents == [
+        (
+            "10",
+            {
+                "user_id": 1,
+                "user": {
+                    "id_user": 1,
+                    "name": "Ana",
+                    "created_at": USER["created_at"],
+                    "updated_at": USER["updated_at"],
+                },
+                "user_synced_at": 1633168800500,
+            },
+        )
+    ]
+    kwargs = bulk_insert.await_args.kwargs
+    assert kwargs["merge_script"] == read_model.MERGE_ORDER_SCRIPT
+
+
+def test_rebuild_replaces_the_whole_document():
+    bulk_insert = AsyncMock(return_value=[])
+    with patch.object(Order, "bulk_insert", bulk_insert):
+        asyncio.run(
+            read_model.project_orders([("10", {"user_id": 1})], {}, replace=True)
+        )
+    assert bulk_insert.await_args.kwargs["merge_script"] is None
+
+
+def test_project_users_skips_newer_snapshots_and_aborts_on_conflicts():
+    update_by_query = AsyncMock(return_value=1)
+    users = AsyncMock(return_value=({"1": USER}, ["2"]))
+    with patch.object(Order, "update_by_query", update_by_query), patch.object(
+        read_model, "get_users_by_ids", users
+    ):
+        asyncio.run(read_model.project_users(["1", "2"], 1633168801.25))
+    first, second = [call.kwargs for call in update_by_query.await_args_list]
+    assert first["script"]["source"] == read_model.PROJECT_USER_SCRIPT
+    assert first["script"]["params"]["synced_at"] == 1633168800500
+    assert "cpf" not in first["script"]["params"]["user"]
+    assert second["script"]["params"] == {"user": None, "synced_at": 1633168801250}
+    assert first["conflicts"] == second["conflicts"] == "abort"
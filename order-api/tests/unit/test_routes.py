@@ -0,0 +1,33 @@
+import pytest
+from fastapi import FastAPI
+from starlette.routing import Match
+
+from order_api.app import include_router
+from order_api.routes.v1 import order, stats, metrics
+
+app = FastAPI()
+include_router(app)
+
+
+def resolve(path: str, method: str = "GET"):
+    scope = {"type": "http", "path": path, "method": method}
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.endpoint
+    return None
+
+
+@pytest.mark.parametrize(
+    "path, endpoint",
+    [
+        ("/v1/orders/stats", stats.get_summary),
+        ("/v1/orders/stats/", stats.get_summary),
+        ("/v1/orders/stats/users", stats.get_by_user),
+        ("/v1/metrics", metrics.get_metrics),
+        ("/v1/metrics/", metrics.get_metrics),
+        ("/v1/orders/1", order.get_orders_by_user_id),
+    ],
+)
+def test_routes_resolve_to_their_endpoints(path, endpoint):
+    assert resolve(path) is endpoint
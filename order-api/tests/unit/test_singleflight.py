@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from order_api.services.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_load():
+    flight, calls = SingleFlight("test_share"), list()
+
+    async def loader(keys: list) -> dict:
+        calls.append(keys)
+        await asyncio.sleep(0.01)
+        return {key: key.upper() for key in keys if key != "missing"}
+
+    async def run():
+        return await asyncio.gather(
+            flight.do_many(["a", "b"], loader),
+            flight.do_many(["b", "c", "missing"], loader),
+            flight.do("a", lambda: loader(["a"])),
+        )
+
+    first, second, third = asyncio.run(run())
+    assert first == {"a": "A", "b": "B"}
+    assert second == {"b": "B", "c": "C"}
+    assert third == "A"
+    assert calls == [["a", "b"], ["c", "missing"]]
+    assert len(flight) == 0
+
+
+def test_error_reaches_every_waiter():
+    flight, calls = SingleFlight("test_error"), list()
+
+    async def loader(keys: list) -> dict:
+        calls.append(keys)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("user-api fora")
+
+    async def run():
+        return await asyncio.gather(
+            *(flight.do_many(["a"], loader) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(flight) == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_load():
+    flight = SingleFlight("test_cancel")
+
+    async def loader(keys: list) -> dict:
+        await asyncio.sleep(0.02)
+        return {key: 1 for key in keys}
+
+    async def run():
+        first = asyncio.ensure_future(flight.do_many(["a"], loader))
+        second = asyncio.ensure_future(flight.do_many(["a"], loader))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == {"a": 1}
@@ -23,6 +23,7 @@ run_requirements = [
     "SQLAlchemy==1.4.20",
     "cryptography==3.4.8",
     "psycopg2==2.9.1",
+    "redis>=5.0.1",
 ]
 
 here = path.abspath(path.dirname(__file__))
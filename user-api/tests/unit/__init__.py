@@ -16,7 +16,10 @@ class UserMock:
             raise IntegrityError(statement="", params="", orig="")
         return self
 
-    def to_dict(self, no_id=False, no_fk=False):
+    def decrypt(self):
+        return self
+
+    def to_dict(self, no_id=False, no_fk=False, no_none=False):
         return self.__dict__
 
     def update(self, conn, filter, data):
@@ -4,7 +4,7 @@ from unittest.mock import patch
 from loguru import logger
 
 from ..unit import UserMock
-from user_api.business.user import insert_user, update_user
+from user_api.business.user import insert_user, update_user, delete_user, list_many
 from user_api.exceptions.user import UserAlreadyInserted
 
 
@@ -24,3 +24,26 @@ def test_insert_user_integrity_error(mock_insert_user):
 def test_update_user_sucess(mock_update_user):
     updated_user = update_user(id_user=1, update_data=UserMock().to_dict())
     assert updated_user is True
+
+
+@patch("user_api.business.user.DatabaseService")
+@patch("user_api.business.user.user_entity")
+def test_list_many_users_not_found(mock_user_entity, mock_database_service):
+    user = UserMock()
+    user.id_user = 1
+    mock_user_entity.search.return_value = [user]
+    users, not_found = list_many([1, 2, 2])
+    assert list(users) == [1]
+    assert not_found == [2]
+
+
+@patch("user_api.business.user.publish_user_event")
+@patch("user_api.business.user.DatabaseService")
+@patch("user_api.business.user.user_entity")
+def test_delete_user_publishes_event(
+    mock_user_entity, mock_database_service, mock_publish_user_event
+):
+    mock_user_entity.list_one.return_value = UserMock()
+    mock_user_entity.list_one.return_value.delete = lambda conn: None
+    assert delete_user(1) is True
+    mock_publish_user_event.assert_called_once_with("deleted", 1)
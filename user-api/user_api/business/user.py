@@ -11,13 +11,15 @@ from user_api.exceptions.user import (
 from user_api.config import envs
 from user_api.entities.user import User as user_entity
 from user_api.utlis.cryptography import encrypt_message
+from user_api.services.events import publish_user_event, CREATED, UPDATED, DELETED
 from user_api.database.database_service import DatabaseService
 
 
 def insert_user(user: user_entity) -> int:
     """
     Insere um usuário no banco de dados, criptografando dados sensíveis. Sanitiza
-    os dados de cpf e telefone, retirando caracteres não númericos.
+    os dados de cpf e telefone, retirando caracteres não númericos. Após o commit
+    publica o evento `created`, ver :func:`services.events.publish_user_event`.
 
     :param user_entity user: Instância da classe :class:`entities.user.User`.
     :raises UserAlreadyInserted: O número de cpf informado já existe na base.
@@ -29,7 +31,7 @@ def insert_user(user: user_entity) -> int:
             user.cpf = user.cpf.replace(".", "").replace("-", "")
             user.phone_number = user.phone_number.replace("-", "")
             user.encrypt()
-            return user.insert(conn).decrypt().to_dict(no_id=False).get("id_user")
+            id_user = user.insert(conn).decrypt().to_dict(no_id=False).get("id_user")
         except IntegrityError:
             raise UserAlreadyInserted(
                 status=409,
@@ -41,11 +43,14 @@ def insert_user(user: user_entity) -> int:
                     ).to_dict()
                 ],
             )
+    publish_user_event(CREATED, id_user)
+    return id_user
 
 
 def update_user(id_user: int, update_data: dict) -> bool:
     """
-    Atualiza um usuário.
+    Atualiza um usuário. Após o commit publica o evento `updated`, ver
+    :func:`services.events.publish_user_event`.
 
     :param int id_user: Id do usuário a ser atualizado.
     :param dict update_data: Dicionário no formato coluna: valor dos dados que
@@ -74,6 +79,7 @@ def update_user(id_user: int, update_data: dict) -> bool:
             conn, filter=database_filter, data=update_data
         )
         if len(updated_list) == 1:
+            publish_user_event(UPDATED, id_user)
             return True
         else:
             raise UpdateUserException(
@@ -90,7 +96,8 @@ def update_user(id_user: int, update_data: dict) -> bool:
 
 def delete_user(id_user: int) -> bool:
     """
-    Deleta um usuário.
+    Deleta um usuário. Após o commit publica o evento `deleted`, ver
+    :func:`services.events.publish_user_event`.
 
     :param int id_user: Usuário a ser deletado.
     :raises DeleteUserException: O usuário informado não pode ser encontrado.
@@ -102,6 +109,7 @@ def delete_user(id_user: int) -> bool:
         user = user_entity.list_one(conn, database_filter)
         if user:
             user.delete(conn)
+            publish_user_event(DELETED, id_user)
             return True
         else:
             raise DeleteUserException(
@@ -144,6 +152,28 @@ def list_one(id_user: int) -> user_entity:
             )
 
 
+def list_many(ids_user: list) -> tuple:
+    """
+    Retorna vários usuários a partir dos seus ids, com uma única consulta ao banco
+    de dados. Descriptografando os dados recuperados do banco de dados.
+
+    :param list ids_user: Ids dos usuários.
+    :return: Dicionário no formato id do usuário: usuário e lista com os ids que
+    não foram encontrados.
+    :rtype: tuple
+    """
+    with DatabaseService() as conn:
+        database_filter = (user_entity.id_user.in_(ids_user),)
+        users = {
+            user.id_user: user.decrypt().to_dict(no_none=True, no_id=False)
+            for user in user_entity.search(conn, filter=database_filter, after=-1)
+        }
+        not_found = [
+            id_user for id_user in dict.fromkeys(ids_user) if id_user not in users
+        ]
+        return users, not_found
+
+
 def list_all(quantity: int, page: int) -> list:
     """
     Lista todos os usuários da base, paginando o resultado. Descriptografando os
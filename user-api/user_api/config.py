@@ -40,6 +40,10 @@ class Envs(BaseSettings):
         SQLALCHEMY_TEST if ENVIRONMENT == EnvironmentEnum.LOCAL else SQLALCHEMY_DB_URI
     )
     SECRET_KEY: str = os.environ.get("SECRET_KEY", None)
+    BATCH_MAX_IDS: int = 100
+    REDIS_URL = os.getenv("REDIS_URL", "redis")
+    USER_EVENTS_STREAM: str = "user-events"
+    USER_EVENTS_MAXLEN: int = 100000
 
     class Config:
         case_sensitive = True
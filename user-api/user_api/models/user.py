@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 from pydantic import BaseModel, Field
 from user_api.exceptions import ErrorDetails
@@ -75,6 +75,21 @@ class GetUserResponse(BaseModel):
     result: UserCreateRequest
 
 
+class GetUser(BaseModel):
+    id_user: int = Field(..., description="Id do usuário")
+    name: str = Field(..., description="Nome completo")
+    cpf: str = Field(..., description="Cadastro de pessoa física(CPF)")
+    email: Optional[str] = Field(None, description="E-mail")
+    phone_number: str = Field(..., description="Número do telefone")
+    created_at: str = Field(..., description="Data de criação do usuário")
+    updated_at: Optional[str] = Field(None, description="Data de alteração do usuário")
+
+
+class ListManyUsersResponse(BaseModel):
+    result: Dict[int, GetUser] = Field(..., description="Usuários encontrados por id")
+    not_found: List[int] = Field(..., description="Ids não encontrados")
+
+
 class ListUsersResponse(BaseModel):
     result: List[UserCreateRequest]
     pagination: Pagination = Field(..., description="Dados de paginação")
@@ -131,3 +146,5 @@ USER_DELETE_DEFAULT_RESPONSES = parse_openapi(
 
 
 USER_LIST_DEFAULT_RESPONSES = parse_openapi([])
+
+USER_LIST_MANY_DEFAULT_RESPONSES = parse_openapi([])
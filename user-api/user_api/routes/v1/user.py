@@ -1,5 +1,8 @@
+from typing import List
+
 from fastapi import APIRouter, Body, Query, Request
 
+from user_api.config import envs
 from user_api.business import user as usr
 from user_api.routes.v1 import pagination
 from user_api.entities.user import User as usr_entity
@@ -15,6 +18,10 @@ from user_api.models.user import (
 )
 from user_api.models.user import UserDeleteResponse, USER_DELETE_DEFAULT_RESPONSES
 from user_api.models.user import ListUsersResponse, USER_LIST_DEFAULT_RESPONSES
+from user_api.models.user import (
+    ListManyUsersResponse,
+    USER_LIST_MANY_DEFAULT_RESPONSES,
+)
 
 router = APIRouter()
 
@@ -70,6 +77,29 @@ def delete(
     return {"result": usr.delete_user(id_user)}
 
 
+@router.get(
+    "/batch",
+    status_code=200,
+    summary="Listar as informações de vários usuários",
+    response_model=ListManyUsersResponse,
+    responses=USER_LIST_MANY_DEFAULT_RESPONSES,
+)
+def list_many(
+    ids: List[int] = Query(
+        ...,
+        description="Ids dos usuários",
+        min_items=1,
+        max_items=envs.BATCH_MAX_IDS,
+    ),
+):
+    """
+    Lista vários usuários a partir dos seus ids, informando também os ids que não
+    foram encontrados.
+    """
+    users, not_found = usr.list_many(ids)
+    return {"result": users, "not_found": not_found}
+
+
 @router.get(
     "/{id_user}",
     status_code=200,
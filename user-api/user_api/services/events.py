@@ -0,0 +1,40 @@
+import time
+
+import redis
+from loguru import logger
+from redis.exceptions import RedisError
+
+from user_api.config import envs
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+
+redis = redis.Redis(host=envs.REDIS_URL, port=6379, db=0)
+
+
+def publish_user_event(event: str, id_user: int):
+    """
+    Publica um evento de alteração de usuário no stream `USER_EVENTS_STREAM` do
+    redis, consumido pelo order-api para invalidar os usuários em cache. Deve ser
+    chamado apenas depois do commit da alteração no banco de dados. O stream é
+    limitado a aproximadamente `USER_EVENTS_MAXLEN` eventos.
+
+    Uma falha na publicação não desfaz a alteração já persistida, por isso é
+    apenas registrada no log. Nesse caso o usuário expira do cache do order-api
+    após o seu tempo de expiração.
+
+    :param str event: Tipo do evento: `created`, `updated` ou `deleted`.
+    :param int id_user: Id do usuário alterado.
+    """
+    try:
+        redis.xadd(
+            envs.USER_EVENTS_STREAM,
+            {"event": event, "id_user": id_user, "at": time.time()},
+            maxlen=envs.USER_EVENTS_MAXLEN,
+            approximate=True,
+        )
+    except RedisError as error:
+        logger.error(
+            f"Falha ao publicar o evento {event} do usuário {id_user}: {error}"
+        )